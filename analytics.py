@@ -0,0 +1,173 @@
+"""
+TaskFlow Completion Analytics
+Loads a `taskflow_todos` export (see section 8.1 of the architecture docs)
+into NumPy columns and computes the completion histograms, priority
+breakdowns and lead times the app's charts are built from (section 10).
+
+getWeeklyData() in js/app.js filters every todo once per day of the week
+and parses each completedAt again each time. Here the timestamps are parsed
+once, in bulk, into epoch seconds, and every figure is a single vectorized
+pass over the columns, so a million-task export costs about as much to
+summarise as it does to read (benchmarks/analytics.py).
+
+Days, weeks and months are in UTC; weeks start on Monday.
+
+This is a standalone API for scripts and notebooks: the generator doesn't
+use it. The task-report appendix (task_report.appendix) counts with
+TaskStats, so that a PDF comes out the same whether or not NumPy is
+installed, and its per-task tables read each todo's text from the export
+anyway.
+"""
+
+import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from task_report import PRIORITIES, iter_todos, parse_timestamp
+
+DAY = 86400
+MISSING = -(1 << 63)  # NaT as int64
+UNITS = ("day", "week", "month")
+
+
+class AnalyticsError(RuntimeError):
+    pass
+
+
+def _require_numpy():
+    if np is None:
+        raise AnalyticsError("Task analytics requires NumPy: pip install numpy")
+
+
+def _epoch_seconds(values, path, key, first):
+    """int64 epoch seconds for a chunk of ISO 8601 strings, NaT where missing."""
+    # numpy parses naive ISO 8601 only: drop the "Z" the app writes, and
+    # convert any other offset to UTC first.
+    texts = []
+    for i, value in enumerate(values):
+        if value is None:
+            texts.append("NaT")
+        elif value.endswith("Z"):
+            texts.append(value[:-1])
+        else:
+            stamp = parse_timestamp(value, f"{path}: todo #{first + i} {key}")
+            texts.append(stamp.astimezone(datetime.timezone.utc).replace(tzinfo=None).isoformat())
+    try:
+        stamps = np.array(texts, dtype="datetime64[s]")
+    except ValueError:
+        # Report the first bad value the way task_report does.
+        for i, value in enumerate(values):
+            if value is not None:
+                parse_timestamp(value, f"{path}: todo #{first + i} {key}")
+        raise
+    return stamps.view(np.int64)
+
+
+class TodoColumns:
+    """An export as parallel arrays, one element per todo:
+
+    created_at, completed_at  int64 epoch seconds, MISSING where unset
+    priority                  int8 index into task_report.PRIORITIES
+    completed                 bool
+    """
+
+    def __init__(self, created_at, completed_at, priority, completed):
+        self.created_at = created_at
+        self.completed_at = completed_at
+        self.priority = priority
+        self.completed = completed
+
+    @classmethod
+    def from_export(cls, path, chunk_size=1 << 16):
+        """Stream the export, parsing each chunk's timestamps in one call."""
+        _require_numpy()
+        codes = {name: code for code, name in enumerate(PRIORITIES)}
+        columns = ([], [], [], [])
+        created, finished, priority, completed = [], [], [], []
+
+        def flush(first):
+            columns[0].append(_epoch_seconds(created, path, "createdAt", first))
+            columns[1].append(_epoch_seconds(finished, path, "completedAt", first))
+            columns[2].append(np.array(priority, dtype=np.int8))
+            columns[3].append(np.array(completed, dtype=bool))
+            for chunk in (created, finished, priority, completed):
+                chunk.clear()
+
+        first = 0
+        for index, todo in enumerate(iter_todos(path, timestamps=False)):
+            created.append(todo.get("createdAt"))
+            finished.append(todo.get("completedAt"))
+            priority.append(codes[todo["priority"]])
+            completed.append(todo["completed"])
+            if len(priority) == chunk_size:
+                flush(first)
+                first = index + 1
+        flush(first)
+        return cls(*(np.concatenate(chunks) for chunks in columns))
+
+    def __len__(self):
+        return len(self.priority)
+
+    def finished(self):
+        """Mask of completed todos that say when they were completed."""
+        return self.completed & (self.completed_at != MISSING)
+
+    def completions(self, unit="day", start=None, end=None):
+        """(bucket starts, completed counts) per day, week or month, from the
+        first completion to the last, or over [start, end) given as dates."""
+        if unit not in UNITS:
+            raise ValueError(f"unknown unit {unit!r} (expected one of {', '.join(UNITS)})")
+        stamps = self.completed_at[self.finished()]
+        if unit == "month":
+            buckets = stamps.view("datetime64[s]").astype("datetime64[M]").view(np.int64)
+            origin = np.datetime64("1970-01", "M")
+        else:
+            # 1970-01-01 was a Thursday: shift by three days so weeks start on Monday.
+            days = stamps // DAY
+            buckets = days if unit == "day" else (days + 3) // 7
+            origin = np.datetime64("1970-01-01", "D") - (0 if unit == "day" else 3)
+        step = {"day": 1, "week": 7, "month": 1}[unit]
+        lo = self._bucket(start, unit) if start is not None else (buckets.min() if len(buckets) else 0)
+        hi = self._bucket(end, unit) if end is not None else (buckets.max() + 1 if len(buckets) else 0)
+        if hi <= lo:
+            return origin + np.arange(0), np.zeros(0, dtype=np.int64)
+        inside = buckets[(buckets >= lo) & (buckets < hi)] - lo
+        counts = np.bincount(inside, minlength=hi - lo)
+        return origin + np.arange(lo, hi) * step, counts
+
+    @staticmethod
+    def _bucket(date, unit):
+        if unit == "month":
+            return int(np.datetime64(date, "M").view(np.int64))
+        days = int(np.datetime64(date, "D").view(np.int64))
+        return days if unit == "day" else (days + 3) // 7
+
+    def weekly_activity(self, today=None):
+        """getWeeklyData(): [(weekday, completed)] for the seven days ending today."""
+        today = today or datetime.datetime.now(datetime.timezone.utc).date()
+        first = today - datetime.timedelta(days=6)
+        _, counts = self.completions("day", first, today + datetime.timedelta(days=1))
+        return [((first + datetime.timedelta(days=i)).strftime("%a"), int(n)) for i, n in enumerate(counts)]
+
+    def by_priority(self):
+        """{priority: (open, completed)} from one bincount over priority and status."""
+        counts = np.bincount(self.priority.astype(np.intp) * 2 + self.completed, minlength=2 * len(PRIORITIES))
+        return {name: (int(counts[2 * code]), int(counts[2 * code + 1])) for code, name in enumerate(PRIORITIES)}
+
+    def lead_times(self):
+        """(priority codes, days from created to completed) for completed todos with both timestamps."""
+        timed = self.finished() & (self.created_at != MISSING)
+        return self.priority[timed], (self.completed_at[timed] - self.created_at[timed]) / DAY
+
+    def lead_time_percentiles(self, percentiles=(50, 75, 90, 95, 99)):
+        """{priority or "all": [days at each percentile]}, None where no todo qualifies."""
+        priority, days = self.lead_times()
+        result = {}
+        for name, mask in [("all", None)] + [(name, priority == code) for code, name in enumerate(PRIORITIES)]:
+            values = days if mask is None else days[mask]
+            result[name] = [float(d) for d in np.percentile(values, percentiles)] if len(values) else None
+        return result
+
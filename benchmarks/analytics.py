@@ -0,0 +1,78 @@
+"""
+Time the completion analytics (analytics.py) on a synthetic export, against
+the per-item pass TaskStats makes and the per-day filter getWeeklyData()
+makes in js/app.js.
+
+    python benchmarks/analytics.py                     # 1,000,000 tasks
+    python benchmarks/analytics.py --tasks 10000 100000
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics
+import fixtures
+import task_report
+
+
+def weekly_per_day(completed_at, today):
+    """getWeeklyData() as app.js runs it: one filter, and one parse per todo, per day."""
+    counts = []
+    for i in range(6, -1, -1):
+        day = datetime.datetime.combine(today - datetime.timedelta(days=i), datetime.time(), datetime.timezone.utc)
+        next_day = day + datetime.timedelta(days=1)
+        counts.append(sum(1 for value in completed_at
+                          if value and day <= task_report.parse_timestamp(value) < next_day))
+    return counts
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def run(count):
+    today = datetime.date(2025, 6, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        export = os.path.join(tmp, "todos.json")
+        fixtures.write_export(export, fixtures.todos(count))
+        size = os.path.getsize(export)
+        columns, load = timed(analytics.TodoColumns.from_export, export)
+        _, stats = timed(task_report.TaskStats.from_export, export)
+        completed_at = [todo.get("completedAt") if todo["completed"] else None
+                        for todo in task_report.iter_todos(export, timestamps=False)]
+
+    rows = [("load columns", load), ("TaskStats pass", stats)]
+    for unit in analytics.UNITS:
+        rows.append((f"completions by {unit}", timed(columns.completions, unit)[1]))
+    rows.append(("by priority", timed(columns.by_priority)[1]))
+    rows.append(("lead-time percentiles", timed(columns.lead_time_percentiles)[1]))
+    weekly, vectorized = timed(columns.weekly_activity, today)
+    expected, per_day = timed(weekly_per_day, completed_at, today)
+    assert [n for _, n in weekly] == expected, (weekly, expected)
+    rows.append(("weekly activity", vectorized))
+    rows.append(("weekly, per-day filter", per_day))
+
+    nbytes = sum(getattr(columns, name).nbytes for name in ("created_at", "completed_at", "priority", "completed"))
+    print(f"{count:,} tasks, {size / 1024 / 1024:.1f}MB export, {nbytes / 1024 / 1024:.1f}MB of columns")
+    for name, seconds in rows:
+        print(f"  {name:<24} {seconds * 1000:>10.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, nargs="+", default=[1000000])
+    args = parser.parse_args()
+    for count in args.tasks:
+        run(count)
+
+
+if __name__ == "__main__":
+    main()
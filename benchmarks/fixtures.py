@@ -0,0 +1,47 @@
+"""
+Synthetic todos for the benchmarks, shaped like the app's (section 8.1 of the
+architecture docs), and exports of them. The same seed gives the same todos.
+"""
+
+import datetime
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import task_report
+
+START = datetime.datetime(2025, 1, 1)
+
+
+def todos(count, seed=1, ids=None):
+    """count todos created over 400 days from START, three in five completed
+    within a month. ids gives each todo's id in turn; by default they run
+    bench0000000, bench0000001 and on."""
+    rng = random.Random(seed)
+    if ids is None:
+        ids = (f"bench{i:07d}" for i in range(count))
+    for i, todo_id in zip(range(count), ids):
+        created = START + datetime.timedelta(seconds=rng.randrange(86400 * 400))
+        completed = rng.random() < 0.6
+        finished = created + datetime.timedelta(seconds=rng.randrange(3600, 86400 * 30)) if completed else None
+        yield {
+            "id": todo_id,
+            "text": f"Task {i}: " + "review the quarterly numbers " * rng.randrange(1, 4),
+            "completed": completed,
+            "priority": rng.choice(task_report.PRIORITIES),
+            "createdAt": created.isoformat(timespec="milliseconds") + "Z",
+            "completedAt": finished.isoformat(timespec="milliseconds") + "Z" if finished else None,
+        }
+
+
+def write_export(path, todos):
+    """Write todos as a taskflow_todos export, one todo a line, the way a
+    hand-formatted export looks."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for i, todo in enumerate(todos):
+            f.write((",\n  " if i else "\n  ") + json.dumps(todo))
+        f.write("\n]\n")
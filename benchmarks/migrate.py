@@ -0,0 +1,67 @@
+"""
+Throughput of the dump migrator (migrate.py) on synthetic localStorage dumps,
+in one process and in a pool.
+
+    python benchmarks/migrate.py                       # 2,000 dumps, 1 and all CPUs
+    python benchmarks/migrate.py --dumps 10000 --jobs 1 2 4
+
+Half the dumps are legacy string arrays and half localStorage objects holding
+a taskflow_todos string, some sharing ids so the uniqueness check has work.
+"parent CPU" is the time the main process itself spends: the part that no
+number of workers can spread, so it bounds the pool's speedup.
+"""
+
+import argparse
+import datetime
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fixtures
+import migrate
+
+
+def write_dumps(directory, count, seed=1):
+    rng = random.Random(seed)
+    for i in range(count):
+        size = rng.randrange(5, 200)
+        if i % 2:
+            data = [f"Task {n} of user {i}" for n in range(size)]
+        else:
+            # One id in fifty is shared with another dump.
+            ids = (f"shared{rng.randrange(1000)}" if rng.random() < 0.02 else f"{i:x}-{n:x}" for n in range(size))
+            todos = list(fixtures.todos(size, seed + i, ids))
+            data = {"taskflow_todos": json.dumps(todos), "taskflow_theme": "light"}
+        with open(os.path.join(directory, f"user{i:06d}.json"), "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dumps", type=int, default=2000)
+    parser.add_argument("--jobs", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    now = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "dumps")
+        os.mkdir(source)
+        write_dumps(source, args.dumps)
+        size = sum(entry.stat().st_size for entry in os.scandir(source))
+        print(f"{args.dumps:,} dumps, {size / 1024 / 1024:.1f}MB")
+        for jobs in args.jobs:
+            start, cpu = time.perf_counter(), time.process_time()
+            result = migrate.migrate(source, os.path.join(tmp, f"out{jobs}"), jobs, now, out=io.StringIO())
+            elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu
+            print(f"  {jobs:>3} worker{'s' if jobs > 1 else ' '} {elapsed:>7.2f}s {args.dumps / elapsed:>8,.0f} dumps/sec "
+                  f"{cpu:>6.2f}s parent CPU ({result.todos:,} todos, {result.reassigned:,} ids replaced)")
+
+
+if __name__ == "__main__":
+    main()
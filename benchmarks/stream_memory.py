@@ -0,0 +1,78 @@
+"""
+Peak memory of generate_docs output with and without page streaming.
+
+Each run happens in a fresh interpreter so ru_maxrss reflects that run alone:
+
+    python benchmarks/stream_memory.py                 # 10, 1000, 10000 pages
+    python benchmarks/stream_memory.py --pages 10 100
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROWS_PER_PAGE = 30
+WIDTHS = [20, 90, 30, 30]
+
+
+def build(pages, stream, out_path):
+    import generate_docs
+
+    pdf = generate_docs.new_document()
+    if stream:
+        pdf.stream_pages()
+    for page in range(1, pages + 1):
+        pdf.add_page()
+        pdf.table_header(["#", "Task", "Priority", "Due"], WIDTHS)
+        for row in range(ROWS_PER_PAGE):
+            n = (page - 1) * ROWS_PER_PAGE + row
+            pdf.table_row([str(n), f"Generated task number {n}", ("low", "medium", "high")[n % 3],
+                           f"2026-{n % 12 + 1:02d}-{n % 28 + 1:02d}"], WIDTHS, fill=row % 2 == 1)
+    pdf.output(out_path)
+
+
+def child(pages, stream):
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = os.path.join(tmp, "out.pdf")
+        start = time.perf_counter()
+        build(pages, stream, out_path)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(out_path)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak_kb //= 1024
+    print(peak_kb, elapsed, size)
+
+
+def run(pages, stream):
+    argv = [sys.executable, __file__, "--child", str(pages)] + (["--stream"] if stream else [])
+    peak_kb, elapsed, size = subprocess.run(argv, check=True, capture_output=True, text=True).stdout.split()
+    return int(peak_kb), float(elapsed), int(size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--stream", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.stream)
+        return
+
+    print(f"{'pages':>7}  {'mode':<9} {'peak RSS':>10} {'time':>8} {'PDF size':>10}")
+    for pages in args.pages:
+        for stream in (False, True):
+            peak_kb, elapsed, size = run(pages, stream)
+            print(f"{pages:>7}  {'stream' if stream else 'in-memory':<9} {peak_kb / 1024:>8.1f}MB "
+                  f"{elapsed:>7.2f}s {size / 1024 / 1024:>8.2f}MB")
+
+
+if __name__ == "__main__":
+    main()
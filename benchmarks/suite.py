@@ -0,0 +1,367 @@
+"""
+Benchmark suite for generate_docs: whole builds, per-section layout and the
+drawing primitives, written to a JSON file that can be compared between commits.
+
+    python benchmarks/suite.py -o before.json                # run everything
+    python benchmarks/suite.py -o after.json --baseline before.json
+    python benchmarks/suite.py --diff before.json after.json --threshold 0.05
+    python benchmarks/suite.py --sections 100 --rows 200 --code-lines 120 --only build
+
+Cases:
+    build.cold      synthetic document, empty section cache, output to bytes
+    build.warm      the same document again, every section reused from disk
+    build.source    docs/source/architecture.md, no cache
+    section.<n>     layout of each section of architecture.md on its own
+    micro.*         table_row(), table_rows(), code_block() and multi_cell()
+    startup.*       generate_docs.py run as a command: importing it for a build,
+                    --help, check, and a build with nothing to do; each also
+                    records how many modules it imported and whether fpdf was one
+
+The synthetic document has --sections sections, each with a paragraph, a few
+bullets, a --rows row table and a --code-lines line code block. Every case
+runs --repeat times, each in a fresh interpreter; a result keeps the fastest
+time, all times, and the largest peak RSS. With a baseline, any time, peak
+memory or output size more than --threshold (default 10%) above it is
+reported and the exit status is 1.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CASES = ("build.cold", "build.warm", "build.source", "sections",
+         "micro.table_row", "micro.table_rows", "micro.code_block", "micro.multi_cell",
+         "startup.import", "startup.help", "startup.check", "startup.noop")
+# Regressions are checked on these metrics; times below MIN_TIME are noise.
+METRICS = ("time", "peak_rss_mb", "bytes")
+MIN_TIME = 0.01
+
+WIDTHS = [18, 82, 24, 24, 22]
+HEADER = ["ID", "Task", "Priority", "Status", "Due"]
+
+
+# ---- Workloads ----
+
+def make_rows(count):
+    for n in range(count):
+        yield [str(n), f"Generated task number {n} with a slightly longer description",
+               ("High", "Medium", "Low")[n % 3], "Done" if n % 4 == 0 else "Active",
+               f"2026-{n % 12 + 1:02d}-{n % 28 + 1:02d}"]
+
+
+def make_code(lines):
+    return "\n".join(
+        f"function step{n}(todos) {{ return todos.filter((t) => t.priority === \"high\" && t.id !== {n}); }}"
+        if n % 5 else f"// ===== Section {n // 5} ====="
+        for n in range(lines))
+
+
+def synthetic_document(sections, rows, code_lines):
+    from doc_model import Node, validate
+
+    children = [Node("page", {"name": "cover"}), Node("page", {"name": "contents"})]
+    for n in range(1, sections + 1):
+        children.append(Node("section", {"number": str(n), "title": f"Synthetic Section {n}"}, [
+            Node("paragraph", {"text": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 6}),
+            *(Node("bullet", {"text": f"Bullet point {b} of section {n}"}) for b in range(4)),
+            Node("table", {"columns": HEADER, "rows": list(make_rows(rows)), "widths": WIDTHS}),
+            Node("code", {"code": make_code(code_lines), "lang": "js", "title": f"Listing {n}"}),
+        ]))
+    children.append(Node("page", {"name": "back-cover"}))
+    return validate(Node("document", {"title": "Synthetic"}, children))
+
+
+def _reset_caches():
+    # Start from nothing in memory, as a new process would.
+    import excerpts
+    import highlight
+
+    excerpts.index = excerpts.SourceIndex()
+    highlight.cache = highlight.TokenCache()
+
+
+def _build(document, cache_dir):
+    import generate_docs
+
+    _reset_caches()
+    cache = generate_docs.SectionCache(cache_dir) if cache_dir else None
+    start = time.perf_counter()
+    pdf = generate_docs.build_pdf(cache, document=document)
+    data = pdf.output()
+    return {"time": time.perf_counter() - start, "pages": pdf.pages_count, "bytes": len(data)}
+
+
+def case_build_cold(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        return _build(synthetic_document(args.sections, args.rows, args.code_lines), tmp)
+
+
+def case_build_warm(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        _build(synthetic_document(args.sections, args.rows, args.code_lines), tmp)
+        return _build(synthetic_document(args.sections, args.rows, args.code_lines), tmp)
+
+
+def case_build_source(args):
+    import doc_model
+    import generate_docs
+
+    return _build(doc_model.load(generate_docs.DEFAULT_SOURCE), None)
+
+
+def case_sections(args):
+    import doc_model
+    import excerpts
+    import generate_docs
+
+    document = excerpts.resolve(doc_model.load(generate_docs.DEFAULT_SOURCE), generate_docs.ROOT)
+    results = {}
+    for index, section in enumerate(generate_docs.document_sections(document)):
+        node = section.node
+        label = node["name"] if node.kind == "page" else f"{node['number']} {node['title']}"
+        start = time.perf_counter()
+        # A section that continues mid-page is timed starting halfway down one.
+        start_y = 148 if section.continues else None
+        generate_docs.render_fragment(node, start_y, None, 0 if index == 0 else 1)
+        results[f"section.{label}"] = {"time": time.perf_counter() - start}
+    return results
+
+
+def _micro(draw):
+    import generate_docs
+
+    pdf = generate_docs.new_document()
+    pdf.add_page()
+    start = time.perf_counter()
+    draw(pdf)
+    laid_out = time.perf_counter() - start
+    data = pdf.output()
+    return {"time": laid_out, "pages": pdf.pages_count, "bytes": len(data)}
+
+
+def case_micro_table_row(args):
+    def draw(pdf):
+        pdf.table_header(HEADER, WIDTHS)
+        for i, row in enumerate(make_rows(args.rows * args.sections)):
+            pdf.table_row(row, WIDTHS, fill=i % 2 == 0)
+    return _micro(draw)
+
+
+def case_micro_table_rows(args):
+    return _micro(lambda pdf: pdf.table_rows(make_rows(args.rows * args.sections), WIDTHS, header=HEADER))
+
+
+def case_micro_code_block(args):
+    import highlight
+
+    highlight.cache = highlight.TokenCache()
+    code = make_code(args.code_lines * args.sections)
+    return _micro(lambda pdf: pdf.code_block(code, title="Listing", lang="js"))
+
+
+def case_micro_multi_cell(args):
+    def draw(pdf):
+        pdf.set_font("Helvetica", "", 10)
+        for n in range(args.rows * args.sections // 10):
+            pdf.multi_cell(0, 5, f"Paragraph {n}: " + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4,
+                           new_x="LMARGIN", new_y="NEXT")
+    return _micro(draw)
+
+
+# ---- Startup ----
+
+def _command(argv):
+    """Time a command; run it again under -X importtime to count what it imports."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + argv, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+    elapsed = time.perf_counter() - start
+    proc = subprocess.run([sys.executable, "-X", "importtime"] + argv, cwd=ROOT, check=True,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modules = [line.rsplit("|", 1)[1].strip() for line in proc.stderr.splitlines() if line.startswith("import time:")]
+    peak_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if sys.platform == "darwin":
+        peak_kb //= 1024
+    return {"time": elapsed, "modules": len(modules) - 1, "fpdf": "fpdf" in modules,
+            "peak_rss_mb": round(peak_kb / 1024, 1)}
+
+
+def case_startup_import(args):
+    return _command(["-c", "import generate_docs"])
+
+
+def case_startup_help(args):
+    return _command(["generate_docs.py", "--help"])
+
+
+def case_startup_check(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        return _command(["generate_docs.py", "check", "--cache-dir", tmp])
+
+
+def case_startup_noop(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        argv = ["generate_docs.py", "build", "--cache-dir", tmp, "-o", os.path.join(tmp, "out.pdf")]
+        subprocess.run([sys.executable] + argv, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        # Inputs written within a second of a build are checked again by the next.
+        time.sleep(1)
+        subprocess.run([sys.executable] + argv, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        # The peak would be the first build's.
+        return dict(_command(argv), peak_rss_mb=None)
+
+
+# ---- Running ----
+
+def child(case, args):
+    result = globals()["case_" + case.replace(".", "_")](args)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak_kb //= 1024
+    if case == "sections":
+        for metrics in result.values():
+            metrics["peak_rss_mb"] = None
+    else:
+        result = {case: dict({"peak_rss_mb": round(peak_kb / 1024, 1)}, **result)}
+    print(json.dumps(result))
+
+
+def knob_args(args):
+    return ["--sections", str(args.sections), "--rows", str(args.rows), "--code-lines", str(args.code_lines)]
+
+
+def run_case(case, args):
+    merged = {}
+    for _ in range(args.repeat):
+        argv = [sys.executable, __file__, "--child", case] + knob_args(args)
+        proc = subprocess.run(argv, capture_output=True, text=True)
+        if proc.returncode:
+            sys.exit(f"{case} failed:\n{proc.stderr}")
+        for name, metrics in json.loads(proc.stdout.splitlines()[-1]).items():
+            best = merged.setdefault(name, dict(metrics, times=[]))
+            best["times"].append(round(metrics["time"], 4))
+            best["time"] = min(best["times"])
+            if metrics["peak_rss_mb"] is not None:
+                best["peak_rss_mb"] = max(best["peak_rss_mb"], metrics["peak_rss_mb"])
+    return merged
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True,
+                                capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-dirty" if dirty else "")
+
+
+def metadata(args):
+    from fpdf import FPDF_VERSION
+
+    import highlight
+
+    return {
+        "commit": git_commit(),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "fpdf2": FPDF_VERSION,
+        "pygments": highlight.lexer_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "knobs": {"sections": args.sections, "rows": args.rows, "code_lines": args.code_lines,
+                  "repeat": args.repeat},
+    }
+
+
+def compare(baseline, current, threshold):
+    """Print each shared result against the baseline; return the regressions."""
+    regressions = []
+    print(f"\n{'vs ' + str(baseline['meta'].get('commit')):<44} {'time':>16} {'peak RSS':>16} {'bytes':>16}")
+    for name, new in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        cells = []
+        for metric in METRICS:
+            before, after = old.get(metric), new.get(metric)
+            if not before or after is None:
+                cells.append(f"{'':>16}")
+                continue
+            change = after / before - 1
+            flagged = change > threshold and not (metric == "time" and after < MIN_TIME)
+            if flagged:
+                regressions.append((name, metric, before, after))
+            cells.append(f"{change:>+14.1%}{' !' if flagged else '  '}")
+        print(f"{name[:44]:<44} {''.join(cells)}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {threshold:.0%}:")
+        for name, metric, before, after in regressions:
+            print(f"  {name} {metric}: {before:g} -> {after:g}")
+    return regressions
+
+
+def report(results):
+    print(f"{'case':<44} {'time':>9} {'peak RSS':>10} {'pages':>6} {'bytes':>12}")
+    for name, m in results.items():
+        rss = f"{m['peak_rss_mb']:.1f}MB" if m.get("peak_rss_mb") is not None else ""
+        print(f"{name[:44]:<44} {m['time']:>8.3f}s {rss:>10} {m.get('pages', ''):>6} {m.get('bytes', ''):>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sections", type=int, default=20, help="sections in the synthetic document")
+    parser.add_argument("--rows", type=int, default=50, help="table rows per synthetic section")
+    parser.add_argument("--code-lines", type=int, default=40, help="code lines per synthetic section")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case (fastest time is kept)")
+    parser.add_argument("--only", nargs="+", metavar="PREFIX", help="run only cases starting with PREFIX")
+    parser.add_argument("-o", "--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against an earlier results file")
+    parser.add_argument("--diff", nargs=2, metavar=("BASELINE", "RESULTS"),
+                        help="compare two results files without running anything")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative increase that counts as a regression (default 0.10)")
+    parser.add_argument("--child", choices=CASES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args)
+        return
+    if args.diff:
+        with open(args.diff[0]) as f:
+            baseline = json.load(f)
+        with open(args.diff[1]) as f:
+            current = json.load(f)
+        sys.exit(1 if compare(baseline, current, args.threshold) else 0)
+
+    results = {}
+    for case in CASES:
+        if args.only and not any(case.startswith(prefix) for prefix in args.only):
+            continue
+        print(f"running {case}...", file=sys.stderr)
+        results.update(run_case(case, args))
+    current = {"meta": metadata(args), "results": results}
+    report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+        print(f"\nResults written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(baseline, current, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
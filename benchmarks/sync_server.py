@@ -0,0 +1,104 @@
+"""
+Bytes moved per change with the sync server's operations and conditional
+fetches, against writing and fetching the whole taskflow_todos array, and
+the requests a second the server handles.
+
+    python benchmarks/sync_server.py                   # 1,000 and 10,000 tasks
+    python benchmarks/sync_server.py --tasks 100000 --requests 5000
+
+The server runs in this process, on a thread, with no data file.
+"""
+
+import argparse
+import asyncio
+import gzip
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fixtures
+import sync_server
+
+
+def start(todo_list):
+    """Serve todo_list on a free port from a background thread; return the port."""
+    ready = threading.Event()
+    port = []
+
+    async def run():
+        server = await asyncio.start_server(sync_server.SyncServer(todo_list).handle, "127.0.0.1", 0)
+        port.append(server.sockets[0].getsockname()[1])
+        ready.set()
+        await server.serve_forever()
+
+    threading.Thread(target=asyncio.run, args=(run(),), daemon=True).start()
+    ready.wait()
+    return port[0]
+
+
+class Client:
+    def __init__(self, port):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port)
+
+    def request(self, method, path, body=None, **headers):
+        """(status, payload, bytes on the wire both ways, excluding TCP)."""
+        data = json.dumps(body).encode() if body is not None else None
+        self.conn.request(method, path, body=data, headers=headers)
+        response = self.conn.getresponse()
+        raw = response.read()
+        head = sum(len(k) + len(v) + 4 for k, v in response.getheaders()) + 17
+        text = gzip.decompress(raw) if response.getheader("Content-Encoding") == "gzip" else raw
+        return response.status, json.loads(text) if text else None, len(data or b"") + len(raw) + head
+
+
+def run(count, requests):
+    todo_list = sync_server.TodoList()
+    todo_list.apply([{"op": "add", "todo": todo} for todo in fixtures.todos(count)])
+    client = Client(start(todo_list))
+    # What saveTodos() writes: JSON.stringify() leaves out the spaces.
+    array = len(json.dumps(todo_list.snapshot()["todos"], separators=(",", ":")))
+
+    version = todo_list.version
+    _, _, unchanged = client.request("GET", f"/changes?since={version}", **{"If-None-Match": f'"{version}"'})
+    op = {"op": "toggle", "id": "bench0000001", "completed": True, "at": "2025-06-01T10:00:00.000Z"}
+    _, _, push = client.request("POST", "/ops", {"ops": [op]})
+    _, _, pull = client.request("GET", f"/changes?since={version}", **{"If-None-Match": f'"{version}"'})
+    _, _, full = client.request("GET", "/todos")
+    _, _, full_gzip = client.request("GET", "/todos", **{"Accept-Encoding": "gzip"})
+
+    print(f"{count:,} tasks, {array / 1024:,.1f}KB as a JSON array")
+    print(f"  one change, whole array written      {array:>10,}B")
+    print(f"  one change, pushed as an operation   {push:>10,}B")
+    print(f"  sync, nothing new (304)              {unchanged:>10,}B")
+    print(f"  sync, one change since last          {pull:>10,}B")
+    print(f"  whole list fetched                   {full:>10,}B  ({full_gzip:,}B gzipped)")
+
+    start_time = time.perf_counter()
+    for i in range(requests):
+        op = {"op": "toggle", "id": f"bench{i % count:07d}", "at": "2025-06-01T10:00:00.000Z"}
+        client.request("POST", "/ops", {"ops": [op]})
+    pushes = requests / (time.perf_counter() - start_time)
+    version = todo_list.version
+    start_time = time.perf_counter()
+    for _ in range(requests):
+        client.request("GET", f"/changes?since={version}", **{"If-None-Match": f'"{version}"'})
+    polls = requests / (time.perf_counter() - start_time)
+    print(f"  {pushes:,.0f} operations/sec pushed, {polls:,.0f} unchanged polls/sec (one connection)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    for count in args.tasks:
+        run(count, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+TableLayout (TaskFlowDoc.table_rows) against the per-row table_header()/table_row() path.
+
+    python benchmarks/table_layout.py                  # 50,000 rows
+    python benchmarks/table_layout.py --rows 5000
+
+Reports layout time, output time, page count and uncompressed content-stream size.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generate_docs  # noqa: E402
+
+HEADER = ["ID", "Task", "Priority", "Status", "Due"]
+WIDTHS = [18, 82, 24, 24, 22]
+
+
+def make_rows(count):
+    for n in range(count):
+        yield [str(n), f"Generated task number {n}", ("High", "Medium", "Low")[n % 3],
+               "Done" if n % 4 == 0 else "Active", f"2026-{n % 12 + 1:02d}-{n % 28 + 1:02d}"]
+
+
+def per_row(pdf, count):
+    pdf.table_header(HEADER, WIDTHS)
+    for i, row in enumerate(make_rows(count)):
+        pdf.table_row(row, WIDTHS, fill=i % 2 == 0)
+
+
+def table_layout(pdf, count):
+    pdf.table_rows(make_rows(count), WIDTHS, header=HEADER)
+
+
+def table_layout_auto(pdf, count):
+    pdf.table_rows(make_rows(count), header=HEADER)
+
+
+def run(layout, count):
+    pdf = generate_docs.new_document()
+    pdf.set_compression(False)
+    pdf.add_page()
+    start = time.perf_counter()
+    layout(pdf, count)
+    laid_out = time.perf_counter()
+    content = sum(len(pdf.pages[n].contents) for n in pdf.pages)
+    pdf.output()
+    return laid_out - start, time.perf_counter() - laid_out, pdf.pages_count, content
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    print(f"{args.rows:,} rows")
+    print(f"{'path':<20} {'layout':>9} {'output':>9} {'pages':>6} {'content':>10}")
+    for name, layout in (("table_row()", per_row), ("table_rows()", table_layout),
+                         ("table_rows() auto", table_layout_auto)):
+        layout_s, output_s, pages, content = run(layout, args.rows)
+        print(f"{name:<20} {layout_s:>8.2f}s {output_s:>8.2f}s {pages:>6} {content / 1024 / 1024:>8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Time and peak memory of the task-report appendix for a synthetic export.
+
+    python benchmarks/task_report.py                   # 1,000 and 100,000 tasks
+    python benchmarks/task_report.py --tasks 250000
+
+Each build runs in a fresh interpreter with --stream, so ru_maxrss reflects
+that build alone.
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fixtures
+
+
+def child(export):
+    import doc_model
+    import generate_docs
+    import variants
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        document = variants.add_task_report(doc_model.load(variants.DEFAULT_SOURCE), export)
+        pdf = generate_docs.build_pdf(document=document, stream=True)
+        pdf.output(os.path.join(tmp, "out.pdf"))
+        elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak_kb //= 1024
+    print(peak_kb, elapsed, pdf.pages_count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+        return
+
+    print(f"{'tasks':>8} {'export':>9} {'pages':>6} {'peak RSS':>10} {'time':>8}")
+    for count in args.tasks:
+        with tempfile.TemporaryDirectory() as tmp:
+            export = os.path.join(tmp, "todos.json")
+            fixtures.write_export(export, fixtures.todos(count))
+            size = os.path.getsize(export)
+            out = subprocess.run([sys.executable, __file__, "--child", export],
+                                 check=True, capture_output=True, text=True).stdout
+        peak_kb, elapsed, pages = out.split()
+        print(f"{count:>8,} {size / 1024 / 1024:>7.1f}MB {int(pages):>6} "
+              f"{int(peak_kb) / 1024:>8.1f}MB {float(elapsed):>7.1f}s")
+
+
+if __name__ == "__main__":
+    main()
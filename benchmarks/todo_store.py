@@ -0,0 +1,86 @@
+"""
+Memory and speed of TodoStore against plain dicts for the same todos.
+
+    python benchmarks/todo_store.py                    # 1,000,000 tasks
+    python benchmarks/todo_store.py --tasks 10000 100000
+
+The dicts are what json.load() makes of an export, indexed by id so both can
+look a todo up; the store's id index is a dict as well, and counts towards
+its memory. Each is built in a fresh interpreter, so the growth of
+ru_maxrss is the memory the todos take.
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fixtures
+
+LOOKUPS = 100000
+
+
+def rss_kb():
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_kb // 1024 if sys.platform == "darwin" else peak_kb
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def child(kind, count):
+    import todo_store
+
+    ids = [todo["id"] for todo in fixtures.todos(min(count, LOOKUPS))]
+    before = rss_kb()
+    start = time.perf_counter()
+    if kind == "dicts":
+        by_id = {todo["id"]: todo for todo in fixtures.todos(count)}
+        build = time.perf_counter() - start
+        grown = rss_kb() - before
+        _, lookup = timed(lambda: [by_id[id] for id in ids])
+        _, count_open = timed(lambda: sum(1 for t in by_id.values() if t["priority"] == "high" and not t["completed"]))
+        _, scan = timed(lambda: sum(len(t["text"]) for t in by_id.values()))
+    else:
+        store = todo_store.TodoStore()
+        store.extend(fixtures.todos(count))
+        build = time.perf_counter() - start
+        grown = rss_kb() - before
+        _, lookup = timed(lambda: [store.row(id) for id in ids])
+        _, count_open = timed(lambda: store.count(completed=False, priority="high"))
+        _, scan = timed(lambda: sum(len(cursor.text_bytes) for cursor in store.scan()))
+    print(grown, build, lookup, count_open, scan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, nargs="+", default=[1000000])
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child[0], int(args.child[1]))
+        return
+
+    print(f"{'tasks':>9} {'kind':<6} {'memory':>9} {'per task':>9} {'build':>7} "
+          f"{'lookups':>8} {'filter':>8} {'scan':>8}")
+    for count in args.tasks:
+        for kind in ("dicts", "store"):
+            out = subprocess.run([sys.executable, __file__, "--child", kind, str(count)],
+                                 check=True, capture_output=True, text=True).stdout
+            grown, build, lookup, count_open, scan = out.split()
+            print(f"{count:>9,} {kind:<6} {int(grown) / 1024:>7.1f}MB {int(grown) * 1024 / count:>7.0f}B "
+                  f"{float(build):>6.1f}s {float(lookup) * 1000:>6.0f}ms {float(count_open) * 1000:>6.0f}ms "
+                  f"{float(scan) * 1000:>6.0f}ms")
+    print(f"(build includes generating the todos; lookups: {LOOKUPS:,} ids; filter: open high-priority tasks; "
+          f"scan: total text length)")
+
+
+if __name__ == "__main__":
+    main()
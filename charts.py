@@ -0,0 +1,243 @@
+"""
+TaskFlow Charts
+The dashboard's charts (section 10 of the architecture docs) as PDF vector
+paths: bar, doughnut and line charts drawn from aggregates, a label and a
+value per bar, slice or point, however many tasks are behind them.
+
+layout() returns the shapes of a chart as content-stream bytes in a space of
+its own, for TaskFlowDoc.chart() to wrap in a Form XObject, and its text as
+labels to set around them, in the document's fonts. Layouts are cached, so a
+chart repeated across documents (variants, themes, one report per user) is
+worked out once.
+
+Nothing here imports fpdf.
+"""
+
+from collections import namedtuple
+import functools
+import math
+
+KINDS = ("bar", "doughnut", "line")
+
+PT = 72 / 25.4
+LABEL_H = 4
+# From the Chart.js options in js/app.js (initCharts), in mm.
+BAR_RADIUS = 2.1        # borderRadius: 8
+BAR_MAX_WIDTH = 8.5     # maxBarThickness: 32
+DOUGHNUT_CUTOUT = 0.72  # cutout: "72%"
+DOUGHNUT_SPACING = 0.8  # spacing: 3
+# Slices take these theme colors in turn: completed, pending, then the rest.
+SLICE_ROLES = ("SUCCESS", "WARNING", "INDIGO", "ACCENT", "DANGER", "INDIGO_DARK")
+MAX_X_LABELS = 12
+# Bezier control-point distance that approximates a quarter circle.
+KAPPA = 0.5523
+
+# width, height: the chart's box in pt; shapes draw in it with the origin at
+#   its bottom-left corner.
+# labels: [(x, y, w, text, align, role)], cells LABEL_H high, in mm from the
+#   box's top-left corner, drawn in the theme color named by role.
+Chart = namedtuple("Chart", "width height shapes labels")
+
+
+class ChartError(ValueError):
+    pass
+
+
+@functools.lru_cache(maxsize=256)
+def layout(kind, labels, values, width, height, colors):
+    """Lay out a chart width x height mm. labels and values are tuples of the
+    same length; colors is a theme's colors as a tuple of (role, rgb) items."""
+    if kind not in KINDS:
+        raise ChartError(f"unknown chart type {kind!r} (expected one of {', '.join(KINDS)})")
+    if len(labels) != len(values):
+        raise ChartError(f"a chart needs one value per label, got {len(labels)} labels and {len(values)} values")
+    if any(value < 0 for value in values):
+        raise ChartError("chart values can't be negative")
+    canvas = _Canvas(dict(colors))
+    text = DRAW[kind](canvas, labels, values, width, height)
+    return Chart(round(width * PT, 2), round(height * PT, 2), canvas.bytes(), tuple(text))
+
+
+def scale(top):
+    """(step, maximum) for a value axis up to top: a step of 1, 2 or 5 times a
+    power of ten leaving at most five gridlines (whole steps, like stepSize: 1,
+    as long as top is at least 1)."""
+    if top <= 0:
+        return 1, 1
+    for exponent in range(math.floor(math.log10(top)) - 1, 20):
+        for mantissa in (1, 2, 5):
+            step = mantissa * 10 ** exponent
+            if math.ceil(top / step - 1e-9) <= 5:
+                return step, step * math.ceil(top / step - 1e-9)
+
+
+def number(value):
+    return f"{value:,.0f}" if value == int(value) else f"{value:,.1f}"
+
+
+class _Canvas:
+    """Content-stream operators for shapes given in mm, y up from the bottom."""
+
+    def __init__(self, colors):
+        self.colors = colors
+        self.ops = []
+        self.state = {}
+
+    def bytes(self):
+        return "\n".join(self.ops).encode("latin-1")
+
+    def _set(self, operator, value):
+        if self.state.get(operator) != value:
+            self.state[operator] = value
+            self.ops.append(value)
+
+    def fill(self, role):
+        self._set("rg", "%.3f %.3f %.3f rg" % tuple(c / 255 for c in self.colors[role]))
+
+    def stroke(self, role, width):
+        self._set("RG", "%.3f %.3f %.3f RG" % tuple(c / 255 for c in self.colors[role]))
+        self._set("w", "%.2f w" % width)
+
+    def move(self, x, y):
+        self.ops.append("%.2f %.2f m" % (x * PT, y * PT))
+
+    def line(self, x, y):
+        self.ops.append("%.2f %.2f l" % (x * PT, y * PT))
+
+    def curve(self, x1, y1, x2, y2, x3, y3):
+        self.ops.append("%.2f %.2f %.2f %.2f %.2f %.2f c" % tuple(v * PT for v in (x1, y1, x2, y2, x3, y3)))
+
+    def arc(self, cx, cy, r, start, end):
+        # Bezier pieces of at most a quarter turn each; angles in radians,
+        # counterclockwise, so end < start goes clockwise.
+        pieces = max(1, math.ceil(abs(end - start) / (math.pi / 2) - 1e-9))
+        step = (end - start) / pieces
+        k = 4 / 3 * math.tan(step / 4) * r
+        for i in range(pieces):
+            a, b = start + i * step, start + (i + 1) * step
+            self.curve(cx + r * math.cos(a) - k * math.sin(a), cy + r * math.sin(a) + k * math.cos(a),
+                       cx + r * math.cos(b) + k * math.sin(b), cy + r * math.sin(b) - k * math.cos(b),
+                       cx + r * math.cos(b), cy + r * math.sin(b))
+
+    def rounded_rect(self, x, y, w, h, r):
+        c = r * (1 - KAPPA)
+        self.move(x + r, y)
+        self.line(x + w - r, y)
+        self.curve(x + w - c, y, x + w, y + c, x + w, y + r)
+        self.line(x + w, y + h - r)
+        self.curve(x + w, y + h - c, x + w - c, y + h, x + w - r, y + h)
+        self.line(x + r, y + h)
+        self.curve(x + c, y + h, x, y + h - c, x, y + h - r)
+        self.line(x, y + r)
+        self.curve(x, y + c, x + c, y, x + r, y)
+
+    def paint(self, operator):
+        self.ops.append(operator)
+
+
+# ---- Chart types ----
+#
+# Each draws on the canvas and returns the labels. The bar and line charts
+# share their axes: gridlines with the value of each step to the left, and
+# the labels under their bar or point.
+
+AXIS_W = 10
+AXIS_BOTTOM = 6
+AXIS_TOP = 2
+
+
+def _axes(canvas, labels, values, width, height):
+    step, top = scale(max(values, default=0))
+    plot_w, plot_h = width - AXIS_W, height - AXIS_BOTTOM - AXIS_TOP
+    text = []
+    canvas.stroke("GRAY_200", 0.5)
+    ticks = round(top / step)
+    for i in range(ticks + 1):
+        y = AXIS_BOTTOM + plot_h * i / ticks
+        canvas.move(AXIS_W, y)
+        canvas.line(width, y)
+        text.append((0, height - y - LABEL_H / 2, AXIS_W - 2, number(step * i), "R", "GRAY_500"))
+    canvas.paint("S")
+    slot = plot_w / max(len(values), 1)
+    centers = [AXIS_W + slot * (i + 0.5) for i in range(len(values))]
+    # Past MAX_X_LABELS, only every so many points gets its label.
+    every = math.ceil(len(labels) / MAX_X_LABELS)
+    for i, label in enumerate(labels):
+        if i % every == 0:
+            text.append((centers[i] - slot * every / 2, height - AXIS_BOTTOM + 1, slot * every, str(label), "C",
+                         "GRAY_500"))
+    # x of the middle of each slot, and the height of a value.
+    return centers, plot_h / top, slot, text
+
+
+def _bar(canvas, labels, values, width, height):
+    centers, unit, slot, text = _axes(canvas, labels, values, width, height)
+    bar_w = min(slot * 0.6, BAR_MAX_WIDTH)
+    canvas.fill("INDIGO")
+    canvas.stroke("INDIGO", 1)
+    for x, value in zip(centers, values):
+        h = value * unit
+        if h > 0:
+            canvas.rounded_rect(x - bar_w / 2, AXIS_BOTTOM, bar_w, h, min(BAR_RADIUS, bar_w / 2, h / 2))
+            canvas.paint("B")
+    return text
+
+
+def _line(canvas, labels, values, width, height):
+    centers, unit, _, text = _axes(canvas, labels, values, width, height)
+    points = [(x, AXIS_BOTTOM + value * unit) for x, value in zip(centers, values)]
+    if points:
+        canvas.stroke("INDIGO", 1.5)
+        canvas.move(*points[0])
+        for point in points[1:]:
+            canvas.line(*point)
+        canvas.paint("S")
+        canvas.fill("INDIGO")
+        for x, y in points:
+            canvas.move(x + 0.9, y)
+            canvas.arc(x, y, 0.9, 0, 2 * math.pi)
+            canvas.paint("f")
+    return text
+
+
+def _doughnut(canvas, labels, values, width, height):
+    r = height / 2 - 1
+    cx, cy = r + 1, height / 2
+    total = sum(values)
+    if total:
+        slices = [(label, value, SLICE_ROLES[i % len(SLICE_ROLES)]) for i, (label, value) in enumerate(zip(labels, values))]
+    else:
+        slices = [("No tasks", 1, "GRAY_200")]
+    shown = [s for s in slices if s[1]]
+    # Chart.js starts at twelve o'clock and goes clockwise.
+    gap = DOUGHNUT_SPACING / r if len(shown) > 1 else 0
+    start = math.pi / 2
+    inner = r * DOUGHNUT_CUTOUT
+    for _, value, role in shown:
+        sweep = 2 * math.pi * value / (total or 1)
+        a, b = start - gap / 2, start - sweep + gap / 2
+        start -= sweep
+        if b >= a:
+            continue
+        canvas.fill(role)
+        canvas.move(cx + r * math.cos(a), cy + r * math.sin(a))
+        canvas.arc(cx, cy, r, a, b)
+        canvas.line(cx + inner * math.cos(b), cy + inner * math.sin(b))
+        canvas.arc(cx, cy, inner, b, a)
+        canvas.paint("h f")
+    # Legend: a dot and a line of text per slice, centered beside the ring.
+    text = []
+    x = 2 * r + 10
+    top = (height - len(slices) * (LABEL_H + 1)) / 2
+    for i, (label, value, role) in enumerate(slices):
+        y = top + i * (LABEL_H + 1)
+        canvas.fill(role)
+        canvas.move(x + 1.2, height - y - LABEL_H / 2)
+        canvas.arc(x, height - y - LABEL_H / 2, 1.2, 0, 2 * math.pi)
+        canvas.paint("f")
+        caption = f"{label}: {number(value)} ({round(100 * value / total)}%)" if total else label
+        text.append((x + 3, y, width - x - 3, caption, "L", "GRAY_700"))
+    return text
+
+
+DRAW = {"bar": _bar, "doughnut": _doughnut, "line": _line}
@@ -0,0 +1,430 @@
+"""
+TaskFlow Docs Command Line
+What `python generate_docs.py` runs:
+
+    build [options]       lay out and write the docs (the command when none is given)
+    check [options]       check the sources and whether the output is up to date
+    watch [options]       build, then rebuild whenever an input changes
+    benchmark [options]   run benchmarks/suite.py
+
+Starting is kept cheap. fpdf (with fontTools and numpy) and the layout code
+take most of a second to import, several times what a cached build then
+needs, so nothing here imports them until a command is sure to build.
+Each build stamps the files it was made from (see BuildStamps), and the next
+build with the same options compares them, by size and mtime and by content
+where those differ, before importing anything: when nothing changed, it's
+done in a few milliseconds.
+"""
+
+import argparse
+import contextlib
+import datetime
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import time
+
+import excerpts
+import task_report
+import themes
+import variants
+
+ROOT = variants.ROOT
+
+
+# ---- Build stamps ----
+
+# Bump when the stamp format changes.
+STAMP_VERSION = 1
+# Files modified this soon before a build started may have been written to
+# while it read them (mtimes lag the clock by up to a timer tick), so their
+# content isn't stamped and the next build makes sure.
+RACY_NS = 1_000_000_000
+# Packages whose installed version shapes the output. Their files are found,
+# not imported, and stamped by size and mtime, which an upgrade changes.
+PACKAGES = ("fpdf", "fontTools", "pygments")
+
+
+def environment():
+    """What, beyond its input files, a build's output depends on."""
+    env = {
+        "python": sys.version,
+        # The date printed in the document.
+        "date": os.environ.get("SOURCE_DATE_EPOCH") or datetime.date.today().isoformat(),
+    }
+    for name in PACKAGES:
+        spec = importlib.util.find_spec(name)
+        origin = spec.origin if spec is not None else None
+        env[name] = origin and file_stamp(origin, digest=False)
+    return env
+
+
+def file_stamp(path, digest=True):
+    """[size, mtime_ns, SHA-256] of a file (without the hash unless digest),
+    or None when there's no such file."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns, file_digest(path) if digest else None]
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildStamps:
+    """The inputs and outputs of the last build made with each set of options,
+    one JSON file per set in a directory next to the section cache."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _file(self, variant):
+        options = json.dumps(variant._asdict(), sort_keys=True)
+        return os.path.join(self.path, hashlib.sha256(options.encode("utf-8")).hexdigest()[:32] + ".json")
+
+    def _write(self, variant, stamp):
+        os.makedirs(self.path, exist_ok=True)
+        path = self._file(variant)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(stamp, f, indent=1)
+        os.replace(path + ".tmp", path)
+
+    def compare(self, variant):
+        """(why variant must be built again, {output: SHA-256}); nothing needs
+        building when the first is empty."""
+        try:
+            with open(self._file(variant), encoding="utf-8") as f:
+                stamp = json.load(f)
+        except (OSError, ValueError):
+            return ["not built with these options yet"], {}
+        if stamp.get("version") != STAMP_VERSION:
+            return ["built by an older generator"], {}
+        if stamp["environment"] != environment():
+            return ["Python, fpdf2, fontTools, Pygments or the date changed"], {}
+        changes, touched = [], False
+        for path, recorded in stamp["inputs"].items():
+            now = file_stamp(path, digest=False)
+            if now is None or recorded is None:
+                if now is not recorded:
+                    changes.append(os.path.relpath(path) + (" was deleted" if now is None else " was created"))
+                continue
+            # Written to around when the build read it: what it holds may not be what was built.
+            if recorded[2] is None:
+                changes.append(os.path.relpath(path))
+            elif now[:2] == recorded[:2]:
+                continue
+            elif file_digest(path) == recorded[2]:
+                recorded[:2] = now[:2]  # touched (say by a checkout) but the same
+                touched = True
+            else:
+                changes.append(os.path.relpath(path))
+        for path, recorded in stamp["outputs"].items():
+            now = file_stamp(path, digest=False)
+            if now is None or now[:2] != recorded[:2]:
+                changes.append(os.path.relpath(path) + " was " + ("deleted" if now is None else "rewritten"))
+        if touched and not changes:
+            self._write(variant, stamp)
+        return changes, {path: recorded[2] for path, recorded in stamp["outputs"].items()}
+
+    def record(self, variant, inputs, outputs, started):
+        """Stamp a build that began at started (time.time_ns()) from inputs and
+        wrote outputs ({path: SHA-256})."""
+        stamp = {"version": STAMP_VERSION, "options": variant._asdict(), "environment": environment(),
+                 "inputs": {}, "outputs": {}}
+        for path in inputs:
+            recorded = file_stamp(path, digest=False)
+            if recorded is not None and recorded[1] < started - RACY_NS:
+                recorded[2] = file_digest(path)
+            stamp["inputs"][path] = recorded
+        for path, digest in outputs.items():
+            stamp["outputs"][path] = file_stamp(path, digest=False)[:2] + [digest]
+        self._write(variant, stamp)
+
+
+def build_stamps(args):
+    return None if args.no_cache else BuildStamps(os.path.join(args.cache_dir, "builds"))
+
+
+# ---- Options ----
+
+# The built docs, left out when dating a build by its last commit, so that
+# committing a rebuilt PDF doesn't change the date the next build gets.
+BUILT_DOCS = ":(exclude,glob)docs/TaskFlow_Architecture*"
+
+
+def last_commit_time(path=ROOT):
+    """The committer time of the last commit that changed anything but the
+    built docs, as a SOURCE_DATE_EPOCH value, or None outside a git checkout."""
+    import subprocess
+
+    try:
+        return subprocess.run(["git", "log", "-1", "--format=%ct", "--", ".", BUILT_DOCS], cwd=path, check=True,
+                              capture_output=True, text=True).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def set_build_time(args, parser):
+    """Check SOURCE_DATE_EPOCH, setting it for --reproducible if it isn't set."""
+    if args.reproducible and not os.environ.get("SOURCE_DATE_EPOCH"):
+        epoch = last_commit_time()
+        if epoch is None:
+            parser.error("--reproducible needs SOURCE_DATE_EPOCH outside a git checkout")
+        os.environ["SOURCE_DATE_EPOCH"] = epoch
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if epoch and not epoch.isdigit():
+        parser.error(f"SOURCE_DATE_EPOCH should be a whole number of seconds, got {epoch!r}")
+
+
+def document_variant(args, parser):
+    """The Variant the document options describe."""
+    try:
+        formats = variants.parse_formats(args.format)
+    except ValueError as e:
+        parser.error(str(e))
+    return variants.Variant("default", os.path.abspath(args.output), args.source, args.todos, tuple(args.listing),
+                            args.fonts, getattr(args, "stream", False), args.theme, formats)
+
+
+def check_batch_options(args, parser):
+    if args.todos or args.listing or getattr(args, "stream", False) or args.fonts \
+            or getattr(args, "profile", False) or getattr(args, "trace", None) \
+            or args.source != variants.DEFAULT_SOURCE or args.output != variants.DEFAULT_OUTPUT \
+            or args.theme != "light" or args.format != "pdf":
+        parser.error("with --batch, document options are set per variant in the manifest")
+
+
+def load_manifest(args, parser):
+    try:
+        return variants.load_manifest(args.batch)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+
+# ---- Commands ----
+
+def command_build(args, parser):
+    set_build_time(args, parser)
+    stamps = build_stamps(args)
+    # A profile is of a build, so always make one.
+    skip = stamps is not None and not (args.force or args.profile or args.trace)
+    if args.batch:
+        check_batch_options(args, parser)
+        batch = load_manifest(args, parser)
+        if skip and not any(stamps.compare(variant)[0] for variant in batch):
+            print(f"{len(batch)} variants up to date (--force to rebuild)")
+            return 0
+    else:
+        variant = document_variant(args, parser)
+        if skip:
+            changes, outputs = stamps.compare(variant)
+            if not changes:
+                for path, digest in outputs.items():
+                    print(f"Up to date: {path}")
+                    print(f"SHA-256: {digest}")
+                return 0
+
+    # Only now is there layout to do.
+    import generate_docs
+
+    started = time.time_ns()
+    cache = None if args.no_cache else generate_docs.SectionCache(args.cache_dir)
+    workers = args.jobs or os.cpu_count()
+    if args.batch:
+        if cache is None:
+            cache = generate_docs.SectionCache()
+        start = time.perf_counter()
+        results = generate_docs.build_batch(batch, cache, workers=workers)
+        batch_report(results, time.perf_counter() - start, cache)
+        if stamps is not None:
+            for variant, result in zip(batch, results):
+                stamps.record(variant, result["inputs"], result["outputs"], started)
+        return 0
+
+    try:
+        document, font_files, theme = generate_docs.load_variant(variant)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+    profiler = generate_docs.Profiler() if args.profile or args.trace else None
+    phase = profiler.phase if profiler else lambda name: contextlib.nullcontext()
+    out_path = variant.output
+    outputs = {}
+    if "pdf" in variant.formats:
+        with phase("build"):
+            pdf = generate_docs.build_pdf(cache, workers=workers, document=document,
+                                          stream=variant.stream, hooks=[profiler] if profiler else (),
+                                          font_files=font_files, theme=theme)
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        with phase("output"):
+            pdf.output(out_path)
+        generate_docs.write_digest(out_path, pdf.sha256)
+        outputs[out_path] = pdf.sha256
+        print(f"PDF generated successfully: {out_path}")
+        print(f"Total pages: {pdf.page_no()}")
+        print(f"SHA-256: {pdf.sha256}")
+        if cache is not None:
+            cache.prune(pdf.section_keys)
+            print(f"Sections: {cache.hits} reused, {cache.misses} rendered")
+    if variant.formats != ("pdf",):
+        with phase("export"):
+            generate_docs.use_cache_dir(cache)
+            generate_docs.excerpts.resolve(document, ROOT)
+            digests = generate_docs.export_formats(document, out_path, variant.formats, generate_docs.build_date())
+        for path, digest in digests.items():
+            print(f"{os.path.splitext(path)[1][1:].upper()} generated: {path}")
+            print(f"SHA-256: {digest}")
+        outputs.update(digests)
+    if profiler:
+        profiler.report()
+    if args.trace:
+        profiler.write_trace(args.trace)
+        print(f"Trace written to {args.trace}")
+    if stamps is not None:
+        stamps.record(variant, generate_docs.variant_inputs(variant, document, font_files), outputs, started)
+    return 0
+
+
+def batch_report(results, elapsed, cache, out=None):
+    print(f"{'variant':<24} {'pages':>5} {'load':>8} {'layout':>8} {'write':>8} {'sections':>18}  output", file=out)
+    for r in results:
+        sections = f"{r['reused']} reused, {r['rendered']} new"
+        print(f"{r['name'][:24]:<24} {r['pages'] or '-':>5} {r['load']:>7.3f}s {r['layout']:>7.3f}s {r['write']:>7.3f}s "
+              f"{sections:>18}  {', '.join(os.path.relpath(path) for path in r['outputs'])}", file=out)
+    print(f"{len(results)} variants in {elapsed:.3f}s, {cache.misses} sections laid out", file=out)
+
+
+def command_check(args, parser):
+    """Load and validate each variant's sources as a build would, short of
+    laying them out; exit status 1 when any has a problem."""
+    if args.batch:
+        check_batch_options(args, parser)
+        batch = load_manifest(args, parser)
+    else:
+        batch = [document_variant(args, parser)]
+    stamps = build_stamps(args)
+    excerpts.index.path = stamps and os.path.join(args.cache_dir, "symbols")
+    failed = 0
+    for variant in batch:
+        label = variant.name if args.batch else os.path.relpath(variant.source)
+        try:
+            document = variants.load_document(variant)
+            excerpts.resolve(document, ROOT)
+            themes.load(variant.theme)
+            if variant.fonts not in (None, "system") and not os.path.isdir(variant.fonts):
+                raise FileNotFoundError(f"font directory {variant.fonts} doesn't exist")
+            tasks = task_report.TaskStats.from_export(variant.todos).total if variant.todos else None
+        except (OSError, ValueError) as e:
+            print(f"{label}: {e}")
+            failed += 1
+            continue
+        sections = sum(1 for node in document.children if node.kind == "section")
+        refs = sum(1 for node in document.walk() if node.kind == "code" and "ref" in node.attrs)
+        print(f"{label}: OK, {sections} sections, {refs} excerpts" + (f", {tasks:,} tasks" if tasks is not None else ""))
+        if stamps is not None:
+            changes, _ = stamps.compare(variant)
+            if changes:
+                print("  out of date: " + "; ".join(changes[:5]) + (f" and {len(changes) - 5} more"
+                                                                    if len(changes) > 5 else ""))
+            else:
+                print("  up to date: " + ", ".join(os.path.relpath(path) for path in variants.output_paths(variant)))
+    return 1 if failed else 0
+
+
+def command_watch(args, parser):
+    set_build_time(args, parser)
+    variant = document_variant(args, parser)
+
+    import generate_docs
+
+    cache_dir = None if args.no_cache else args.cache_dir
+    generate_docs.watch_variant(variant, generate_docs.SectionCache(cache_dir))
+    return 0
+
+
+def command_benchmark(argv):
+    import subprocess
+
+    suite = os.path.join(ROOT, "benchmarks", "suite.py")
+    return subprocess.run([sys.executable, suite] + argv).returncode
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(prog="generate_docs.py", description="Build the TaskFlow architecture docs.",
+                                     epilog="Without a command, the options are build's.")
+    document = argparse.ArgumentParser(add_help=False)
+    document.add_argument("--source", default=variants.DEFAULT_SOURCE,
+                          help="document to render (.md, or .yaml/.json in the doc_model schema)")
+    document.add_argument("-o", "--output", default=variants.DEFAULT_OUTPUT,
+                          help="the PDF to write; other formats take its name with their own extension")
+    document.add_argument("--todos", metavar="EXPORT",
+                          help="append a task report built from an exported taskflow_todos JSON file")
+    document.add_argument("--listing", metavar="FILE", action="append", default=[],
+                          help="append the full text of FILE as a source listing (repeatable)")
+    document.add_argument("--format", default="pdf", metavar="FORMATS",
+                          help="comma-separated output formats: pdf, html (a single searchable page) and md, "
+                               "all rendered from one load of the source (default pdf)")
+    document.add_argument("--fonts", metavar="DIR",
+                          help="set text in the DejaVu or Noto fonts found in DIR ('system' to search the usual "
+                               "font directories) instead of the Latin-1-only core fonts")
+    document.add_argument("--theme", choices=themes.THEMES, default="light",
+                          help="color theme, from the design tokens in css/style.css (default light)")
+    cache = argparse.ArgumentParser(add_help=False)
+    cache.add_argument("--cache-dir", default=os.path.join(ROOT, ".doc_cache"),
+                       help="where rendered sections and build stamps are kept between runs")
+    cache.add_argument("--no-cache", action="store_true",
+                       help="lay out every section from scratch, and always build")
+    building = argparse.ArgumentParser(add_help=False)
+    building.add_argument("--stream", action="store_true",
+                          help="spool finished pages to a temporary file and stream the PDF to disk")
+    building.add_argument("--reproducible", action="store_true",
+                          help="date the PDF by SOURCE_DATE_EPOCH (when unset, the last commit that changed more "
+                               "than the built docs) so identical inputs give a byte-identical file, and write its "
+                               "SHA-256 to <output>.sha256")
+
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    build = commands.add_parser("build", parents=[document, cache, building], help="build the docs (default)",
+                                description="Build the docs, unless the last build with the same options "
+                                            "was made from the same files.")
+    build.add_argument("-j", "--jobs", type=int, default=1,
+                       help="render sections (or with --batch, variants) in this many processes (0 = one per CPU)")
+    build.add_argument("--batch", metavar="MANIFEST",
+                       help="build every variant listed in a JSON/YAML manifest in one process, sharing "
+                            "the section cache (see variants.py)")
+    build.add_argument("--force", action="store_true", help="build even if the output is up to date")
+    build.add_argument("--profile", action="store_true",
+                       help="print time, pages, bytes and state changes per section, slowest first")
+    build.add_argument("--trace", metavar="FILE",
+                       help="write a Chrome trace-event JSON of the build to FILE (implies --profile)")
+    build.set_defaults(run=command_build, parser=build)
+    check = commands.add_parser("check", parents=[document, cache], help="check the sources without building",
+                                description="Load and validate the document, its excerpts, task export and "
+                                            "theme, and say whether the output is up to date, without "
+                                            "importing the layout code. Exits 1 on any problem.")
+    check.add_argument("--batch", metavar="MANIFEST", help="check every variant listed in a manifest")
+    check.set_defaults(run=command_check, parser=check)
+    watch = commands.add_parser("watch", parents=[document, cache, building], help="rebuild on every change",
+                                description="Build, then rebuild whenever the source, the files it quotes or "
+                                            "the generator change, laying out only the sections affected "
+                                            "(see WATCH MODE in generate_docs.py).")
+    watch.set_defaults(run=command_watch, parser=watch)
+    commands.add_parser("benchmark", add_help=False, help="run benchmarks/suite.py with the options that follow")
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0].startswith("-") and argv[0] not in ("-h", "--help"):
+        argv.insert(0, "build")
+    if argv[0] == "benchmark":
+        # Every option after it is the suite's.
+        return command_benchmark(argv[1:])
+    args = make_parser().parse_args(argv)
+    return args.run(args, args.parser)
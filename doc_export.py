@@ -0,0 +1,459 @@
+"""
+TaskFlow HTML and Markdown Export
+Renders the document model to a single-page HTML file, to read next to the
+app in a browser, or to Markdown. Both take the same tree generate_docs.py
+lays out as a PDF, appendices added and excerpts resolved, so a build that
+produces several formats loads and resolves the content once.
+
+Output is written as it is produced, node by node and table row by table
+row, so a task report streams from the export straight to disk. The HTML page
+is self-contained: its colors are the app's light and dark design tokens (see
+themes.py), following the reader's color scheme, and a search box narrows the
+page down to the sections that mention what is typed.
+"""
+
+from collections import Counter
+import datetime
+import hashlib
+import html
+import os
+import re
+
+import charts
+import doc_model
+import highlight
+import task_report
+import themes
+
+HEADING_CHARS_RE = re.compile(r"[^\w\- ]")
+# Characters Markdown would otherwise read as markup; text is meant literally.
+MARKDOWN_SPECIAL_RE = re.compile(r"([\\`*_\[\]<>])")
+ALIGN_CLASSES = {"C": "c", "R": "r"}
+MARKDOWN_ALIGNS = {"L": ":---", "C": ":---:", "R": "---:"}
+INFO_ALERTS = {color: name for name, color in doc_model.INFO_COLORS.items()}
+
+
+def slug(title):
+    """The anchor GitHub gives a heading."""
+    return HEADING_CHARS_RE.sub("", title.lower()).replace(" ", "-")
+
+
+def headings(document):
+    """Yield (level, text, node) for the sections and subsections of a
+    document, and the task reports among its pages, in order."""
+    for node in document.children:
+        if node.kind == "section":
+            yield 0, f"{node['number']}. {node['title']}", node
+            for child in node.children:
+                if child.kind == "subsection":
+                    yield 1, child["title"], child
+        elif node.kind == "page" and node["name"] == "task-report":
+            yield 0, f"{node.get('number', 'A')}. Task Report", node
+
+
+class Writer:
+    """Writes a document out node by node; subclasses handle each kind of node
+    (_render_<kind>) and special page (_page_<name>). sha256 hashes the output."""
+
+    def __init__(self, file, generated_on=None):
+        self.file = file
+        self.generated_on = generated_on or datetime.date.today()
+        self.sha256 = hashlib.sha256()
+        self.anchors = {}       # id(node) -> anchor
+        self._used = Counter()  # anchor -> times given out
+        self._list_depth = 0
+
+    def write(self, text):
+        data = text.encode("utf-8")
+        self.file.write(data)
+        self.sha256.update(data)
+
+    def anchor(self, node, text):
+        """node's anchor, made unique the way GitHub does on first request."""
+        anchor = self.anchors.get(id(node))
+        if anchor is None:
+            base = slug(text)
+            count = self._used[base]
+            self._used[base] += 1
+            anchor = self.anchors[id(node)] = base if not count else f"{base}-{count}"
+        return anchor
+
+    def render(self, document):
+        self.document = document
+        # Anchors are handed out up front, so the contents can link ahead.
+        for _, text, node in headings(document):
+            self.anchor(node, text)
+        self.begin(document)
+        self.render_node(document)
+        self.end_list()
+        self.end(document)
+
+    def render_node(self, node):
+        if node.kind != "bullet":
+            self.end_list()
+        getattr(self, "_render_" + node.kind)(node)
+
+    def _render_children(self, node):
+        for child in node.children:
+            self.render_node(child)
+
+    def _render_document(self, node):
+        self._render_children(node)
+
+    def _render_page(self, node):
+        getattr(self, "_page_" + node["name"].replace("-", "_"))(node)
+
+    def _page_task_report(self, node):
+        number = node.get("number", "A")
+        section = doc_model.Node("section", {"number": number, "title": "Task Report"},
+                                 task_report.appendix(node["source"], number, self.generated_on))
+        self.anchors[id(section)] = self.anchor(node, f"{number}. Task Report")
+        self.render_node(section)
+
+    def _render_bullet(self, node):
+        level = node.get("level", 0)
+        while self._list_depth > level + 1:
+            self._close_list()
+        if self._list_depth == level + 1:
+            self._next_item()
+        while self._list_depth < level + 1:
+            self._open_list()
+        self._item(node["text"], level)
+
+    def end_list(self):
+        while self._list_depth:
+            self._close_list()
+
+    def _open_list(self):
+        self._list_depth += 1
+
+    def _next_item(self):
+        pass
+
+    def _close_list(self):
+        self._list_depth -= 1
+
+    def begin(self, document):
+        pass
+
+    def end(self, document):
+        pass
+
+    @property
+    def date(self):
+        return self.generated_on.strftime("%B %d, %Y")
+
+    @staticmethod
+    def chart_rows(node):
+        """(label, value, share of the total or None, theme role) per bar,
+        slice or point: a chart's aggregates, for formats without vector paths."""
+        values = node["values"]
+        doughnut = node["type"] == "doughnut"
+        total = sum(values)
+        for i, (label, value) in enumerate(zip(node["labels"], values)):
+            share = value / total if doughnut and total else None
+            yield label, value, share, charts.SLICE_ROLES[i % len(charts.SLICE_ROLES)] if doughnut else "INDIGO"
+
+
+# ---- HTML ----
+
+SEARCH_SCRIPT = """
+const box = document.getElementById("search");
+box.addEventListener("input", () => {
+  const query = box.value.trim().toLowerCase();
+  for (const section of document.querySelectorAll("main > section")) {
+    section.hidden = query !== "" && !section.textContent.toLowerCase().includes(query);
+  }
+});
+"""
+
+STYLESHEET = """
+body { margin: 0; background: var(--surface); color: var(--text);
+  font: 16px/1.6 system-ui, -apple-system, "Segoe UI", Roboto, Helvetica, Arial, sans-serif; }
+main { max-width: 52rem; margin: 0 auto; padding: 0 1.5rem 3rem; }
+.cover, .back-cover { background: var(--primary); color: #fff; text-align: center; padding: 3rem 1rem 2rem; }
+.cover { border-bottom: 1.25rem solid var(--primary-dark); }
+.cover h1 { font-size: 3rem; margin: 0; }
+.cover p, .back-cover p { margin: .4rem 0; }
+.cover .subtitle, .back-cover .subtitle { color: rgb(200, 200, 255); font-size: 1.2rem; }
+.about { text-align: center; color: var(--text-secondary); margin: 2rem 0; }
+.about em { display: block; }
+.badges span { display: inline-block; background: var(--primary); color: #fff; font-weight: bold;
+  font-size: .85rem; padding: .3rem .8rem; margin: .2rem; border-radius: .3rem; }
+#search { width: 100%; box-sizing: border-box; margin: 1rem 0; padding: .5rem .8rem; font: inherit;
+  color: inherit; background: var(--bg); border: 1px solid var(--border); border-radius: .4rem; }
+nav ul { list-style: none; padding-left: 1.2rem; }
+nav > ul { padding-left: 0; }
+a { color: var(--primary); }
+h2 { color: var(--primary); border-bottom: 3px solid var(--primary); padding-bottom: .2rem; margin-top: 2.5rem; }
+h3 { margin-top: 1.6rem; }
+pre { background: var(--bg); border: 1px solid var(--border); border-radius: .4rem; padding: .8rem 1rem;
+  overflow-x: auto; font: 13px/1.5 ui-monospace, SFMono-Regular, Menlo, Consolas, monospace; }
+figure { margin: 1rem 0; }
+figcaption { font-weight: bold; font-size: .85rem; color: var(--text-secondary); }
+table { border-collapse: collapse; width: 100%; font-size: .9rem; margin: 1rem 0; }
+th { background: var(--primary); color: #fff; text-align: left; }
+th, td { padding: .35rem .6rem; border-bottom: 1px solid var(--border); }
+tbody tr:nth-child(odd) { background: var(--bg); }
+.c { text-align: center; }
+.r { text-align: right; }
+.info { border-left: 4px solid var(--info); background: color-mix(in srgb, var(--info) 25%, var(--surface));
+  padding: .6rem 1rem; border-radius: .3rem; margin: 1rem 0; }
+.chart td { border: 0; padding: .15rem .6rem; }
+.chart .bar { width: 70%; }
+.chart .bar span { display: block; height: .9rem; border-radius: .25rem; background: var(--bar, var(--primary)); }
+.back-cover { margin-top: 3rem; }
+.back-cover .title { font-size: 2rem; font-weight: bold; }
+.back-cover .motto { font-style: italic; }
+"""
+
+
+def _custom_properties(theme):
+    return " ".join(f"{themes.ROLES[role]}: #{r:02x}{g:02x}{b:02x};" for role, (r, g, b) in theme.colors.items())
+
+
+def stylesheet():
+    """The page's CSS: the light theme's tokens, the dark theme's for readers
+    who prefer it, and the rules using them."""
+    syntax = "\n".join(f".t-{kind} {{ color: var({themes.ROLES[role]}); }}"
+                       for kind, role in themes.SYNTAX_ROLES.items())
+    return (f":root {{ {_custom_properties(themes.load('light'))} }}\n"
+            f"@media (prefers-color-scheme: dark) {{ :root {{ {_custom_properties(themes.load('dark'))} }} }}"
+            + STYLESHEET + syntax + "\n")
+
+
+class HtmlWriter(Writer):
+    def begin(self, document):
+        title = document.get("title") or f"{doc_model.COVER['title']} - {doc_model.COVER['kind']}"
+        self.write(f'<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+                   f'<meta name="viewport" content="width=device-width, initial-scale=1">\n'
+                   f"<title>{html.escape(title)}</title>\n<style>\n{stylesheet()}</style>\n</head>\n<body>\n")
+        self._in_main = False
+
+    def end(self, document):
+        self._leave_main()
+        self.write(f"<script>{SEARCH_SCRIPT}</script>\n</body>\n</html>\n")
+
+    def _enter_main(self):
+        if not self._in_main:
+            self.write('<main>\n<input id="search" type="search" placeholder="Search the documentation" '
+                       'aria-label="Search the documentation">\n')
+            self._in_main = True
+
+    def _leave_main(self):
+        if self._in_main:
+            self.write("</main>\n")
+            self._in_main = False
+
+    def _page_cover(self, node):
+        cover = doc_model.COVER
+        badges = "".join(f"<span>{html.escape(badge)}</span>" for badge in cover["badges"])
+        self.write(f'<header class="cover">\n<h1>{html.escape(cover["title"])}</h1>\n'
+                   f'<p class="subtitle">{html.escape(cover["subtitle"])}</p>\n<p>{html.escape(cover["kind"])}</p>\n'
+                   f'</header>\n<div class="about">\n<p>{html.escape(cover["version"])}</p>\n'
+                   f'<em>{html.escape(cover["summary"])}</em>\n<p class="badges">{badges}</p>\n</div>\n')
+
+    def _page_contents(self, node):
+        self._enter_main()
+        self.write('<nav id="table-of-contents">\n<h2>Table of Contents</h2>\n<ul>\n')
+        depth, started = 0, False
+        for level, text, heading in headings(self.document):
+            if started:
+                self.write("\n<ul>\n" if level > depth else "</li>\n" + "</ul>\n</li>\n" * (depth - level))
+            self.write(f'<li><a href="#{self.anchors[id(heading)]}">{html.escape(text)}</a>')
+            depth, started = level, True
+        if started:
+            self.write("</li>\n" + "</ul>\n</li>\n" * depth)
+        self.write("</ul>\n</nav>\n")
+
+    def _page_back_cover(self, node):
+        self._leave_main()
+        back = doc_model.BACK_COVER
+        self.write(f'<footer class="back-cover">\n<p class="title">{html.escape(doc_model.COVER["title"])}</p>\n'
+                   f'<p class="subtitle">{html.escape(back["subtitle"])}</p>\n<p>Generated on {self.date}</p>\n'
+                   f'<p>{html.escape(back["built_with"])}</p>\n<p class="motto">{html.escape(back["motto"])}</p>\n'
+                   f"</footer>\n")
+
+    def _heading(self, tag, node, text):
+        self.write(f'<{tag} id="{self.anchor(node, text)}">{html.escape(text)}</{tag}>\n')
+
+    def _render_section(self, node):
+        self._enter_main()
+        self.write("<section>\n")
+        self._heading("h2", node, f"{node['number']}. {node['title']}")
+        self._render_children(node)
+        self.end_list()
+        self.write("</section>\n")
+
+    def _render_subsection(self, node):
+        self._heading("h3", node, node["title"])
+        self._render_children(node)
+
+    def _render_subsubsection(self, node):
+        self._heading("h4", node, node["title"])
+        self._render_children(node)
+
+    def _render_paragraph(self, node):
+        self.write(f"<p>{html.escape(node['text'])}</p>\n")
+
+    def _open_list(self):
+        super()._open_list()
+        self.write("<ul>\n")
+
+    def _next_item(self):
+        self.write("</li>\n")
+
+    def _close_list(self):
+        super()._close_list()
+        self.write("</li>\n</ul>\n")
+
+    def _item(self, text, level):
+        self.write(f"<li>{html.escape(text)}")
+
+    def _render_code(self, node):
+        lang = node.get("lang")
+        self.write("<figure>\n")
+        if node.get("title"):
+            self.write(f"<figcaption>{html.escape(node['title'])}</figcaption>\n")
+        self.write(f'<pre><code class="language-{html.escape(lang)}">' if lang else "<pre><code>")
+        for i, runs in enumerate(highlight.tokenize(node.get("code", ""), lang)):
+            self.write("\n" if i else "")
+            self.write("".join(f'<span class="t-{kind}">{html.escape(text)}</span>' if kind in themes.SYNTAX_ROLES
+                               else html.escape(text) for kind, text in runs))
+        self.write("</code></pre>\n</figure>\n")
+
+    def _render_table(self, node):
+        aligns = node.get("aligns") or ""
+        classes = [f' class="{ALIGN_CLASSES[a]}"' if a in ALIGN_CLASSES else "" for a in aligns]
+        classes += [""] * (len(node["columns"]) - len(classes))
+        self.write("<table>\n<thead><tr>" + "".join(f"<th{c}>{html.escape(str(column))}</th>"
+                                                    for c, column in zip(classes, node["columns"]))
+                   + "</tr></thead>\n<tbody>\n")
+        for row in node["rows"]:
+            self.write("<tr>" + "".join(f"<td{c}>{html.escape(str(cell))}</td>" for c, cell in zip(classes, row))
+                       + "</tr>\n")
+        self.write("</tbody>\n</table>\n")
+
+    def _render_info(self, node):
+        token = themes.ROLES[node.get("color", "INDIGO")]
+        self.write(f'<aside class="info" style="--info: var({token})">{html.escape(node["text"])}</aside>\n')
+
+    def _render_chart(self, node):
+        # A bar per value, as wide as its share of the largest.
+        top = max(node["values"], default=0) or 1
+        self.write("<figure>\n")
+        if node.get("title"):
+            self.write(f"<figcaption>{html.escape(node['title'])}</figcaption>\n")
+        self.write('<table class="chart">\n<tbody>\n')
+        for label, value, share, role in self.chart_rows(node):
+            caption = charts.number(value) + (f" ({share:.0%})" if share is not None else "")
+            self.write(f'<tr><td>{html.escape(str(label))}</td><td class="bar" style="--bar: var({themes.ROLES[role]})">'
+                       f'<span style="width: {100 * value / top:.1f}%"></span></td><td class="r">{caption}</td></tr>\n')
+        self.write("</tbody>\n</table>\n</figure>\n")
+
+
+# ---- Markdown ----
+
+def _markdown_text(text):
+    return MARKDOWN_SPECIAL_RE.sub(r"\\\1", text)
+
+
+def _markdown_cell(cell):
+    return _markdown_text(" ".join(str(cell).split())).replace("|", "\\|")
+
+
+class MarkdownWriter(Writer):
+    def _page_cover(self, node):
+        cover = doc_model.COVER
+        self.write(f"# {_markdown_text(cover['title'])}\n\n**{_markdown_text(cover['subtitle'])}** - "
+                   f"{_markdown_text(cover['kind'])}\n\n{_markdown_text(cover['version'])}\n\n"
+                   f"*{_markdown_text(cover['summary'])}*\n\n"
+                   + " ".join(f"`{badge}`" for badge in cover["badges"]) + "\n\n")
+
+    def _page_contents(self, node):
+        self.write("## Table of Contents\n\n")
+        for level, text, heading in headings(self.document):
+            self.write(f"{'  ' * level}- [{_markdown_text(text)}](#{self.anchors[id(heading)]})\n")
+        self.write("\n")
+
+    def _page_back_cover(self, node):
+        back = doc_model.BACK_COVER
+        self.write(f"---\n\n**{_markdown_text(doc_model.COVER['title'])}** - {_markdown_text(back['subtitle'])}, "
+                   f"generated on {self.date}\n\n{_markdown_text(back['built_with'])}\n\n"
+                   f"*{_markdown_text(back['motto'])}*\n")
+
+    def _heading(self, level, node, text):
+        self.anchor(node, text)
+        self.write(f"{'#' * level} {_markdown_text(text)}\n\n")
+
+    def _render_section(self, node):
+        self._heading(2, node, f"{node['number']}. {node['title']}")
+        self._render_children(node)
+
+    def _render_subsection(self, node):
+        self._heading(3, node, node["title"])
+        self._render_children(node)
+
+    def _render_subsubsection(self, node):
+        self._heading(4, node, node["title"])
+        self._render_children(node)
+
+    def _render_paragraph(self, node):
+        self.write(_markdown_text(node["text"]) + "\n\n")
+
+    def _close_list(self):
+        super()._close_list()
+        if not self._list_depth:
+            self.write("\n")
+
+    def _item(self, text, level):
+        self.write(f"{'  ' * level}- {_markdown_text(text)}\n")
+
+    def _render_code(self, node):
+        code = node.get("code", "")
+        fence = "`" * max(3, max((len(run) + 1 for run in re.findall(r"`+", code)), default=0))
+        if node.get("title"):
+            self.write(f"**{_markdown_text(node['title'])}**\n\n")
+        self.write(f"{fence}{node.get('lang') or ''}\n{code}\n{fence}\n\n")
+
+    def _render_table(self, node):
+        columns = node["columns"]
+        aligns = (node.get("aligns") or "").ljust(len(columns), "L")
+        self.write("| " + " | ".join(_markdown_cell(column) for column in columns) + " |\n"
+                   "|" + "|".join(MARKDOWN_ALIGNS.get(a, "---") for a in aligns) + "|\n")
+        for row in node["rows"]:
+            self.write("| " + " | ".join(_markdown_cell(cell) for cell in row) + " |\n")
+        self.write("\n")
+
+    def _render_info(self, node):
+        alert = INFO_ALERTS.get(node.get("color", "INDIGO"), "NOTE")
+        self.write(f"> [!{alert}]\n> {_markdown_text(node['text'])}\n\n")
+
+    def _render_chart(self, node):
+        if node.get("title"):
+            self.write(f"**{_markdown_text(node['title'])}**\n\n")
+        doughnut = node["type"] == "doughnut"
+        self.write("| | Value |" + (" Share |\n|:---|---:|---:|\n" if doughnut else "\n|:---|---:|\n"))
+        for label, value, share, _ in self.chart_rows(node):
+            self.write(f"| {_markdown_cell(label)} | {charts.number(value)} |"
+                       + (f" {share:.0%} |\n" if share is not None else (" - |\n" if doughnut else "\n")))
+        self.write("\n")
+
+
+FORMATS = {"html": HtmlWriter, "md": MarkdownWriter}
+
+
+def export(document, path, fmt, generated_on=None):
+    """Write document to path in fmt ("html" or "md") and return the output's
+    SHA-256. The file is replaced only once it is complete."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            writer = FORMATS[fmt](f, generated_on)
+            writer.render(document)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return writer.sha256.hexdigest()
@@ -0,0 +1,415 @@
+"""
+TaskFlow Documentation Model
+A declarative tree of document nodes, loadable from Markdown, YAML or JSON.
+
+The tree is plain data: it can be validated, hashed and diffed without any
+layout code, and handed to a renderer (TaskFlowDoc in generate_docs.py) to
+produce output.
+
+Markdown syntax understood by load_markdown():
+
+    <!-- page: cover -->                    special page (cover, contents, back-cover)
+    # 1. Project Overview                   section; add {continues} to stay on the same page
+    ## 1.1 Key Features                     subsection
+    ### addTodo(text, priority)             subsubsection
+    Plain lines                             paragraph (consecutive lines are joined)
+    - item / "  - item"                     bullet, level 0 / 1
+    ```js title="Render Pipeline"           code block with optional language and title
+    ```js ref="js/app.js#render"            empty code block filled from the project's
+                                            sources at build time (see excerpts.py);
+                                            attribute values may also be 'single-quoted'
+    ```chart type="bar" title="..."         bar, doughnut or line chart, one "label: value"
+                                            line per bar, slice or point
+    {widths=45,50,75}                       column widths (mm) for the table that follows
+                                            (without one, widths are fitted to the content)
+    | A | B |  + |---|---| + rows           table
+    > [!NOTE] / [!TIP] / [!IMPORTANT]       info box (indigo / green / cyan)
+
+Inline markup is not interpreted; text is rendered as written.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+
+# kind -> (required attributes, optional attributes, allowed child kinds)
+BLOCKS = ("paragraph", "bullet", "code", "table", "info", "chart")
+SCHEMA = {
+    "document": ((), ("title",), ("page", "section")),
+    "page": (("name",), ("source", "number"), ()),
+    "section": (("number", "title"), ("continues",), BLOCKS + ("subsection",)),
+    "subsection": (("title",), (), BLOCKS + ("subsubsection",)),
+    "subsubsection": (("title",), (), BLOCKS),
+    "paragraph": (("text",), (), ()),
+    "bullet": (("text",), ("level",), ()),
+    "code": ((), ("code", "ref", "title", "lang"), ()),
+    "table": (("columns", "rows"), ("widths", "aligns"), ()),
+    "info": (("text",), ("color",), ()),
+    "chart": (("type", "labels", "values"), ("title",), ()),
+}
+
+PAGES = ("cover", "contents", "back-cover", "task-report")
+
+CHARTS = ("bar", "doughnut", "line")
+
+# GitHub alert name -> TaskFlowDoc color
+INFO_COLORS = {
+    "NOTE": "INDIGO",
+    "TIP": "SUCCESS",
+    "IMPORTANT": "ACCENT",
+    "WARNING": "WARNING",
+    "CAUTION": "DANGER",
+}
+
+# Fixed text of the cover and back-cover pages, the same in every output format.
+COVER = {
+    "title": "TaskFlow",
+    "subtitle": "Smart Todo Manager",
+    "kind": "Architecture & Developer Documentation",
+    "version": "Version 2.0  |  February 2026",
+    "summary": "A complete guide to understanding, maintaining, and extending the TaskFlow application.",
+    "badges": ("HTML5", "CSS3", "JavaScript ES6+", "Chart.js", "PWA", "LocalStorage API"),
+}
+BACK_COVER = {
+    "subtitle": "Architecture Documentation v2.0",
+    "built_with": "Built with HTML5, CSS3, JavaScript ES6+, and Chart.js",
+    "motto": "Zero dependencies. Zero build tools. Pure web standards.",
+}
+
+
+class DocumentError(ValueError):
+    pass
+
+
+class Node:
+    __slots__ = ("kind", "attrs", "children", "line", "_digest")
+
+    def __init__(self, kind, attrs=None, children=None, line=None):
+        self.kind = kind
+        self.attrs = attrs or {}
+        self.children = children or []
+        self.line = line
+        self._digest = None
+
+    def __getitem__(self, name):
+        return self.attrs[name]
+
+    def get(self, name, default=None):
+        return self.attrs.get(name, default)
+
+    def __repr__(self):
+        label = self.attrs.get("title") or self.attrs.get("name") or ""
+        return f"<Node {self.kind} {label!r} ({len(self.children)} children)>"
+
+    def __getstate__(self):
+        return (self.kind, self.attrs, self.children, self.line)
+
+    def __setstate__(self, state):
+        self.kind, self.attrs, self.children, self.line = state
+        self._digest = None
+
+    def digest(self):
+        """Content hash of this node and everything below it (source lines excluded)."""
+        if self._digest is None:
+            h = hashlib.sha256(json.dumps([self.kind, self.attrs], sort_keys=True).encode("utf-8"))
+            for child in self.children:
+                h.update(child.digest().encode("ascii"))
+            self._digest = h.hexdigest()
+        return self._digest
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def to_dict(self):
+        data = {"kind": self.kind, **self.attrs}
+        if self.children:
+            data["children"] = [child.to_dict() for child in self.children]
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        if not isinstance(data, dict) or "kind" not in data:
+            raise DocumentError(f"Expected a mapping with a 'kind' key, got: {data!r}")
+        attrs = dict(data)
+        kind = attrs.pop("kind")
+        children = [cls.from_dict(child) for child in attrs.pop("children", [])]
+        return cls(kind, attrs, children)
+
+
+def validate(document):
+    """Check a tree against SCHEMA; raise DocumentError listing every problem found."""
+    problems = []
+
+    def where(node):
+        return f"line {node.line}: " if node.line else ""
+
+    for node in document.walk():
+        if node.kind not in SCHEMA:
+            problems.append(f"{where(node)}unknown node kind {node.kind!r}")
+            continue
+        required, optional, allowed = SCHEMA[node.kind]
+        for name in required:
+            if name not in node.attrs:
+                problems.append(f"{where(node)}{node.kind} is missing {name!r}")
+        for name in node.attrs:
+            if name not in required and name not in optional:
+                problems.append(f"{where(node)}{node.kind} has unknown attribute {name!r}")
+        for child in node.children:
+            if child.kind not in allowed:
+                problems.append(f"{where(child)}{child.kind} is not allowed inside {node.kind}")
+        if node.kind == "page" and node.get("name") not in PAGES:
+            problems.append(f"{where(node)}unknown page {node.get('name')!r} (expected one of {', '.join(PAGES)})")
+        elif node.kind == "page" and (node.get("name") == "task-report") != ("source" in node.attrs):
+            problems.append(f"{where(node)}only a task-report page takes (and needs) a 'source' export")
+        elif node.kind == "code" and "code" not in node.attrs and "ref" not in node.attrs:
+            problems.append(f"{where(node)}code needs either code or a ref")
+        elif node.kind == "bullet" and node.get("level", 0) not in (0, 1):
+            problems.append(f"{where(node)}bullet level must be 0 or 1")
+        elif node.kind == "info" and node.get("color", "INDIGO") not in INFO_COLORS.values():
+            problems.append(f"{where(node)}unknown info box color {node.get('color')!r}")
+        elif node.kind == "table" and all(name in node.attrs for name in required):
+            columns, widths = node["columns"], node.get("widths")
+            if widths is not None and len(widths) != len(columns):
+                problems.append(f"{where(node)}table has {len(columns)} columns but {len(widths)} widths")
+            for row in node["rows"]:
+                if len(row) != len(columns):
+                    problems.append(f"{where(node)}table row {row!r} has {len(row)} cells, expected {len(columns)}")
+        elif node.kind == "chart" and all(name in node.attrs for name in required):
+            labels, values = node["labels"], node["values"]
+            if node["type"] not in CHARTS:
+                problems.append(f"{where(node)}unknown chart type {node['type']!r} (expected one of {', '.join(CHARTS)})")
+            if len(labels) != len(values):
+                problems.append(f"{where(node)}chart has {len(labels)} labels but {len(values)} values")
+            if not all(isinstance(v, (int, float)) and not isinstance(v, bool) and v >= 0 for v in values):
+                problems.append(f"{where(node)}chart values must be numbers of at least 0, got {values!r}")
+
+    numbers = [node["number"] for node in document.walk() if node.kind == "section" and "number" in node.attrs]
+    for number in sorted({n for n in numbers if numbers.count(n) > 1}):
+        problems.append(f"section number {number} is used more than once")
+
+    if problems:
+        raise DocumentError("Invalid document:\n  " + "\n  ".join(problems))
+    return document
+
+
+# ---- Markdown ----
+
+HEADING_RE = re.compile(r"^(#{1,3})\s+(.*?)(?:\s+\{(\w+)\})?\s*$")
+SECTION_RE = re.compile(r"^(\d+)\.\s+(.+)$")
+PAGE_RE = re.compile(r"^<!--\s*page:\s*([\w-]+)\s*-->$")
+FENCE_RE = re.compile(r"^```(\w*)(.*)$")
+FENCE_ATTR_RE = re.compile(r"""(\w+)=(?:"([^"]*)"|'([^']*)')""")
+BULLET_RE = re.compile(r"^( *)- (.*)$")
+ALERT_RE = re.compile(r"^>\s*\[!(\w+)\]\s*$")
+WIDTHS_RE = re.compile(r"^\{widths=([\d.,\s]+)\}$")
+TABLE_RULE_RE = re.compile(r"^\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?$")
+
+
+def _table_cells(line):
+    cells = re.split(r"(?<!\\)\|", line.strip().strip("|"))
+    return [cell.strip().replace("\\|", "|") for cell in cells]
+
+
+def parse_markdown(text):
+    """Parse the Markdown dialect described in the module docstring into a document Node."""
+    document = Node("document", line=1)
+    # Open containers, outermost first: [document, section?, subsection?, subsubsection?]
+    stack = [document]
+    lines = text.split("\n")
+    i = 0
+
+    def add(node, depth=None):
+        if depth is not None:
+            del stack[depth:]
+            stack[-1].children.append(node)
+            stack.append(node)
+        else:
+            stack[-1].children.append(node)
+
+    while i < len(lines):
+        line = lines[i]
+        lineno = i + 1
+        stripped = line.strip()
+
+        if not stripped:
+            i += 1
+            continue
+
+        match = PAGE_RE.match(stripped)
+        if match:
+            add(Node("page", {"name": match.group(1)}, line=lineno), depth=1)
+            stack.pop()
+            i += 1
+            continue
+
+        if stripped.startswith("<!--"):
+            while "-->" not in lines[i]:
+                i += 1
+                if i == len(lines):
+                    raise DocumentError(f"line {lineno}: unterminated comment")
+            i += 1
+            continue
+
+        match = HEADING_RE.match(line)
+        if match:
+            level, title, flag = len(match.group(1)), match.group(2), match.group(3)
+            if level == 1:
+                section = SECTION_RE.match(title)
+                if not section:
+                    raise DocumentError(f"line {lineno}: section headings look like '# 3. Title', got {title!r}")
+                attrs = {"number": section.group(1), "title": section.group(2)}
+                if flag == "continues":
+                    attrs["continues"] = True
+                elif flag:
+                    raise DocumentError(f"line {lineno}: unknown heading flag {{{flag}}}")
+                add(Node("section", attrs, line=lineno), depth=1)
+            else:
+                if len(stack) < level:
+                    raise DocumentError(f"line {lineno}: heading level {level} without a parent heading")
+                kind = "subsection" if level == 2 else "subsubsection"
+                add(Node(kind, {"title": title}, line=lineno), depth=level)
+            i += 1
+            continue
+
+        match = FENCE_RE.match(stripped)
+        if match:
+            attrs = {name: double or single for name, double, single in FENCE_ATTR_RE.findall(match.group(2))}
+            if match.group(1):
+                attrs["lang"] = match.group(1)
+            body = []
+            i += 1
+            while i < len(lines) and lines[i].strip() != "```":
+                body.append(lines[i])
+                i += 1
+            if i == len(lines):
+                raise DocumentError(f"line {lineno}: unterminated code block")
+            if attrs.get("lang") == "chart":
+                add(_chart(attrs, body, lineno))
+                i += 1
+                continue
+            if "ref" not in attrs:
+                attrs["code"] = "\n".join(body)
+            elif any(line.strip() for line in body):
+                raise DocumentError(f"line {lineno}: a code block with a ref takes its code from the source, leave it empty")
+            add(Node("code", attrs, line=lineno))
+            i += 1
+            continue
+
+        match = WIDTHS_RE.match(stripped)
+        if match or stripped.startswith("|"):
+            widths = [float(w) for w in match.group(1).split(",")] if match else None
+            if match:
+                i += 1
+            rows = []
+            while i < len(lines) and lines[i].strip().startswith("|"):
+                if not TABLE_RULE_RE.match(lines[i].strip()):
+                    rows.append(_table_cells(lines[i]))
+                i += 1
+            if not rows:
+                raise DocumentError(f"line {lineno}: column widths given without a table")
+            columns, rows = rows[0], rows[1:]
+            attrs = {"columns": columns, "rows": rows}
+            if widths:
+                attrs["widths"] = [int(w) if w == int(w) else w for w in widths]
+            add(Node("table", attrs, line=lineno))
+            continue
+
+        match = ALERT_RE.match(stripped)
+        if match:
+            alert = match.group(1).upper()
+            if alert not in INFO_COLORS:
+                raise DocumentError(f"line {lineno}: unknown alert [!{alert}] (expected one of {', '.join(INFO_COLORS)})")
+            body = []
+            i += 1
+            while i < len(lines) and lines[i].startswith(">"):
+                body.append(lines[i][1:].strip())
+                i += 1
+            add(Node("info", {"text": " ".join(body), "color": INFO_COLORS[alert]}, line=lineno))
+            continue
+
+        match = BULLET_RE.match(line)
+        if match:
+            indent = len(match.group(1))
+            body = [match.group(2).strip()]
+            i += 1
+            while (i < len(lines) and lines[i].strip() and not BULLET_RE.match(lines[i])
+                   and len(lines[i]) - len(lines[i].lstrip()) > indent):
+                body.append(lines[i].strip())
+                i += 1
+            attrs = {"text": " ".join(body)}
+            if indent:
+                attrs["level"] = indent // 2
+            add(Node("bullet", attrs, line=lineno))
+            continue
+
+        body = []
+        while i < len(lines) and lines[i].strip() and not _starts_block(lines[i]):
+            body.append(lines[i].strip())
+            i += 1
+        add(Node("paragraph", {"text": " ".join(body)}, line=lineno))
+
+    return document
+
+
+def _chart(attrs, body, lineno):
+    del attrs["lang"]
+    attrs["labels"], attrs["values"] = [], []
+    for line in filter(str.strip, body):
+        label, _, value = line.rpartition(":")
+        try:
+            value = float(value)
+        except ValueError:
+            raise DocumentError(f"line {lineno}: chart lines look like 'label: value', got {line.strip()!r}") from None
+        attrs["labels"].append(label.strip())
+        attrs["values"].append(int(value) if value == int(value) else value)
+    return Node("chart", attrs, line=lineno)
+
+
+def _starts_block(line):
+    stripped = line.strip()
+    return bool(
+        HEADING_RE.match(line) or FENCE_RE.match(stripped) or BULLET_RE.match(line)
+        or stripped.startswith(("|", ">", "<!--")) or WIDTHS_RE.match(stripped)
+    )
+
+
+# ---- Loading ----
+
+def load_markdown(path):
+    with open(path, encoding="utf-8") as f:
+        return parse_markdown(f.read())
+
+
+def load_json(path):
+    with open(path, encoding="utf-8") as f:
+        return Node.from_dict(json.load(f))
+
+
+def load_yaml(path):
+    try:
+        import yaml
+    except ImportError:
+        raise DocumentError("Loading YAML documents requires PyYAML: pip install pyyaml") from None
+    with open(path, encoding="utf-8") as f:
+        return Node.from_dict(yaml.safe_load(f))
+
+
+LOADERS = {
+    ".md": load_markdown,
+    ".markdown": load_markdown,
+    ".json": load_json,
+    ".yaml": load_yaml,
+    ".yml": load_yaml,
+}
+
+
+def load(path):
+    """Load and validate a document, picking the format from the file extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in LOADERS:
+        raise DocumentError(f"Don't know how to load {path!r} (supported: {', '.join(LOADERS)})")
+    return validate(LOADERS[ext](path))
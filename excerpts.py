@@ -0,0 +1,232 @@
+"""
+TaskFlow Source Excerpts
+Resolves code block references to text taken from the project's own sources,
+so excerpts in the docs can't drift from js/app.js and css/style.css.
+
+A reference is a path relative to the project root, then '#', then either
+top-level symbols or a line range:
+
+    js/app.js#loadTodos                     a function, class or const/let/var
+    js/app.js#render; renderTasks           several symbols, in the given order
+    css/style.css#:root                     a rule, by its selector as written
+    css/style.css#@media screen and (max-width: 1024px)
+    js/app.js#L5-L33                        lines 5 to 33 (or just #L5)
+
+Each file is scanned once into a symbol table (name -> line span). Tables are
+kept for the life of the process, checked against the file's mtime and size,
+and, when a directory is set, stored there as JSON keyed by a hash of the
+file's contents, so an unchanged file is never re-scanned.
+"""
+
+import hashlib
+import json
+import os
+import re
+import textwrap
+
+import doc_model
+
+# Bump when the scanner or the stored table format changes.
+INDEX_VERSION = 1
+
+LINE_RANGE_RE = re.compile(r"^L(\d+)(?:-L?(\d+))?$")
+JS_DECLARATION_RE = re.compile(r"(?:async\s+)?(?:function\s*\*?|class|const|let|var)\s+([\w$]+)")
+
+
+class ExcerptError(doc_model.DocumentError):
+    pass
+
+
+# ---- Scanning ----
+
+def _code_chars(text, comment_line):
+    """Yield (offset, char) for every character outside strings and comments.
+    Template literals are skipped too, except for code inside ${...}."""
+    i, n = 0, len(text)
+    templates = []  # brace depth at each open ${ of an enclosing template literal
+    depth = 0
+    while i < n:
+        c = text[i]
+        if c == "/" and text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+            continue
+        if comment_line and c == "/" and text.startswith("//", i):
+            end = text.find("\n", i)
+            i = n if end < 0 else end
+            continue
+        if c == "`" and comment_line or templates and templates[-1] == depth and c == "}":
+            i, opened = _skip_template(text, i + 1)
+            if c == "}":
+                templates.pop()
+            if opened:
+                templates.append(depth)
+            continue
+        if c in "\"'":
+            i += 1
+            while i < n and text[i] != c and text[i] != "\n":
+                i += 2 if text[i] == "\\" else 1
+            i += 1
+            continue
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+        yield i, c
+        i += 1
+
+
+def _skip_template(text, i):
+    # From inside a template literal to just past its closing ` or its next ${.
+    while i < len(text):
+        if text[i] == "\\":
+            i += 2
+        elif text[i] == "`":
+            return i + 1, False
+        elif text.startswith("${", i):
+            return i + 2, True
+        else:
+            i += 1
+    return i, False
+
+
+def scan(text, lang):
+    """Top-level symbols of a JS or CSS source as {name: [first line, last line]};
+    a name declared twice keeps its first span."""
+    js = lang == "js"
+    symbols = {}
+    starts = _line_starts(text)
+    depth, start, name = 0, None, None
+    for offset, c in _code_chars(text, comment_line=js):
+        if depth == 0 and start is None:
+            if c.isspace():
+                continue
+            start = offset
+        if c == "{":
+            if depth == 0 and not js:
+                name = " ".join(text[start:offset].split())
+            depth += 1
+            continue
+        if c == "}":
+            depth -= 1
+            # A const/let/var runs on to its semicolon; a block ends at its brace.
+            if depth == 0 and not (js and re.match(r"(?:const|let|var)\b", text[start:offset])):
+                end = offset
+            else:
+                continue
+        elif c == ";" and depth == 0:
+            end = offset
+        else:
+            continue
+        if js:
+            match = JS_DECLARATION_RE.match(text, start)
+            name = match and match.group(1)
+        if name and name not in symbols:
+            symbols[name] = [_line_of(starts, start), _line_of(starts, end)]
+        start, name = None, None
+    return symbols
+
+
+def _line_starts(text):
+    return [0] + [m.end() for m in re.finditer("\n", text)]
+
+
+def _line_of(starts, offset):
+    lo, hi = 0, len(starts)
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if starts[mid] <= offset:
+            lo = mid
+        else:
+            hi = mid
+    return lo + 1
+
+
+# ---- Index ----
+
+class SourceIndex:
+    """Symbol tables of source files, scanned at most once per file version."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.files = {}  # realpath -> (mtime_ns, size, lines, symbols)
+        self.hits = 0
+        self.scans = 0
+
+    def _file(self, digest):
+        return os.path.join(self.path, digest + ".json")
+
+    def load(self, filename):
+        """(lines, symbols) for filename, scanning it only if it changed."""
+        real = os.path.realpath(filename)
+        try:
+            st = os.stat(real)
+        except OSError as e:
+            raise ExcerptError(f"Cannot read {filename}: {e.strerror}") from None
+        entry = self.files.get(real)
+        if entry and entry[:2] == (st.st_mtime_ns, st.st_size):
+            self.hits += 1
+            return entry[2:]
+        with open(real, encoding="utf-8") as f:
+            text = f.read()
+        lang = "css" if real.endswith(".css") else "js"
+        digest = hashlib.sha256(f"{INDEX_VERSION}\0{lang}\0{text}".encode("utf-8")).hexdigest()
+        symbols = None
+        if self.path:
+            try:
+                with open(self._file(digest), encoding="utf-8") as f:
+                    symbols = json.load(f)
+            except (OSError, ValueError):
+                pass
+        if symbols is None:
+            self.scans += 1
+            symbols = scan(text, lang)
+            if self.path:
+                os.makedirs(self.path, exist_ok=True)
+                tmp = self._file(digest) + f".{os.getpid()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(symbols, f, separators=(",", ":"))
+                os.replace(tmp, self._file(digest))
+        else:
+            self.hits += 1
+        lines = text.split("\n")
+        self.files[real] = (st.st_mtime_ns, st.st_size, lines, symbols)
+        return lines, symbols
+
+    def excerpt(self, ref, root="."):
+        """The source text a reference points at, dedented."""
+        filename, sep, target = ref.partition("#")
+        if not sep or not target.strip():
+            raise ExcerptError(f"Reference {ref!r} should look like 'path#symbol' or 'path#L10-L20'")
+        lines, symbols = self.load(os.path.join(root, filename))
+        spans = []
+        match = LINE_RANGE_RE.match(target.strip())
+        if match:
+            first = int(match.group(1))
+            last = int(match.group(2) or first)
+            if not 1 <= first <= last <= len(lines):
+                raise ExcerptError(f"Reference {ref!r}: {filename} has {len(lines)} lines")
+            spans.append((first, last))
+        else:
+            for name in target.split(";"):
+                name = " ".join(name.split())
+                if name not in symbols:
+                    raise ExcerptError(f"Reference {ref!r}: no top-level {name!r} in {filename}")
+                spans.append(symbols[name])
+        return "\n\n".join(textwrap.dedent("\n".join(lines[first - 1:last])) for first, last in spans)
+
+
+index = SourceIndex()
+
+
+def excerpt(ref, root="."):
+    return index.excerpt(ref, root)
+
+
+def resolve(document, root="."):
+    """Fill in the code of every code node that has a ref. Call this before the
+    document is hashed or rendered, so node digests cover the excerpt text."""
+    for node in document.walk():
+        if node.kind == "code" and "ref" in node.attrs:
+            node.attrs["code"] = index.excerpt(node["ref"], root)
+    return document
@@ -0,0 +1,195 @@
+"""
+TaskFlow Unicode Fonts
+Embedded TrueType fonts for TaskFlowDoc, so text outside Latin-1 (task names
+in other scripts, arrows and box-drawing characters in code) renders instead
+of turning into '?'.
+
+find() looks for a sans and a monospaced family (DejaVu or Noto file names,
+see FONT_FILES) in a given directory or in FONT_DIRS; TaskFlowDoc.use_fonts()
+then draws Helvetica text with the sans family and Courier text with the
+monospaced one. Without them the document keeps the built-in core fonts.
+
+fpdf2 already embeds only the glyphs a document uses. On top of that:
+
+- A font file is parsed once per process. Every document built afterwards
+  gets its own TTFFont sharing the parsed metrics (widths, cmap, glyph ids);
+  only the lazily opened fontTools object, which output() subsets in place,
+  is per document.
+- Parsed metrics are pickled into a cache directory keyed by the file's path,
+  size and mtime, so later runs skip parsing altogether.
+- Text is encoded by code point (StableSubsetMap) rather than by the order
+  glyphs were first used, so a section rendered on a scratch document, in a
+  worker or in an earlier run can be spliced into any document unchanged.
+  Characters outside the Basic Multilingual Plane are dropped.
+"""
+
+from collections import defaultdict
+import copy
+import hashlib
+import os
+import pickle
+
+from fpdf import FPDF, FPDF_VERSION
+from fpdf.enums import TextEmphasis
+from fpdf.fonts import SubsetMap, TTFFont
+from fontTools import ttLib
+
+# (family, style) -> candidate file names, first found wins. A missing bold or
+# italic face falls back to the family's regular one.
+FONT_FILES = {
+    ("sans", ""): ("DejaVuSans.ttf", "NotoSans-Regular.ttf"),
+    ("sans", "B"): ("DejaVuSans-Bold.ttf", "NotoSans-Bold.ttf"),
+    ("sans", "I"): ("DejaVuSans-Oblique.ttf", "NotoSans-Italic.ttf"),
+    ("sans", "BI"): ("DejaVuSans-BoldOblique.ttf", "NotoSans-BoldItalic.ttf"),
+    ("mono", ""): ("DejaVuSansMono.ttf", "NotoSansMono-Regular.ttf"),
+    ("mono", "B"): ("DejaVuSansMono-Bold.ttf", "NotoSansMono-Bold.ttf"),
+    ("mono", "I"): ("DejaVuSansMono-Oblique.ttf",),
+    ("mono", "BI"): ("DejaVuSansMono-BoldOblique.ttf",),
+}
+
+FONT_DIRS = (
+    "/usr/share/fonts/truetype/dejavu",
+    "/usr/share/fonts/dejavu",
+    "/usr/share/fonts/TTF",
+    "/usr/share/fonts/truetype/noto",
+    "/usr/share/fonts/noto",
+    "/usr/local/share/fonts",
+    os.path.expanduser("~/.fonts"),
+    os.path.expanduser("~/Library/Fonts"),
+    "/Library/Fonts",
+)
+
+# Core family each embedded family stands in for.
+STANDS_IN_FOR = {"sans": "helvetica", "mono": "courier"}
+
+# Bump when the pickled metrics change shape.
+METRICS_VERSION = 1
+
+# TTFFont attributes that only depend on the font file, shared by every document.
+SHARED = ("type", "name", "cmap", "glyph_ids", "sp", "ss", "up", "ut", "scale",
+          "is_cff", "is_cid_keyed", "is_symbol", "cff_ros")
+
+
+def find(font_dir=None):
+    """{(family, style): path} for every family whose regular face is found in
+    font_dir, or in FONT_DIRS when font_dir is None."""
+    dirs = [font_dir] if font_dir else FONT_DIRS
+    files = {}
+    for key, names in FONT_FILES.items():
+        for name in names:
+            found = next((os.path.join(d, name) for d in dirs if os.path.isfile(os.path.join(d, name))), None)
+            if found:
+                files[key] = found
+                break
+    for family, style in list(FONT_FILES):
+        if (family, "") in files:
+            files.setdefault((family, style), files[family, ""])
+        else:
+            files.pop((family, style), None)
+    return files
+
+
+class StableSubsetMap(SubsetMap):
+    """Codes each glyph by its Unicode code point instead of the order of first
+    use, so the same text encodes to the same bytes in every document."""
+
+    def pick_glyph(self, glyph):
+        if glyph is None:
+            return None
+        char_id = self._char_id_per_glyph.get(glyph)
+        if char_id is None:
+            code = glyph.unicode[0] if glyph.unicode else None
+            if code is None or code > 0xFFFF:
+                return None
+            char_id = self._char_id_per_glyph[glyph] = code
+        return char_id
+
+
+class FontMetricsCache:
+    """Parsed font metrics per file version, in memory and optionally on disk."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.memory = {}
+        self.hits = 0
+        self.parses = 0
+
+    def key(self, filename):
+        st = os.stat(filename)
+        digest = hashlib.sha256()
+        for part in (METRICS_VERSION, FPDF_VERSION, os.path.realpath(filename), st.st_size, st.st_mtime_ns):
+            digest.update(repr(part).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key + ".metrics")
+
+    def get(self, filename):
+        key = self.key(filename)
+        metrics = self.memory.get(key)
+        if metrics is not None:
+            self.hits += 1
+            return metrics
+        if self.path:
+            try:
+                with open(self._file(key), "rb") as f:
+                    metrics = pickle.load(f)
+                self.hits += 1
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass
+        if metrics is None:
+            self.parses += 1
+            metrics = parse(filename)
+            if self.path:
+                os.makedirs(self.path, exist_ok=True)
+                tmp = self._file(key) + f".{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    pickle.dump(metrics, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, self._file(key))
+        # The widths go back into a defaultdict here, once per process.
+        metrics["cw"] = defaultdict(lambda default=metrics["missing_width"]: default, metrics["cw"])
+        self.memory[key] = metrics
+        return metrics
+
+
+def parse(filename):
+    font = TTFFont(FPDF(), filename, "font", "")
+    metrics = {name: getattr(font, name) for name in SHARED}
+    metrics["desc"] = font.desc
+    metrics["cw"] = dict(font.cw)
+    metrics["missing_width"] = font.desc.missing_width
+    return metrics
+
+
+metrics = FontMetricsCache()
+
+
+def load(pdf, family, style, filename):
+    """A TTFFont for pdf built from the shared metrics of filename."""
+    shared = metrics.get(filename)
+    font = TTFFont.__new__(TTFFont)
+    for name in SHARED + ("cw",):
+        setattr(font, name, shared[name])
+    font.desc = copy.copy(shared["desc"])  # output() numbers it as a PDF object
+    font.i = len(pdf.fonts) + 1
+    font.fontkey = family + style
+    font.emphasis = TextEmphasis.coerce(style)
+    font.ttffile = filename
+    font.ttfont = ttLib.TTFont(filename, recalcTimestamp=False, lazy=True)
+    font.is_compressed = False
+    font.collection_font_number = 0
+    font.unicode_range = None
+    font.palette_index = 0
+    font.color_font = None
+    font._hbfont = None
+    font.biggest_size_pt = 0
+    font.missing_glyphs = []
+    font.subset = StableSubsetMap(font)
+    return font
+
+
+def signature(files):
+    """What the fonts contribute to a section cache key."""
+    return tuple(sorted((family, style, os.path.basename(path), os.path.getsize(path))
+                        for (family, style), path in files.items()))
@@ -1,29 +1,97 @@
 """
 TaskFlow Architecture Documentation PDF Generator
 Generates a comprehensive LaTeX-styled PDF using fpdf2.
+
+Content lives in docs/source/architecture.md (see doc_model.py); this module
+lays it out. The command line is in doc_cli.py.
 """
 
-from fpdf import FPDF
+if __name__ == "__main__":
+    # Hand over before importing fpdf and the rest of the layout code: the
+    # command line imports this module only once it knows a build must run.
+    import sys
+
+    import doc_cli
+
+    sys.exit(doc_cli.main())
+
+from fpdf import FPDF, FPDF_VERSION
+from fpdf.enums import Align, PDFResourceType, TextEmphasis, WrapMode, XPos, YPos
+from fpdf.errors import FPDFException
+from fpdf.fonts import CoreFont
+from fpdf.line_break import MultiLineBreak, TextLine
+from fpdf.outline import OutlineSection
+from fpdf.output import OutputProducer
+from fpdf.syntax import DestinationXYZ, Name, PDFContentStream, PDFObject
+from fpdf.util import Padding
+from collections import Counter, OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
 import datetime
+import functools
+import hashlib
+import importlib
+import inspect
+import io
+import itertools
+import json
+import os
+import pickle
+import re
+import sys
+import tempfile
+import time
+import traceback
+import zlib
+
+import charts
+import doc_export
+import doc_model
+import excerpts
+import fonts
+import highlight
+import themes
+import task_report
+import variants
+import watch
+
+FONT_SELECT_RE = re.compile(rb"/F(\d+) ([\d.]+) Tf")
+FORM_RE = re.compile(rb"/I(\d+) Do")
 
 
 class TaskFlowDoc(FPDF):
-    INDIGO = (99, 102, 241)
-    INDIGO_DARK = (79, 70, 229)
-    DARK_BG = (15, 23, 42)
-    GRAY_700 = (51, 65, 85)
-    GRAY_500 = (100, 116, 139)
-    GRAY_400 = (148, 163, 184)
-    GRAY_200 = (226, 232, 240)
+    # INDIGO, GRAY_700, CODE_BG, SURFACE and the other colors come from the
+    # theme (see use_theme() and themes.ROLES); WHITE is text on INDIGO.
     WHITE = (255, 255, 255)
-    SUCCESS = (16, 185, 129)
-    WARNING = (245, 158, 11)
-    DANGER = (239, 68, 68)
-    ACCENT = (6, 182, 212)
-    CODE_BG = (241, 245, 249)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        created = build_time()
+        if created is not None:
+            self.set_creation_date(created)
+        self.generated_on = build_date()
+        # Added to page_no() wherever page 1 (the cover) is special-cased, so a
+        # section rendered on its own document still lays out like a body page.
+        self.page_offset = 0
+        self._fragment = None
+        self._toc_anchor = None
+        # Lines the table of contents will have (see toc_entries()), so
+        # contents_page() reserves enough pages for them.
+        self.toc_entries = 0
+        self._previous_block = None
+        self._spool = None
+        self.body_top = None
+        self.hooks = []
+        # Core family -> embedded family, and the files behind them (use_fonts()).
+        self.font_families = {}
+        self.font_files = {}
+        self.font_signature = ()
+        # Chart shapes -> index of the Form XObject drawing them (see chart()).
+        self._forms = {}
+        self.use_theme(themes.load())
 
     def header(self):
-        if self.page_no() == 1:
+        if self.page_no() + self.page_offset == 1:
             return
         self.set_font("Helvetica", "B", 8)
         self.set_text_color(*self.GRAY_500)
@@ -34,12 +102,409 @@ class TaskFlowDoc(FPDF):
         self.ln(6)
 
     def footer(self):
-        if self.page_no() == 1:
+        if self.page_no() + self.page_offset == 1:
             return
         self.set_y(-15)
         self.set_font("Helvetica", "I", 7)
         self.set_text_color(*self.GRAY_400)
-        self.cell(0, 10, f"Generated {datetime.date.today().strftime('%B %d, %Y')}  |  TaskFlow v2.0", align="C")
+        self.cell(0, 10, f"Generated {self.generated_on.strftime('%B %d, %Y')}  |  TaskFlow v2.0", align="C")
+
+    def add_page(self, *args, **kwargs):
+        if self._fragment is not None and self.page:
+            self._close_fragment_page()
+        super().add_page(*args, **kwargs)
+        self.body_top = self.y
+        if self._fragment is not None:
+            self._open_fragment_page()
+        if self.hooks:
+            self._hook("page_add")
+
+    def output(self, name="", *args, **kwargs):
+        if self._toc_anchor is not None and not self.buffer:
+            self._render_toc()
+        if self._spool is None or self.buffer:
+            result = super().output(name, *args, **kwargs)
+            self.sha256 = hashlib.sha256(self.buffer).hexdigest()
+            return result
+        if not name:
+            sink = io.BytesIO()
+            self._write_streaming(sink)
+            result = bytearray(sink.getvalue())
+        elif isinstance(name, (str, os.PathLike)):
+            with open(name, "wb") as sink:
+                self._write_streaming(sink)
+            result = None
+        else:
+            self._write_streaming(name)
+            result = None
+        self.sha256 = self.buffer.sha256.hexdigest()
+        return result
+
+    # ---- Instrumentation ----
+    #
+    # Each object in self.hooks is called at these points, through its
+    # on_<event>(pdf, ...) method when it has one (see Profiler):
+    #   section_start(node, spliced)   a top-level node is laid out, or spliced
+    #   section_end(node, spliced)     from a cached fragment
+    #   page_add()                     a page and its header have been opened
+    #   font_change()                  set_font() changed family, style or size
+    #   large_cell(text)               multi_cell() got LARGE_CELL_CHARS or more
+    #   emit(data)                     data was appended to the page's content
+    # Without hooks, each point costs one empty-list check.
+
+    LARGE_CELL_CHARS = 500
+
+    def _hook(self, event, *args):
+        for hook in self.hooks:
+            method = getattr(hook, "on_" + event, None)
+            if method is not None:
+                method(self, *args)
+
+    @contextlib.contextmanager
+    def section(self, node, spliced=False):
+        if self.hooks:
+            self._hook("section_start", node, spliced)
+        yield
+        if self.hooks:
+            self._hook("section_end", node, spliced)
+
+    def set_font(self, family=None, style="", size=0):
+        if family and self.font_families:
+            family = self.font_families.get(family.lower(), family)
+            emphasis = style.style if isinstance(style, TextEmphasis) else style.upper()
+            self._font(family.lower(), "".join(sorted(c for c in emphasis if c in "BI")))
+        if not self.hooks:
+            return super().set_font(family, style, size)
+        before = (self.font_family, self.font_style, self.font_size_pt)
+        super().set_font(family, style, size)
+        if (self.font_family, self.font_style, self.font_size_pt) != before:
+            self._hook("font_change")
+
+    def multi_cell(self, w, h=None, text="", *args, **kwargs):
+        if self.hooks and len(text) >= self.LARGE_CELL_CHARS:
+            self._hook("large_cell", text)
+        if args or kwargs or h is None or not self.page or self.text_shaping:
+            return super().multi_cell(w, h, text, *args, **kwargs)
+        return self._paragraph(w, h, text)
+
+    def _out(self, s):
+        super()._out(s)
+        if self.hooks:
+            self._hook("emit", s)
+
+    # ---- Streaming output ----
+    #
+    # FPDF keeps every page's content in memory until output(). With
+    # stream_pages() on, each page is compressed into a temporary spool file
+    # as soon as its footer is drawn, and output() writes the PDF straight to
+    # its destination, reading each page back only while it is serialized.
+    # The contents page is the one exception: it stays in memory until
+    # _render_toc() has filled it in.
+
+    def stream_pages(self, dir=None):
+        self._spool = PageSpool(dir)
+
+    def _render_footer(self):
+        super()._render_footer()
+        if self._spool is not None:
+            self._spool_page(self.page)
+
+    def _spool_page(self, n):
+        page = self.pages[n]
+        if self._toc_anchor is not None and any(anchor[0] == n for anchor in self._toc_anchor):
+            return
+        if isinstance(page.contents, bytearray):
+            page.contents = self._spool.write(page.contents, self.compress)
+
+    def _write_streaming(self, sink):
+        try:
+            super().output(output_producer_class=functools.partial(StreamingOutputProducer, sink=sink))
+        finally:
+            self._spool.close()
+
+    def _default_file_id(self, buffer):
+        if not isinstance(buffer, OutputSink):
+            return super()._default_file_id(buffer)
+        # Same ID the in-memory output would get, without re-reading the file.
+        id_hash = buffer.md5.copy()
+        if self.creation_date:
+            id_hash.update(self.creation_date.strftime("%Y%m%d%H%M%S").encode("utf8"))
+        hash_hex = id_hash.hexdigest().upper()
+        return f"<{hash_hex}><{hash_hex}>"
+
+    # ---- Embedded fonts ----
+
+    def use_fonts(self, files):
+        """Draw Helvetica and Courier text with TrueType fonts instead, given as
+        {(family, style): path} by fonts.find(). Fonts are loaded on first use."""
+        self.font_files = dict(files)
+        self.font_families = {fonts.STANDS_IN_FOR[family]: family for family, _ in files}
+        self.font_signature = fonts.signature(files)
+
+    # ---- Text measurement ----
+    #
+    # FPDF measures a paragraph's lines afresh on every multi_cell(), re-adding
+    # the width of the line so far for every character, which makes breaking
+    # the lines most of the time it takes to lay out body text. The lines a
+    # plain paragraph breaks into, like string widths, are kept in text_cache
+    # instead (see TextMeasureCache), and a paragraph met again is drawn from
+    # them with this document's font and colors.
+
+    def _metrics(self, font):
+        # What a font's widths come from: core fonts are built in, embedded
+        # ones are read from the files behind font_signature.
+        return font.fontkey if isinstance(font, CoreFont) else (font.fontkey, self.font_signature)
+
+    def get_string_width(self, s, normalized=False, markdown=False):
+        if markdown or self.current_font is None or self.text_shaping:
+            return super().get_string_width(s, normalized, markdown)
+        key = ("width", self._metrics(self.current_font), self.font_size_pt, self.char_spacing,
+               self.font_stretching, self.k, s)
+        width = text_cache.get(key)
+        if width is None:
+            width = text_cache.put(key, super().get_string_width(s, normalized))
+        return width
+
+    def _paragraph(self, w, h, text):
+        """multi_cell(w, h, text) with its defaults: justified, no border, and
+        ending at the start of the next line, right of the cell."""
+        if w == 0:
+            w = self.w - self.r_margin - self.x
+        text_lines = self._text_lines(w, h, self.normalize_text(text).replace("\r", ""))
+        page_break = False
+        for index, text_line in enumerate(text_lines):
+            page_break |= self._perform_page_break_if_need_be(h)
+            last = index == len(text_lines) - 1
+            self._render_styled_text_line(text_line, h=h, new_x=XPos.RIGHT if last else XPos.LEFT, new_y=YPos.NEXT,
+                                          border=0, fill=False, link=None, padding=Padding(0, 0, 0, 0))
+        if text_lines[-1].trailing_nl:
+            self.ln()
+        return page_break
+
+    def _text_lines(self, w, h, text):
+        """The TextLines multi_cell() would break text into at width w."""
+        fragments = self._preload_font_styles(text, False)
+        if len(fragments) != 1:
+            return self._break_lines(fragments, w, h)
+        fragment = fragments[0]
+        key = ("lines", self._metrics(fragment.font), fragment.font_size_pt, fragment.char_spacing,
+               fragment.font_stretching, self.k, self.c_margin, w, text)
+        lines = text_cache.get(key)
+        if lines is None:
+            text_lines = self._break_lines(fragments, w, h)
+            # A line is kept as its characters and measurements, which hold for
+            # any document with the same font metrics.
+            if all(len(line.fragments) <= 1 and all(f.link is None for f in line.fragments) for line in text_lines):
+                text_cache.put(key, [("".join(line.fragments[0].characters) if line.fragments else None,) + line[1:]
+                                     for line in text_lines])
+            return text_lines
+        return [TextLine([fragment.clone(chars)] if chars is not None else [], *rest) for chars, *rest in lines]
+
+    def _break_lines(self, fragments, w, h):
+        breaker = MultiLineBreak(fragments, w, [self.c_margin, self.c_margin], align=Align.J, wrapmode=WrapMode.WORD)
+        lines = []
+        line = breaker.get_line()
+        while line is not None:
+            lines.append(line)
+            line = breaker.get_line()
+        return lines or [TextLine([], text_width=0, number_of_spaces=0, align=Align.J, height=h, max_width=w)]
+
+    # ---- Themes ----
+
+    def use_theme(self, theme):
+        """Draw with the colors of a themes.Theme. Sections are laid out in the
+        light theme whatever the document's, and recolored as they are spliced in."""
+        self.theme = theme
+        self.__dict__.update(theme.colors)
+        self.set_page_background(None if self.SURFACE == self.WHITE else self.SURFACE)
+        light = themes.load()
+        self.recolor = None if theme.colors == light.colors else themes.Recolor(light, theme)
+
+    def _recolored(self, state):
+        if self.recolor is None:
+            return state
+        *font, lw, dc, fc, tc = state
+        return (*font, lw, *map(self.recolor.device, (dc, fc, tc)))
+
+    # ---- Section fragments ----
+    #
+    # A fragment is the body content of one section (everything between the
+    # page header and footer of each page it spans), captured on a scratch
+    # document. Splicing it into another document replays those bytes behind
+    # freshly rendered headers/footers, so page numbers stay correct.
+
+    def begin_fragment(self, continues=False):
+        self._fragment = SectionFragment(continues)
+        if self.page:
+            self._open_fragment_page()
+
+    def end_fragment(self):
+        self._close_fragment_page()
+        fragment, self._fragment = self._fragment, None
+        fragment.fonts = {font.i: (font.fontkey[:len(font.fontkey) - len(font.emphasis.style)], font.emphasis.style)
+                          for font in self.fonts.values()}
+        fragment.glyphs = {font.i: [code for glyph, code in font.subset.items() if glyph]
+                           for font in self.fonts.values() if not isinstance(font, CoreFont)}
+        fragment.outline = [(entry.name, entry.level, entry.page_number - 1, entry.dest.top)
+                            for entry in self._outline]
+        fragment.forms = {index: key for key, index in self._forms.items()}
+        fragment.end_state = self._graphics_state()
+        fragment.end_y = self.y
+        return fragment
+
+    def _open_fragment_page(self):
+        self._fragment_start = len(self.pages[self.page].contents)
+        self._fragment_state = self._graphics_state()
+
+    def _close_fragment_page(self):
+        content = bytes(self.pages[self.page].contents[self._fragment_start:])
+        self._fragment.pages.append((self._fragment_state, content))
+
+    def _graphics_state(self):
+        return (self.font_family, self.font_style, self.font_size_pt, self.underline,
+                self.line_width, self.draw_color, self.fill_color, self.text_color)
+
+    def _set_graphics_state(self, state):
+        family, style, size, underline, lw, dc, fc, tc = state
+        self.font_family, self.font_style, self.font_size_pt = family, style, size
+        self.underline = underline
+        self.current_font = self._font(family, style) if family else None
+        self.current_font_is_set_on_page = False
+        self.line_width = lw
+        self.draw_color, self.fill_color, self.text_color = dc, fc, tc
+
+    def _emit_graphics_state(self):
+        self._out(f"{self.line_width * self.k:.2f} w")
+        self._out(self.draw_color.serialize().upper())
+        self._out(self.fill_color.serialize().lower())
+
+    def _font(self, family, style=""):
+        # The font text in family/style is drawn with: embedded when use_fonts()
+        # has a file for it, a core font otherwise.
+        family = self.font_families.get(family, family)
+        fontkey = family + style
+        if fontkey not in self.fonts:
+            path = self.font_files.get((family, style))
+            self.fonts[fontkey] = (fonts.load(self, family, style, path) if path
+                                   else CoreFont(len(self.fonts) + 1, fontkey, style))
+        return self.fonts[fontkey]
+
+    @staticmethod
+    def printable(font, text):
+        """text with '?' for every character font can't draw: anything outside
+        Latin-1 for a core font, anything without a glyph for an embedded one."""
+        if isinstance(font, CoreFont):
+            return text.encode("latin-1", "replace").decode("latin-1")
+        if text.isascii():
+            return text
+        glyphs = font.glyph_ids
+        return "".join(c if c == "\n" or ord(c) in glyphs else "?" for c in text)
+
+    def splice_fragment(self, fragment):
+        font_ids = {}
+        for old, key in fragment.fonts.items():
+            font = self._font(*key)
+            font_ids[old] = font.i
+            # Codes are code points (fonts.StableSubsetMap), so the content needs
+            # no re-encoding; the glyphs only have to be part of this subset.
+            for code in fragment.glyphs.get(old, ()):
+                font.subset.pick(code)
+
+        form_ids = {}
+        for old, (shapes, width, height) in fragment.forms.items():
+            if self.recolor is not None:
+                shapes = self.recolor.content(shapes)
+            form_ids[old] = self._form(shapes, width, height)
+
+        def remap(match):
+            return b"/F%d %s Tf" % (font_ids[int(match.group(1))], match.group(2))
+
+        def remap_form(match):
+            return b"/I%d Do" % form_ids[int(match.group(1))]
+
+        first_page = self.page if fragment.continues else self.page + 1
+        for index, (state, content) in enumerate(fragment.pages):
+            self._set_graphics_state(self._recolored(state))
+            if index or not fragment.continues:
+                self.add_page()
+            else:
+                # Continuing mid-page: the content stream still carries the previous
+                # section's colors, so re-establish the state the fragment started from.
+                self._emit_graphics_state()
+            if content:
+                if self.recolor is not None:
+                    content = self.recolor.content(content)
+                if form_ids:
+                    content = FORM_RE.sub(remap_form, content)
+                    for match in FORM_RE.finditer(content):
+                        self._resource_catalog.add(PDFResourceType.X_OBJECT, int(match.group(1)), self.page)
+                self._out(FONT_SELECT_RE.sub(remap, content).rstrip(b"\n"))
+                for match in FONT_SELECT_RE.finditer(content):
+                    self._resource_catalog.add(PDFResourceType.FONT, font_ids[int(match.group(1))], self.page)
+        for name, level, index, top in fragment.outline:
+            page = first_page + index
+            self._outline.append(OutlineSection(name, level, page, DestinationXYZ(page, top=top)))
+        self._set_graphics_state(self._recolored(fragment.end_state))
+        self.set_xy(self.l_margin, fragment.end_y)
+
+    # ---- Table of contents ----
+    #
+    # The contents pages are reserved where they appear, as many as
+    # toc_entries lines need, and filled in from the outline (recorded by
+    # section_title/subsection) just before output, so the page numbers are
+    # always the real ones and nothing renders twice.
+
+    TOC_LINE_HEIGHT = 7
+
+    def reserve_toc(self, entries):
+        self._toc_anchor = [(self.page, self.y, self._graphics_state())]
+        room = int((self.page_break_trigger - self.y) / self.TOC_LINE_HEIGHT)
+        while room < entries:
+            self.add_page()
+            self._toc_anchor.append((self.page, self.y, self._graphics_state()))
+            room += int((self.page_break_trigger - self.y) / self.TOC_LINE_HEIGHT)
+
+    def _render_toc(self):
+        reserved = self._toc_anchor
+        anchors = iter(reserved)
+        self._toc_anchor = None
+        page, x, y, state = self.page, self.x, self.y, self._graphics_state()
+        auto_page_break = self.auto_page_break
+        self.set_auto_page_break(False, self.b_margin)
+        self._resume_toc(next(anchors))
+        for entry in self._outline:
+            if entry.level > 0:
+                continue
+            if self.y + self.TOC_LINE_HEIGHT > self.page_break_trigger:
+                anchor = next(anchors, None)
+                if anchor is None:
+                    raise FPDFException("The table of contents has more entries than toc_entries reserved pages for")
+                self._resume_toc(anchor)
+            num, title = entry.name.split(". ", 1)
+            link = self.add_link(y=(self.h_pt - entry.dest.top) / self.k, page=entry.page_number)
+            self.set_font("Helvetica", "B", 11)
+            self.set_text_color(*self.GRAY_700)
+            self.set_x(25)
+            self.cell(12, self.TOC_LINE_HEIGHT, num, new_x="END", link=link)
+            self.cell(100, self.TOC_LINE_HEIGHT, title, new_x="END", link=link)
+            self.set_font("Helvetica", "", 9)
+            self.set_text_color(*self.GRAY_400)
+            self.cell(0, self.TOC_LINE_HEIGHT, str(entry.page_number), align="R", new_x="LMARGIN", new_y="NEXT",
+                      link=link)
+        self.set_auto_page_break(auto_page_break, self.b_margin)
+        if self._spool is not None:
+            for toc_page, _, _ in reserved:
+                if toc_page != page:
+                    self._spool_page(toc_page)
+        self.page = page
+        self._set_graphics_state(state)
+        self.set_xy(x, y)
+
+    def _resume_toc(self, anchor):
+        toc_page, toc_y, toc_state = anchor
+        self.page, self.y = toc_page, toc_y
+        self._set_graphics_state(toc_state)
+        self._emit_graphics_state()
 
     # ---- Reusable helpers ----
 
@@ -54,28 +519,28 @@ class TaskFlowDoc(FPDF):
         self.set_y(32)
         self.set_font("Helvetica", "B", 42)
         self.set_text_color(*self.WHITE)
-        self.cell(0, 16, "TaskFlow", align="C", new_x="LMARGIN", new_y="NEXT")
+        self.cell(0, 16, doc_model.COVER["title"], align="C", new_x="LMARGIN", new_y="NEXT")
 
         self.set_font("Helvetica", "", 14)
         self.set_text_color(200, 200, 255)
-        self.cell(0, 10, "Smart Todo Manager", align="C", new_x="LMARGIN", new_y="NEXT")
+        self.cell(0, 10, doc_model.COVER["subtitle"], align="C", new_x="LMARGIN", new_y="NEXT")
         self.ln(6)
         self.set_font("Helvetica", "", 11)
-        self.cell(0, 8, "Architecture & Developer Documentation", align="C", new_x="LMARGIN", new_y="NEXT")
+        self.cell(0, 8, doc_model.COVER["kind"], align="C", new_x="LMARGIN", new_y="NEXT")
 
         # Subtitle box
         self.set_y(135)
         self.set_font("Helvetica", "", 11)
         self.set_text_color(*self.GRAY_700)
-        self.cell(0, 8, "Version 2.0  |  February 2026", align="C", new_x="LMARGIN", new_y="NEXT")
+        self.cell(0, 8, doc_model.COVER["version"], align="C", new_x="LMARGIN", new_y="NEXT")
         self.ln(4)
         self.set_font("Helvetica", "I", 10)
         self.set_text_color(*self.GRAY_500)
-        self.cell(0, 8, "A complete guide to understanding, maintaining, and extending the TaskFlow application.", align="C", new_x="LMARGIN", new_y="NEXT")
+        self.cell(0, 8, doc_model.COVER["summary"], align="C", new_x="LMARGIN", new_y="NEXT")
 
         # Tech badges
         self.ln(10)
-        techs = ["HTML5", "CSS3", "JavaScript ES6+", "Chart.js", "PWA", "LocalStorage API"]
+        techs = doc_model.COVER["badges"]
         total_w = sum(self.get_string_width(t) + 14 for t in techs) + 6 * (len(techs) - 1)
         start_x = (210 - total_w) / 2
         self.set_x(start_x)
@@ -89,6 +554,9 @@ class TaskFlowDoc(FPDF):
 
     def section_title(self, number, title):
         self.ln(6)
+        if self.will_page_break(12):
+            self.add_page()
+        self.start_section(f"{number}. {title}", level=0)
         self.set_font("Helvetica", "B", 20)
         self.set_text_color(*self.INDIGO)
         self.cell(0, 12, f"{number}. {title}", new_x="LMARGIN", new_y="NEXT")
@@ -100,6 +568,9 @@ class TaskFlowDoc(FPDF):
 
     def subsection(self, title):
         self.ln(3)
+        if self.will_page_break(9):
+            self.add_page()
+        self.start_section(title, level=1, strict=False)
         self.set_font("Helvetica", "B", 13)
         self.set_text_color(*self.GRAY_700)
         self.cell(0, 9, title, new_x="LMARGIN", new_y="NEXT")
@@ -131,32 +602,126 @@ class TaskFlowDoc(FPDF):
         self.multi_cell(remaining_w, 5.5, text)
         self.ln(1)
 
-    def code_block(self, code, title=None):
-        if title:
-            self.set_font("Helvetica", "B", 8)
-            self.set_text_color(*self.GRAY_500)
-            self.cell(0, 5, title, new_x="LMARGIN", new_y="NEXT")
-            self.ln(1)
-        self.set_fill_color(*self.CODE_BG)
-        self.set_draw_color(*self.GRAY_200)
+    CODE_LINE_H = 4.2
+    CODE_PAD = 4
+
+    def code_block(self, code=None, title=None, lang=None, ref=None):
+        """Draw a listing of any length: long lines soft-wrap, and a listing that
+        doesn't fit on one page continues on the next with its own background.
+        With a lang that highlight.py knows, tokens are colored by kind. Without
+        code, the listing is the excerpt of the project's sources that ref names
+        (see excerpts.py)."""
+        if code is None:
+            code = excerpts.excerpt(ref, ROOT)
         x = self.l_margin
         w = self.w - self.l_margin - self.r_margin
-        self.set_font("Courier", "", 8)
-        self.set_text_color(*self.GRAY_700)
-        lines = code.strip().split("\n")
-        line_h = 4.2
-        block_h = len(lines) * line_h + 8
-        if self.get_y() + block_h > self.h - self.b_margin:
+        line_h, pad = self.CODE_LINE_H, self.CODE_PAD
+        lines = self.wrap_code(code, w - 12, lang)
+        title_h = 6 if title else 0
+        block_h = len(lines) * line_h + 2 * pad
+        # Keep a listing that fits on a page in one piece (title included);
+        # a longer one starts here if a few of its lines fit.
+        fresh_page_h = self.page_break_trigger - (self.body_top or self.t_margin)
+        if self.y + title_h + block_h > self.page_break_trigger and (
+                title_h + block_h <= fresh_page_h
+                or self.y + title_h + pad + 3 * line_h > self.page_break_trigger):
             self.add_page()
-        y_start = self.get_y()
-        self.rect(x, y_start, w, block_h, "FD")
-        self.set_y(y_start + 4)
-        for line in lines:
-            self.set_x(x + 6)
-            self.cell(w - 12, line_h, line[:120], new_x="LMARGIN", new_y="NEXT")
-        self.set_y(y_start + block_h + 2)
+        continued = False
+        while True:
+            if title:
+                self.set_font("Helvetica", "B", 8)
+                self.set_text_color(*self.GRAY_500)
+                self.cell(0, 5, title + (" (continued)" if continued else ""), new_x="LMARGIN", new_y="NEXT")
+                self.ln(1)
+            top = self.y
+            fit = int((self.page_break_trigger - top - 2 * pad) // line_h)
+            page_lines, lines = lines[:fit], lines[fit:]
+            h = self.page_break_trigger - top if lines else len(page_lines) * line_h + 2 * pad
+            self.set_fill_color(*self.CODE_BG)
+            self.set_draw_color(*self.GRAY_200)
+            self.rect(x, top, w, h, "FD")
+            self._code_text(page_lines, x + 6 + self.c_margin, top + pad)
+            if not lines:
+                break
+            self.add_page()
+            continued = True
+        self.set_y(top + h + 2)
         self.ln(2)
 
+    def wrap_code(self, code, width, lang=None):
+        """Split code into display lines no wider than width, measured once for the
+        whole listing (the code font gives every character the same advance). Each
+        line is a list of (kind, text) runs from highlight.tokenize()."""
+        font = self._font("courier")
+        columns = max(int(width // (font.get_text_width("m", 8, None)[1] / self.k)), 16)
+        code = self.printable(font, code.strip().expandtabs(4))
+        lines = []
+        for runs in highlight.tokenize(code, lang):
+            line = "".join(text for _, text in runs)
+            if len(line) <= columns:
+                lines.append(runs)
+                continue
+            # Continuations line up a little inside the line they belong to.
+            indent = " " * min(len(line) - len(line.lstrip(" ")) + 4, columns // 2)
+            start, room = 0, columns
+            while len(line) - start > room:
+                cut = line.rfind(" ", start + room // 2, start + room) + 1 or start + room
+                lines.append(self._slice_runs(runs, start, cut, indent if start else ""))
+                start = cut
+                while start < len(line) and line[start] == " ":
+                    start += 1
+                room = columns - len(indent)
+            lines.append(self._slice_runs(runs, start, len(line), indent if start else ""))
+        return lines
+
+    @staticmethod
+    def _slice_runs(runs, start, end, indent=""):
+        # The runs covering line[start:end], right-stripped, after an indent run.
+        out = [(None, indent)] if indent else []
+        pos = 0
+        for kind, text in runs:
+            piece = text[max(start - pos, 0):max(end - pos, 0)]
+            pos += len(text)
+            if piece:
+                out.append((kind, piece))
+        while out and not out[-1][1].strip():
+            out.pop()
+        if out:
+            out[-1] = (out[-1][0], out[-1][1].rstrip())
+        return out
+
+    def _code_text(self, lines, x, top):
+        # One text object for the whole page of code: each line starts with the '
+        # operator, which steps down by the leading (TL) first, and continues with
+        # Tj. Runs that share a color are shown together, and rg is only emitted
+        # when the color actually changes.
+        font = self._font("courier")
+        k = self.k
+        above_first = top + 0.5 * self.CODE_LINE_H + 0.3 * 8 / k - self.CODE_LINE_H
+        out = ["q", "BT", "/F%d 8.00 Tf" % font.i,
+               "%.2f TL" % (self.CODE_LINE_H * k),
+               "%.2f %.2f Td" % (x * k, (self.h - above_first) * k)]
+        state = StyleState()
+        colors = {kind: getattr(self, name) for kind, name in themes.SYNTAX_ROLES.items()}
+        for runs in lines:
+            merged = []
+            for kind, text in runs:
+                color = colors.get(kind, self.GRAY_700)
+                if merged and (merged[-1][0] == color or text.isspace()):
+                    merged[-1][1] += text
+                elif merged and merged[-1][1].isspace():
+                    merged[-1] = [color, merged[-1][1] + text]
+                else:
+                    merged.append([color, text])
+            if not merged:
+                out.append("T*")
+            for i, (color, text) in enumerate(merged):
+                state.emit(out, "text", _rgb(color, "rg"))
+                out.append(font.encode_text(text)[:-2] + ("Tj" if i else "'"))
+        out += ["ET", "Q"]
+        self._resource_catalog.add(PDFResourceType.FONT, font.i, self.page)
+        self._out("\n".join(out).encode("latin-1"))
+
     def info_box(self, text, color=None):
         if color is None:
             color = self.INDIGO
@@ -164,8 +729,7 @@ class TaskFlowDoc(FPDF):
         w = self.w - self.l_margin - self.r_margin
         self.set_fill_color(color[0], color[1], color[2])
         self.rect(x, self.get_y(), 3, 18, "F")
-        bg = (color[0] // 4 + 191, color[1] // 4 + 191, color[2] // 4 + 191)
-        self.set_fill_color(*bg)
+        self.set_fill_color(*self.theme.tint(color))
         self.rect(x + 3, self.get_y(), w - 3, 18, "F")
         self.set_x(x + 10)
         self.set_font("Helvetica", "", 9)
@@ -188,1207 +752,1134 @@ class TaskFlowDoc(FPDF):
     def table_row(self, cells, widths, fill=False):
         if fill:
             self.set_fill_color(*self.CODE_BG)
-        else:
-            self.set_fill_color(*self.WHITE)
         self.set_text_color(*self.GRAY_700)
         self.set_font("Helvetica", "", 9)
         for i, cell_text in enumerate(cells):
-            self.cell(widths[i], 7, cell_text, border=1, align="C" if i > 0 else "L", fill=True)
+            self.cell(widths[i], 7, cell_text, border=1, align="C" if i > 0 else "L", fill=fill)
         self.ln()
 
+    def table_rows(self, rows, widths=None, header=None, aligns=None):
+        """Lay out a table of any size with TableLayout: rows (any iterable, consumed
+        lazily) wrap to fit their column, the header repeats on every page, and
+        widths=None fits the columns to their content."""
+        TableLayout(self, header, widths, aligns).draw(rows)
+
+    # ---- Charts ----
+    #
+    # The shapes of a chart (charts.layout()) are drawn into a Form XObject,
+    # once per document, and each use of it is one Do operator; its labels are
+    # set as text around it. A fragment carries the forms it uses, and
+    # splicing adds them to the document, recolored for its theme.
+
+    CHART_H = 55
+
+    def chart(self, kind, labels, values, title=None):
+        w = self.w - self.l_margin - self.r_margin
+        h = self.CHART_H
+        title_h = 6 if title else 0
+        if self.y + title_h + h > self.page_break_trigger:
+            self.add_page()
+        if title:
+            self.set_font("Helvetica", "B", 8)
+            self.set_text_color(*self.GRAY_500)
+            self.cell(0, 5, title, new_x="LMARGIN", new_y="NEXT")
+            self.ln(1)
+        drawn = charts.layout(kind, tuple(labels), tuple(values), w, h, tuple(sorted(self.theme.colors.items())))
+        x, top = self.l_margin, self.y
+        index = self._form(drawn.shapes, drawn.width, drawn.height)
+        self._out("q 1 0 0 1 %.2f %.2f cm /I%d Do Q" % (x * self.k, (self.h - top - h) * self.k, index))
+        self._resource_catalog.add(PDFResourceType.X_OBJECT, index, self.page)
+        self.set_font("Helvetica", "", 7)
+        for lx, ly, lw, text, align, role in drawn.labels:
+            self.set_text_color(*getattr(self, role))
+            self.set_xy(x + lx, top + ly)
+            self.cell(lw, charts.LABEL_H, text, align=align)
+        self.set_xy(self.l_margin, top + h + 2)
+        self.ln(2)
 
-def build_pdf():
+    def _form(self, shapes, width, height):
+        """The index of the Form XObject drawing shapes in a width x height pt box."""
+        key = (shapes, width, height)
+        index = self._forms.get(key)
+        if index is None:
+            form = PDFContentStream(contents=shapes, compress=self.compress)
+            form.type = Name("XObject")
+            form.subtype = Name("Form")
+            form.b_box = "[0 0 %.2f %.2f]" % (width, height)
+            catalog = self._resource_catalog
+            index = self._forms[key] = catalog.next_xobject_index
+            catalog.next_xobject_index += 1
+            catalog.form_xobjects.append((index, form))
+        return index
+
+    def contents_page(self):
+        self.add_page()
+        self.set_font("Helvetica", "B", 22)
+        self.set_text_color(*self.INDIGO)
+        self.cell(0, 14, "Table of Contents", new_x="LMARGIN", new_y="NEXT")
+        self.ln(6)
+        self.reserve_toc(self.toc_entries)
+
+    def back_cover(self):
+        self.add_page()
+        self.ln(30)
+        self.set_fill_color(*self.INDIGO)
+        self.rect(0, self.get_y() - 10, 210, 70, "F")
+        self.set_font("Helvetica", "B", 28)
+        self.set_text_color(*self.WHITE)
+        self.cell(0, 14, doc_model.COVER["title"], align="C", new_x="LMARGIN", new_y="NEXT")
+        self.set_font("Helvetica", "", 12)
+        self.set_text_color(200, 200, 255)
+        self.cell(0, 8, doc_model.BACK_COVER["subtitle"], align="C", new_x="LMARGIN", new_y="NEXT")
+        self.ln(6)
+        self.set_font("Helvetica", "", 10)
+        self.cell(0, 6, f"Generated on {self.generated_on.strftime('%B %d, %Y')}", align="C", new_x="LMARGIN", new_y="NEXT")
+
+        self.set_y(self.get_y() + 30)
+        self.set_text_color(*self.GRAY_700)
+        self.set_font("Helvetica", "", 10)
+        self.cell(0, 6, doc_model.BACK_COVER["built_with"], align="C", new_x="LMARGIN", new_y="NEXT")
+        self.ln(2)
+        self.set_font("Helvetica", "I", 9)
+        self.set_text_color(*self.GRAY_500)
+        self.cell(0, 6, doc_model.BACK_COVER["motto"], align="C", new_x="LMARGIN", new_y="NEXT")
+
+    # ---- Task report appendix ----
+
+    def task_report(self, source, number="A"):
+        self.add_page()
+        self._previous_block = None
+        self.section_title(number, "Task Report")
+        for node in task_report.appendix(source, number, self.generated_on):
+            self.render_node(node)
+
+    # ---- Document model rendering ----
+
+    PAGE_RENDERERS = {"cover": "cover_page", "contents": "contents_page", "back-cover": "back_cover",
+                      "task-report": "task_report"}
+
+    def render_node(self, node):
+        getattr(self, "_render_" + node.kind)(node)
+
+    def _render_children(self, node):
+        for child in node.children:
+            self.render_node(child)
+
+    def _space_before(self, kind):
+        # Breathing room the layout wants between certain neighbouring blocks.
+        previous, self._previous_block = self._previous_block, kind
+        if previous == "table":
+            self.ln(4)
+        elif previous == "bullet" and kind == "paragraph":
+            self.ln(2)
+
+    def _render_document(self, node):
+        self.toc_entries = toc_entries(node)
+        for child in node.children:
+            with self.section(child):
+                self.render_node(child)
+
+    def _render_page(self, node):
+        attrs = dict(node.attrs)
+        getattr(self, self.PAGE_RENDERERS[attrs.pop("name")])(**attrs)
+
+    def _render_section(self, node):
+        self._previous_block = None
+        if not node.get("continues"):
+            self.add_page()
+        self.section_title(node["number"], node["title"])
+        self._render_children(node)
+
+    def _render_subsection(self, node):
+        self._space_before("subsection")
+        self.subsection(node["title"])
+        self._render_children(node)
+
+    def _render_subsubsection(self, node):
+        self._space_before("subsubsection")
+        self.subsubsection(node["title"])
+        self._render_children(node)
+
+    def _render_paragraph(self, node):
+        self._space_before("paragraph")
+        self.body_text(node["text"])
+
+    def _render_bullet(self, node):
+        self._space_before("bullet")
+        self.bullet(node["text"], level=node.get("level", 0))
+
+    def _render_code(self, node):
+        self._space_before("code")
+        self.code_block(node.get("code"), title=node.get("title"), lang=node.get("lang"), ref=node.get("ref"))
+
+    def _render_table(self, node):
+        self._space_before("table")
+        self.table_rows(node["rows"], node.get("widths"), header=node["columns"], aligns=node.get("aligns"))
+
+    def _render_info(self, node):
+        self._space_before("info")
+        self.info_box(node["text"], color=getattr(self, node.get("color", "INDIGO")))
+
+    def _render_chart(self, node):
+        self._space_before("chart")
+        self.chart(node["type"], node["labels"], node["values"], title=node.get("title"))
+
+
+# ===================== TEXT MEASUREMENT =====================
+
+class TextMeasureCache:
+    """Bounded LRU of text measurements: string widths ("width"), the lines
+    multi_cell() breaks a paragraph into ("lines") and TableLayout's cell
+    wrapping ("wrap"). A key starts with that kind and holds everything the
+    measurement depends on (font metrics, size, width, text) but nothing of
+    the document, so one cache serves every section, variant and watch-mode
+    rebuild laid out in the process."""
+
+    def __init__(self, maxsize=8192):
+        self.maxsize = maxsize
+        self.memory = OrderedDict()
+        self.hits = Counter()    # kind -> lookups found
+        self.misses = Counter()  # kind -> lookups measured afresh
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None:
+            self.misses[key[0]] += 1
+            return None
+        self.memory.move_to_end(key)
+        self.hits[key[0]] += 1
+        return value
+
+    def put(self, key, value):
+        self.memory[key] = value
+        if len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+        return value
+
+    def totals(self):
+        return sum(self.hits.values()), sum(self.misses.values())
+
+
+text_cache = TextMeasureCache()
+
+
+# ===================== TABLE LAYOUT =====================
+
+class StyleState:
+    """The color, font and line width operators in effect in a content stream,
+    so that re-selecting the current one writes nothing."""
+
+    def __init__(self):
+        self.current = {}
+
+    def emit(self, out, key, operator):
+        if self.current.get(key) != operator:
+            self.current[key] = operator
+            out.append(operator)
+
+
+def _rgb(color, operator):
+    return "%.3f %.3f %.3f %s" % (color[0] / 255, color[1] / 255, color[2] / 255, operator)
+
+
+class TableLayout:
+    """Table engine for TaskFlowDoc.
+
+    Rows are measured and wrapped in bulk and placed a page at a time; each
+    page's table is then written as a single block of PDF operators rather
+    than one cell() per column: backgrounds grouped by color, every border in
+    one stroke, and one text object, with StyleState dropping redundant color,
+    font and line-width changes. The block is wrapped in q/Q, so FPDF's own
+    idea of the current graphics state still holds afterwards.
+    """
+
+    HEADER_H = 8
+    ROW_H = 7
+    LINE_H = 4.5
+    FONT_SIZE = 9
+    # Rows looked at to fit column widths when none are given.
+    AUTO_WIDTH_SAMPLE = 500
+
+    def __init__(self, pdf, header=None, widths=None, aligns=None):
+        self.pdf = pdf
+        self.header = header
+        self.widths = widths
+        self.aligns = aligns
+        self.body_font = pdf._font("helvetica")
+        self.header_font = pdf._font("helvetica", "B")
+
+    def text_width(self, text, font):
+        # Core font widths are keyed by character, embedded ones by code point.
+        widths = map(font.cw.__getitem__, text if isinstance(font, CoreFont) else map(ord, text))
+        return sum(widths) * self.FONT_SIZE / 1000 / self.pdf.k
+
+    def wrap(self, text, width, font):
+        """Greedy word wrap of text to width (mm); words wider than a line are
+        split. Repeated cells come from text_cache."""
+        key = ("wrap", self.pdf._metrics(font), self.FONT_SIZE, self.pdf.k, width, text)
+        lines = text_cache.get(key)
+        if lines is None:
+            lines = text_cache.put(key, tuple(self._wrap(text, width, font)))
+        return lines
+
+    def _wrap(self, text, width, font):
+        space = self.text_width(" ", font)
+        lines = []
+        for paragraph in text.split("\n"):
+            line, line_w = [], 0
+            for word in paragraph.split(" "):
+                word_w = self.text_width(word, font)
+                if line and line_w + space + word_w > width:
+                    lines.append(" ".join(line))
+                    line, line_w = [], 0
+                while word_w > width and len(word) > 1:
+                    cut = len(word) - 1
+                    while cut > 1 and self.text_width(word[:cut], font) > width:
+                        cut -= 1
+                    lines.append(word[:cut])
+                    word = word[cut:]
+                    word_w = self.text_width(word, font)
+                line_w += (space if line else 0) + word_w
+                line.append(word)
+            lines.append(" ".join(line))
+        return lines
+
+    def fit_widths(self, sample):
+        """Column widths that fill the text area: each column gets at least its
+        longest word and shares what is left in proportion to its longest line."""
+        pdf = self.pdf
+        available = pdf.w - pdf.l_margin - pdf.r_margin
+        padding = 2 * pdf.c_margin
+        columns = len(self.header) if self.header else len(sample[0])
+        least, most = [padding] * columns, [padding] * columns
+        labelled = [(self.header, self.header_font)] if self.header else []
+        for cells, font in labelled + [(row, self.body_font) for row in sample]:
+            for i, text in enumerate(cells):
+                text = self.clean(text)
+                longest_word = max(self.text_width(word, font) for word in text.split())  if text.strip() else 0
+                least[i] = max(least[i], longest_word + padding)
+                most[i] = max(most[i], max(self.text_width(line, font) for line in text.split("\n")) + padding)
+        if sum(least) >= available:
+            return [available * w / sum(least) for w in least]
+        spare = available - sum(least)
+        stretch = [m - l for l, m in zip(least, most)]
+        if sum(stretch) > spare:
+            return [l + spare * s / sum(stretch) for l, s in zip(least, stretch)]
+        # Everything fits on one line: share the rest in proportion to content.
+        return [m + (available - sum(most)) * m / sum(most) for m in most]
+
+    def clean(self, text):
+        return self.pdf.printable(self.body_font, str(text))
+
+    def draw(self, rows):
+        pdf = self.pdf
+        rows = iter(rows)
+        if self.widths is None:
+            sample = list(itertools.islice(rows, self.AUTO_WIDTH_SAMPLE))
+            if not sample and not self.header:
+                return
+            self.widths = self.fit_widths(sample)
+            rows = itertools.chain(sample, rows)
+        columns = len(self.widths)
+        aligns = self.aligns or "L" + "C" * (columns - 1)
+        inner = [w - 2 * pdf.c_margin for w in self.widths]
+        header_h = self.HEADER_H if self.header else 0
+        x = pdf.l_margin
+        page = None
+        for index, cells in enumerate(rows):
+            lines = [self.wrap(self.clean(text), inner[i], self.body_font) for i, text in enumerate(cells)]
+            height = max(self.ROW_H, max(map(len, lines)) * self.LINE_H + self.ROW_H - self.LINE_H)
+            if page is None or y + height > pdf.page_break_trigger:
+                if page is not None:
+                    self._write(page)
+                    pdf.add_page()
+                elif pdf.y + header_h + height > pdf.page_break_trigger:
+                    pdf.add_page()
+                page, y = self._start_page(x, pdf.y, aligns)
+                y += header_h
+                # A row taller than a whole page is cut to fit.
+                room = int((pdf.page_break_trigger - y - self.ROW_H + self.LINE_H) // self.LINE_H)
+                if height > pdf.page_break_trigger - y:
+                    lines = [cell_lines[:room] for cell_lines in lines]
+                    height = room * self.LINE_H + self.ROW_H - self.LINE_H
+            fill = pdf.CODE_BG if index % 2 == 0 else pdf.SURFACE
+            self._place(page, x, y, height, lines, self.body_font, pdf.GRAY_700, fill, aligns)
+            y += height
+        if page is None:
+            if not self.header:
+                return
+            if pdf.y + header_h > pdf.page_break_trigger:
+                pdf.add_page()
+            page, y = self._start_page(x, pdf.y, aligns)
+            y += header_h
+        self._write(page)
+        pdf.set_xy(pdf.l_margin, y)
+
+    def _start_page(self, x, y, aligns):
+        page = TablePage(y)
+        if self.header:
+            lines = [[self.clean(text)] for text in self.header]
+            self._place(page, x, y, self.HEADER_H, lines, self.header_font, self.pdf.WHITE, self.pdf.INDIGO,
+                        "C" * len(self.widths))
+        return page, y
+
+    def _place(self, page, x, y, height, lines, font, color, fill, aligns):
+        pdf = self.pdf
+        k = pdf.k
+        if fill != pdf.SURFACE:  # the page is already that color
+            page.fills.setdefault(fill, []).append(
+                "%.2f %.2f %.2f %.2f re" % (x * k, (pdf.h - y) * k, sum(self.widths) * k, -height * k))
+        page.bottom = y + height
+        for w, cell_lines, align in zip(self.widths, lines, aligns):
+            first = y + (height - len(cell_lines) * self.LINE_H) / 2
+            for j, line in enumerate(cell_lines):
+                if not line:
+                    continue
+                if align == "L":
+                    tx = x + pdf.c_margin
+                else:
+                    line_w = self.text_width(line, font)
+                    tx = x + (w - line_w) / 2 if align == "C" else x + w - pdf.c_margin - line_w
+                baseline = first + (j + 0.5) * self.LINE_H + 0.3 * self.FONT_SIZE / k
+                page.texts.append((font, color, tx * k, (pdf.h - baseline) * k, font.encode_text(line)))
+            x += w
+        page.rules.append(page.bottom)
+
+    def _write(self, page):
+        pdf = self.pdf
+        k = pdf.k
+        state = StyleState()
+        out = ["q"]
+        for color, rects in page.fills.items():
+            state.emit(out, "fill", _rgb(color, "rg"))
+            out.extend(rects)
+            out.append("f")
+        # The grid: one rule under every row plus the column edges, in one stroke.
+        left, right = pdf.l_margin * k, (pdf.l_margin + sum(self.widths)) * k
+        top, bottom = (pdf.h - page.top) * k, (pdf.h - page.bottom) * k
+        state.emit(out, "width", "%.2f w" % (0.2 * k))
+        state.emit(out, "stroke", _rgb(pdf.GRAY_200, "RG"))
+        for y in [page.top] + page.rules:
+            out.append("%.2f %.2f m %.2f %.2f l" % (left, (pdf.h - y) * k, right, (pdf.h - y) * k))
+        x = pdf.l_margin
+        for w in [0] + self.widths:
+            x += w
+            out.append("%.2f %.2f m %.2f %.2f l" % (x * k, top, x * k, bottom))
+        out.append("S")
+        # Text positioned with relative moves from the previous line's start.
+        out.append("BT")
+        tx0 = ty0 = 0
+        for font, color, tx, ty, text in page.texts:
+            state.emit(out, "font", "/F%d %.2f Tf" % (font.i, self.FONT_SIZE))
+            state.emit(out, "fill", _rgb(color, "rg"))
+            # Moves between rounded positions, so rounding never accumulates.
+            tx, ty = round(tx, 2), round(ty, 2)
+            out.append("%.2f %.2f Td %s" % (tx - tx0, ty - ty0, text))
+            tx0, ty0 = tx, ty
+        out.append("ET")
+        out.append("Q")
+        for font in {font for font, *_ in page.texts}:
+            pdf._resource_catalog.add(PDFResourceType.FONT, font.i, pdf.page)
+        pdf._out("\n".join(out).encode("latin-1"))
+
+
+class TablePage:
+    """What TableLayout has placed on the current page, waiting to be written."""
+
+    def __init__(self, top):
+        self.top = self.bottom = top
+        self.fills = {}   # color -> row background rects
+        self.rules = []   # y of the rule under each row
+        self.texts = []   # (font, color, x, y, escaped text), in pt
+
+
+# ===================== STREAMING OUTPUT =====================
+
+class PageSpool:
+    """Temporary file holding the compressed content streams of closed pages."""
+
+    def __init__(self, dir=None):
+        self.file = tempfile.TemporaryFile(dir=dir)
+        self.size = 0
+
+    def write(self, contents, compress=True):
+        data = zlib.compress(contents, PDFContentStream._COMPRESSION_LEVEL) if compress else bytes(contents)
+        self.file.seek(self.size)
+        self.file.write(data)
+        stream = SpooledContentStream(self, self.size, len(data), compress)
+        self.size += len(data)
+        return stream
+
+    def read(self, offset, length):
+        self.file.seek(offset)
+        return self.file.read(length)
+
+    def close(self):
+        self.file.close()
+
+
+class SpooledContentStream(PDFContentStream):
+    """A page content stream whose bytes stay in the spool until serialized."""
+
+    def __init__(self, spool, offset, length, compressed):
+        PDFObject.__init__(self)
+        self._spool = spool
+        self._offset = offset
+        self._contents = None
+        self.filter = Name("FlateDecode") if compressed else None
+        self.length = length
+
+    def serialize(self, obj_dict=None, _security_handler=None):
+        self._contents = self._spool.read(self._offset, self.length)
+        try:
+            return super().serialize(obj_dict, _security_handler)
+        finally:
+            self._contents = None
+
+
+class OutputSink:
+    """Stands in for OutputProducer.buffer: appends go straight to a file."""
+
+    def __init__(self, file):
+        self.file = file
+        self.size = 0
+        self.md5 = hashlib.md5(usedforsecurity=False)
+        self.sha256 = hashlib.sha256()
+
+    def __iadd__(self, data):
+        self.file.write(data)
+        self.md5.update(data)
+        self.sha256.update(data)
+        self.size += len(data)
+        return self
+
+    def __len__(self):
+        return self.size
+
+
+class StreamingOutputProducer(OutputProducer):
+    def __init__(self, fpdf, sink):
+        super().__init__(fpdf)
+        self.buffer = OutputSink(sink)
+
+    def _add_pages(self, _slice=slice(0, None)):
+        # Let OutputProducer set the pages up as usual, then swap the content
+        # streams it built from the (emptied) spooled pages for the spooled ones.
+        spooled = {}
+        for page in self._iter_pages_in_order():
+            if isinstance(page.contents, SpooledContentStream):
+                spooled[page.index()], page.contents = page.contents, bytearray()
+        page_objs = super()._add_pages(_slice)
+        positions = {id(obj): i for i, obj in enumerate(self.pdf_objs)}
+        for page in page_objs:
+            stream = spooled.get(page.index())
+            if stream is not None:
+                stream.id = page.contents.id
+                self.pdf_objs[positions[id(page.contents)]] = stream
+                page.contents = stream
+        return page_objs
+
+
+# ===================== PROFILING =====================
+
+class Profiler:
+    """TaskFlowDoc hook that times each top-level node and counts what it produced:
+    pages, content bytes, graphics-state operators (colors, line styles, fonts),
+    set_font() changes, large multi_cell() calls and text_cache hits and misses.
+
+    A cached section is only spliced, and is reported as such. When a section is
+    laid out in this process and then spliced, its counters come from the layout
+    and its time covers both. Sections rendered by worker processes (-j) are seen
+    only as splices.
+    """
+
+    COUNTERS = ("pages", "bytes", "state_ops", "font_changes", "large_cells", "text_hits", "text_misses")
+    STATE_OP_RE = re.compile(rb" (?:rg|RG|g|G|w|J|j|d|gs|Tf)$", re.M)
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.stack = []
+        self.entries = {}  # label -> {"layout": span or None, "splice": span or None}
+        self.phases = []
+        self.events = []   # Chrome trace events
+
+    def _now(self):
+        return (time.perf_counter() - self.origin) * 1e6
+
+    def _open(self, name, category):
+        span = {"name": name, "cat": category, "ts": self._now(), **dict.fromkeys(self.COUNTERS, 0)}
+        span["text"] = text_cache.totals()
+        self.stack.append(span)
+        return span
+
+    def _close(self):
+        span = self.stack.pop()
+        span["dur"] = self._now() - span["ts"]
+        hits, misses = text_cache.totals()
+        span["text_hits"], span["text_misses"] = hits - span["text"][0], misses - span["text"][1]
+        self.events.append({"name": span["name"], "cat": span["cat"], "ph": "X", "ts": span["ts"],
+                            "dur": span["dur"], "pid": os.getpid(), "tid": 0,
+                            "args": {key: span[key] for key in self.COUNTERS}})
+        return span
+
+    def _count(self, key, amount=1):
+        if self.stack:
+            self.stack[-1][key] += amount
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        self._open(name, "phase")
+        try:
+            yield
+        finally:
+            self.phases.append(self._close())
+
+    def on_section_start(self, pdf, node, spliced):
+        self._open(section_label(node), "splice" if spliced else "layout")
+
+    def on_section_end(self, pdf, node, spliced):
+        span = self._close()
+        entry = self.entries.setdefault(span["name"], {"layout": None, "splice": None})
+        entry["splice" if spliced else "layout"] = span
+
+    def on_page_add(self, pdf):
+        self._count("pages")
+        self.events.append({"name": "page", "cat": "page", "ph": "i", "s": "t", "ts": self._now(),
+                            "pid": os.getpid(), "tid": 0, "args": {"page": pdf.page}})
+
+    def on_font_change(self, pdf):
+        self._count("font_changes")
+
+    def on_large_cell(self, pdf, text):
+        self._count("large_cells")
+        self.events.append({"name": "large cell", "cat": "cell", "ph": "i", "s": "t", "ts": self._now(),
+                            "pid": os.getpid(), "tid": 0, "args": {"chars": len(text)}})
+
+    def on_emit(self, pdf, data):
+        if isinstance(data, str):
+            data = data.encode("latin-1", "replace")
+        self._count("bytes", len(data) + 1)
+        self._count("state_ops", len(self.STATE_OP_RE.findall(data)))
+
+    def sections(self):
+        """[(label, seconds, counters, cached)] slowest first."""
+        rows = []
+        for label, entry in self.entries.items():
+            layout, splice = entry["layout"], entry["splice"]
+            counters = layout or splice
+            seconds = sum(span["dur"] for span in (layout, splice) if span) / 1e6
+            rows.append((label, seconds, counters, layout is None))
+        return sorted(rows, key=lambda row: row[1], reverse=True)
+
+    def report(self, out=None):
+        rows = self.sections()
+        total = sum(row[1] for row in rows) or 1
+        print(f"\n{'section':<42} {'time':>9} {'share':>6} {'pages':>6} {'KB':>8} {'state ops':>10} "
+              f"{'fonts':>6} {'large':>6} {'text hit':>9}", file=out)
+        for label, seconds, c, cached in rows:
+            print(f"{(label + (' *' if cached else ''))[:42]:<42} {seconds * 1000:>7.1f}ms {seconds / total:>6.1%} "
+                  f"{c['pages']:>6} {c['bytes'] / 1024:>8.1f} {c['state_ops']:>10} {c['font_changes']:>6} "
+                  f"{c['large_cells']:>6} {hit_rate(c['text_hits'], c['text_misses']):>9}", file=out)
+        for span in self.phases:
+            print(f"{'[' + span['name'] + ']':<42} {span['dur'] / 1000:>7.1f}ms", file=out)
+        kinds = sorted(set(text_cache.hits) | set(text_cache.misses))
+        if kinds:
+            rates = (f"{kind} {hit_rate(text_cache.hits[kind], text_cache.misses[kind])} of "
+                     f"{text_cache.hits[kind] + text_cache.misses[kind]:,}" for kind in kinds)
+            print(f"text cache hits: {', '.join(rates)} ({len(text_cache.memory):,} entries)", file=out)
+        if any(row[3] for row in rows):
+            print("* spliced from the section cache or a worker; use --no-cache -j 1 to profile its layout",
+                  file=out)
+
+    def write_trace(self, path):
+        """Write the spans and events in Chrome's trace-event format (chrome://tracing, Perfetto)."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": sorted(self.events, key=lambda e: e["ts"]), "displayTimeUnit": "ms"}, f)
+
+
+def hit_rate(hits, misses):
+    return f"{hits / (hits + misses):.0%}" if hits + misses else "-"
+
+
+def section_label(node):
+    if node.kind == "page":
+        return f"[{node['name']}]" if "number" not in node.attrs else f"{node['number']}. {node['name']}"
+    return f"{node['number']}. {node['title']}" if "number" in node.attrs else node.get("title", node.kind)
+
+
+# ===================== SECTION REGISTRY & BUILD CACHE =====================
+
+ROOT = variants.ROOT
+DEFAULT_SOURCE = variants.DEFAULT_SOURCE
+
+# node: a top-level page or section node of the document model.
+# continues: the section flows on from the previous page instead of opening its own.
+# inputs: extra values (beyond the node's content) that its output depends on.
+# cached: False for sections that must be laid out on the final document itself.
+Section = namedtuple("Section", "node continues inputs cached", defaults=(False, None, True))
+
+PAGE_INPUTS = {"back-cover": lambda pdf: pdf.generated_on.isoformat()}
+# Laid out on the final document: the contents page is filled in at output
+# time, and a task report can run to thousands of pages (see --stream).
+LIVE_PAGES = {"contents", "task-report"}
+
+
+def toc_entries(document):
+    """Lines in the document's table of contents: one per numbered section,
+    appendices included."""
+    return sum(node.kind == "section" or node.kind == "page" and node["name"] == "task-report"
+               for node in document.children)
+
+
+def document_sections(document):
+    sections = []
+    for node in document.children:
+        if node.kind == "page":
+            name = node["name"]
+            sections.append(Section(node, inputs=PAGE_INPUTS.get(name), cached=name not in LIVE_PAGES))
+        else:
+            sections.append(Section(node, continues=node.get("continues", False)))
+    return sections
+
+
+# Bump when the fragment format or splicing logic changes.
+CACHE_VERSION = 6
+
+
+class SectionFragment:
+    def __init__(self, continues=False):
+        self.continues = continues
+        self.pages = []          # [(graphics state at body start, body content bytes)]
+        self.fonts = {}          # font index -> (family, style)
+        self.glyphs = {}         # embedded font index -> codes used
+        self.outline = []        # [(name, level, page index in fragment, top in pt)]
+        self.forms = {}          # form index -> (chart shapes, width, height)
+        self.end_state = None
+        self.end_y = None
+
+
+class SectionCache:
+    """Store of section fragments keyed by a content hash of their inputs.
+
+    Fragments are kept in memory for the life of the process and, when a path
+    is given, persisted to disk so later runs can reuse them.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.memory = {}
+        self.hits = 0
+        self.misses = 0
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, key + ".frag")
+
+    def __contains__(self, key):
+        return key in self.memory or bool(self.path) and os.path.exists(self._file(key))
+
+    def get(self, key):
+        fragment = self.memory.get(key)
+        if fragment is None and self.path:
+            try:
+                with open(self._file(key), "rb") as f:
+                    fragment = self.memory[key] = pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass
+        if fragment is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return fragment
+
+    def put(self, key, fragment):
+        self.memory[key] = fragment
+        if not self.path:
+            return
+        tmp = self._file(key) + f".{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(fragment, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self._file(key))
+
+    def prune(self, keep):
+        for key in set(self.memory) - set(keep):
+            del self.memory[key]
+        if not self.path:
+            return
+        for name in os.listdir(self.path):
+            if name.endswith(".frag") and name[:-5] not in keep:
+                os.remove(os.path.join(self.path, name))
+
+
+@functools.lru_cache(maxsize=None)
+def source_of(obj):
+    return inspect.getsource(obj)
+
+
+def section_key(section, pdf, start_y=None):
+    """Hash everything a section's layout depends on: the document class (styles,
+    helpers and renderer), the section's content, where it starts on the page and
+    any extra inputs."""
+    digest = hashlib.sha256()
+    for part in (
+        CACHE_VERSION,
+        FPDF_VERSION,
+        source_of(TaskFlowDoc),
+        source_of(TableLayout),
+        source_of(highlight),
+        source_of(fonts),
+        source_of(themes),
+        source_of(charts),
+        highlight.lexer_version(),
+        pdf.font_signature,
+        # Sections are laid out in the light theme (see TaskFlowDoc.use_theme).
+        sorted(themes.load().colors.items()),
+        section.node.digest(),
+        None if start_y is None else round(start_y, 3),
+        section.inputs(pdf) if section.inputs else None,
+    ):
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def new_document(generated_on=None, font_files=None, theme=None):
     pdf = TaskFlowDoc(orientation="P", unit="mm", format="A4")
     pdf.set_auto_page_break(auto=True, margin=20)
     pdf.set_margins(20, 15, 20)
+    if generated_on is not None:
+        pdf.generated_on = generated_on
+    if font_files:
+        pdf.use_fonts(font_files)
+    if theme is not None:
+        pdf.use_theme(theme)
+    return pdf
 
-    # ===================== COVER PAGE =====================
-    pdf.cover_page()
-
-    # ===================== TABLE OF CONTENTS =====================
-    pdf.add_page()
-    pdf.set_font("Helvetica", "B", 22)
-    pdf.set_text_color(*pdf.INDIGO)
-    pdf.cell(0, 14, "Table of Contents", new_x="LMARGIN", new_y="NEXT")
-    pdf.ln(6)
-
-    toc = [
-        ("1", "Project Overview", "3"),
-        ("2", "Technology Stack", "4"),
-        ("3", "Project Structure", "5"),
-        ("4", "Architecture Overview", "7"),
-        ("5", "HTML Layer (index.html)", "9"),
-        ("6", "CSS Architecture (style.css)", "12"),
-        ("7", "JavaScript Architecture (app.js)", "16"),
-        ("8", "Data Model & Storage", "21"),
-        ("9", "Circular Progress Bar", "23"),
-        ("10", "Chart.js Integration", "24"),
-        ("11", "Theme System (Dark Mode)", "26"),
-        ("12", "Responsive Design System", "27"),
-        ("13", "Animation System", "29"),
-        ("14", "PWA & Add to Home Screen", "30"),
-        ("15", "Security Considerations", "31"),
-        ("16", "Performance Notes", "31"),
-        ("17", "Developer Guide", "32"),
-    ]
-
-    for num, title, page in toc:
-        pdf.set_font("Helvetica", "B" if "." not in num else "", 11 if "." not in num else 10)
-        pdf.set_text_color(*pdf.GRAY_700)
-        dot_leader = "." * (70 - len(f"{num}  {title}"))
-        pdf.set_x(25)
-        pdf.cell(12, 7, num, new_x="END")
-        pdf.cell(100, 7, title, new_x="END")
-        pdf.set_font("Helvetica", "", 9)
-        pdf.set_text_color(*pdf.GRAY_400)
-        pdf.cell(0, 7, page, align="R", new_x="LMARGIN", new_y="NEXT")
-
-    # ===================== 1. PROJECT OVERVIEW =====================
-    pdf.add_page()
-    pdf.section_title("1", "Project Overview")
-
-    pdf.body_text(
-        "TaskFlow is a modern, full-featured task management web application built entirely with "
-        "vanilla HTML, CSS, and JavaScript. It provides a professional-grade user experience with "
-        "a dashboard layout, real-time analytics, data visualization, and a fully responsive design "
-        "that works across all device sizes from desktop monitors to mobile phones."
-    )
-
-    pdf.body_text(
-        "The application follows a client-side architecture where all data is persisted in the "
-        "browser's localStorage API, requiring zero backend infrastructure. This makes it instantly "
-        "deployable as a static site on any hosting platform."
-    )
-
-    pdf.subsection("Key Features")
-    features = [
-        "CRUD operations: Create, read, update (toggle), and delete tasks",
-        "Priority system: Three levels (Low, Medium, High) with color-coded badges",
-        "Circular SVG progress bar: Animated ring showing completion percentage",
-        "Weekly activity bar chart: Tasks completed per day over the last 7 days (Chart.js)",
-        "Task distribution doughnut chart: Visual split of completed vs pending tasks",
-        "Real-time search: Instant text filtering as you type",
-        "Multi-filter toolbar: Filter by status (All/Active/Completed) and priority",
-        "Dark mode: Full theme toggle with localStorage persistence",
-        "Responsive design: 4 breakpoints (desktop, tablet, mobile, small mobile)",
-        "Data migration: Automatic upgrade from legacy localStorage format",
-        "XSS protection: All user input is escaped before rendering",
-        "Smooth animations: slideIn, slideOut, shake validation, hover micro-interactions",
-        "Batch operations: Clear all completed tasks at once with animated removal",
-        "PWA support: Installable as app (Add to Home Screen on iOS/Android), offline cache via service worker",
-    ]
-    for f in features:
-        pdf.bullet(f)
-
-    # ===================== 2. TECHNOLOGY STACK =====================
-    pdf.add_page()
-    pdf.section_title("2", "Technology Stack")
-
-    pdf.body_text(
-        "TaskFlow is intentionally built with zero build tools and no npm dependencies. "
-        "This makes it easy to clone, open, and run instantly in any browser."
-    )
-
-    widths = [45, 50, 75]
-    pdf.table_header(["Technology", "Version", "Purpose"], widths)
-    rows = [
-        ("HTML5", "Living Standard", "Semantic structure, SVG graphics, ARIA attrs"),
-        ("CSS3", "Living Standard", "Custom Properties, Grid, Flexbox, animations"),
-        ("JavaScript", "ES6+", "Application logic, DOM manipulation, events"),
-        ("Chart.js", "v4.x (CDN)", "Bar chart and doughnut chart rendering"),
-        ("Web App Manifest", "W3C", "PWA metadata, icons, theme, display mode"),
-        ("Service Worker", "Web API", "Offline cache, installability"),
-        ("Google Fonts", "Inter", "Typography (weights 300-800)"),
-        ("localStorage", "Web API", "Client-side data persistence"),
-        ("SVG", "1.1", "Circular progress bar, inline icons"),
-    ]
-    for i, r in enumerate(rows):
-        pdf.table_row(r, widths, fill=i % 2 == 0)
-
-    pdf.ln(4)
-    pdf.info_box(
-        "Note: Chart.js is loaded from CDN (cdn.jsdelivr.net/npm/chart.js). "
-        "If it fails to load, the app degrades gracefully - all features work except the two charts."
-    )
-
-    # ===================== 3. PROJECT STRUCTURE =====================
-    pdf.add_page()
-    pdf.section_title("3", "Project Structure")
-
-    pdf.code_block(
-        """taskflow-project/
-|-- index.html                  # Single-page application entry point
-|-- manifest.webmanifest        # PWA manifest (name, icons, theme, display)
-|-- sw.js                       # Service worker (offline cache)
-|-- css/
-|   +-- style.css               # Complete stylesheet
-|-- js/
-|   +-- app.js                  # Application logic, charts, SW registration
-|-- assets/
-|   +-- images/
-|   |   +-- check.png           # Legacy asset (kept for history)
-|   +-- icons/
-|       +-- icon-192.png        # PWA icon 192x192 (home screen)
-|       +-- icon-512.png        # PWA icon 512x512
-|-- docs/
-|   +-- TaskFlow_Architecture.pdf   # This document
-|-- generate_docs.py           # PDF documentation generator
-|-- .gitignore
-|-- README.md""",
-        title="Directory Tree"
-    )
-
-    pdf.body_text(
-        "The project follows a classic separation of concerns with three core application files, "
-        "plus PWA assets:"
-    )
-    pdf.bullet("index.html - Structure and content, PWA meta/link tags")
-    pdf.bullet("css/style.css - Presentation and responsive layout")
-    pdf.bullet("js/app.js - Behavior, state management, charts, service worker registration")
-    pdf.bullet("manifest.webmanifest - PWA name, icons, theme_color, display: standalone")
-    pdf.bullet("sw.js - Service worker for caching static assets (offline support)")
-
-    pdf.ln(2)
-    pdf.body_text(
-        "There is no build step, no bundler, and no transpilation. The code runs directly in "
-        "the browser. The app is installable as a PWA (Add to Home Screen on iOS and Android)."
-    )
-
-    # ===================== 4. ARCHITECTURE OVERVIEW =====================
-    pdf.add_page()
-    pdf.section_title("4", "Architecture Overview")
-
-    pdf.body_text(
-        "TaskFlow uses a straightforward Model-View-Controller-like pattern implemented "
-        "in vanilla JavaScript. The architecture is designed for simplicity and maintainability."
-    )
-
-    pdf.subsection("4.1 High-Level Architecture Diagram")
-
-    pdf.code_block(
-        """+================================================================+
-|                        BROWSER                                 |
-|  +------------------+  +------------------+  +-------+  +------+ |
-|  |   index.html     |  |   css/style.css  |  |manifest|  | sw.js| |
-|  |   (Structure +   |  |   (Presentation) |  |(PWA)   |  |(Cache)| |
-|  |    PWA meta)     |  +--------+---------+  +----+---+  +--+---+ |
-|  +--------+---------+           |                |         |     |
-|           |                    |                |         |     |
-|  +--------+---------+    +------v----------------v---------v+   |
-|  |   js/app.js      |    | Chart.js (CDN)                    |   |
-|  |   (Behavior +    |    +-----------------------------------+   |
-|  |    SW register) |                                           |
-|  +---+----+---+-----+                                           |
-|      |    |   |                                                 |
-|  +---+  +-+  +--------+  +------------+                        |
-|  v        v       v           v                                 |
-| DOM   Storage  Chart.js   Service Worker                        |
-| API   (local   Instances  (offline cache)                        |
-|       Storage)                                                  |
-|           |                                                     |
-|  +--------v--------+                                            |
-|  |   localStorage  |                                            |
-|  |   (JSON data)   |                                            |
-|  +-----------------+                                            |
-+================================================================+""",
-        title="System Architecture"
-    )
-
-    pdf.subsection("4.2 Data Flow")
-
-    pdf.code_block(
-        """User Action (click/type/submit)
-        |
-        v
-Event Handler (handleAddTask, handleTaskClick, etc.)
-        |
-        v
-State Mutation (todos array modified)
-        |
-        +----> saveTodos() ----> localStorage.setItem()
-        |
-        v
-render() function called
-        |
-        +----> renderTasks()      (rebuilds task list DOM)
-        +----> updateStats()      (updates circle + stat cards)
-        +----> updateCharts()     (refreshes Chart.js instances)""",
-        title="Unidirectional Data Flow"
-    )
-
-    pdf.body_text(
-        "Every user interaction follows the same unidirectional flow: Event -> State Mutation -> "
-        "Save -> Re-render. This predictable pattern makes debugging straightforward: if the UI "
-        "is wrong, check the state; if the state is wrong, check the event handler."
-    )
-
-    pdf.subsection("4.3 Module Organization")
-
-    pdf.body_text(
-        "Although contained in a single file (app.js), the code is organized into clearly "
-        "separated sections using comment headers:"
-    )
-
-    widths2 = [45, 125]
-    pdf.table_header(["Section", "Responsibility"], widths2)
-    sections = [
-        ("Constants", "Storage keys, configuration values"),
-        ("State", "Global todos array, chart instance references"),
-        ("DOM References", "Cached querySelector results in 'el' object"),
-        ("Utilities", "generateId, escapeHtml, capitalize, formatDate"),
-        ("Local Storage", "loadTodos (with migration), saveTodos"),
-        ("Todo CRUD", "addTodo, toggleTodo, deleteTodo, clearCompleted"),
-        ("Filtering", "getFilteredTodos with search + status + priority"),
-        ("Rendering", "createTaskElement, renderTasks, updateStats, render"),
-        ("Charts", "Chart.js init, update, weekly data, color helpers"),
-        ("Theme", "initTheme, toggleTheme with chart color sync"),
-        ("Event Handlers", "handleAddTask, handleTaskClick"),
-        ("Initialization", "init() - wires everything + service worker registration"),
-    ]
-    for i, r in enumerate(sections):
-        pdf.table_row(r, widths2, fill=i % 2 == 0)
-
-    # ===================== 5. HTML LAYER =====================
-    pdf.add_page()
-    pdf.section_title("5", "HTML Layer (index.html)")
-
-    pdf.body_text(
-        "The HTML file is a single-page application with semantic elements. It defines the "
-        "complete UI structure and relies on CSS for layout and JS for dynamic behavior."
-    )
-
-    pdf.subsection("5.1 Document Head")
-    pdf.body_text(
-        "The <head> section includes viewport meta for responsive design (with viewport-fit=cover "
-        "for notched devices), theme-color, and the main stylesheet. For PWA and Add to Home "
-        "Screen support it also includes: <link rel='manifest' href='manifest.webmanifest'>, "
-        "<link rel='apple-touch-icon' href='assets/icons/icon-192.png'>, and iOS-specific meta "
-        "tags (apple-mobile-web-app-capable, apple-mobile-web-app-status-bar-style, "
-        "apple-mobile-web-app-title). Google Fonts use preconnect for faster font loading."
-    )
-
-    pdf.subsection("5.2 Layout Structure")
-    pdf.code_block(
-        """<body>
-  <header class="app-header">         <!-- Sticky gradient header -->
-    +-- .brand                         <!-- Logo + title + date -->
-    +-- .theme-btn                     <!-- Dark mode toggle -->
-  </header>
-
-  <div class="container app-layout">   <!-- CSS Grid: sidebar + main -->
-    <aside class="sidebar">            <!-- Dashboard panel -->
-      +-- .circle-card                 <!-- SVG circular progress -->
-      +-- .stats-row                   <!-- 3x stat cards grid -->
-      +-- .chart-card (weekly)         <!-- Bar chart canvas -->
-      +-- .chart-card (status)         <!-- Doughnut chart canvas -->
-    </aside>
-
-    <main class="main-content">        <!-- Task management area -->
-      +-- .add-form                    <!-- Input + priority selector -->
-      +-- .toolbar                     <!-- Search + filters + clear -->
-      +-- .tasks-section               <!-- Task list + empty state -->
-    </main>
-  </div>
-
-  <script src="chart.js (CDN)">
-  <script src="js/app.js">   <!-- Also registers service worker -->
-</body>""",
-        title="DOM Tree Overview"
-    )
-
-    pdf.subsection("5.3 SVG Circular Progress Bar (HTML)")
-    pdf.body_text(
-        "The circular progress bar is built with pure SVG. Two <circle> elements share the same "
-        "center (cx=90, cy=90) and radius (r=75). The background circle uses a muted stroke, "
-        "while the foreground circle uses an SVG linearGradient and the stroke-dasharray/"
-        "stroke-dashoffset technique for animation."
-    )
-
-    pdf.code_block(
-        """<svg class="circle-svg" viewBox="0 0 180 180">
-  <defs>
-    <linearGradient id="progress-gradient" x1="0%" y1="0%" x2="100%" y2="100%">
-      <stop offset="0%" stop-color="#6366f1"/>    <!-- Indigo -->
-      <stop offset="100%" stop-color="#06b6d4"/>   <!-- Cyan -->
-    </linearGradient>
-  </defs>
-  <circle class="circle-bg" cx="90" cy="90" r="75"/>
-  <circle class="circle-fg" cx="90" cy="90" r="75" id="circle-progress"/>
-</svg>""",
-        title="SVG Markup"
-    )
-
-    pdf.subsection("5.4 Priority Selector Pattern")
-    pdf.body_text(
-        "The priority selector uses hidden <input type='radio'> elements inside <label> wrappers. "
-        "CSS uses the adjacent sibling selector (input:checked + .priority-tag) to style the "
-        "active state. This is a pure CSS solution requiring zero JavaScript for visual feedback."
-    )
-
-    pdf.subsection("5.5 Accessibility")
-    pdf.bullet("All interactive elements have aria-label attributes")
-    pdf.bullet("SVG icons are decorative (no alt text needed, labels on parent buttons)")
-    pdf.bullet("Form inputs have proper labels and autocomplete attributes")
-    pdf.bullet("Semantic HTML: <header>, <main>, <aside>, <section>, <nav> elements")
-    pdf.bullet("The theme toggle button has aria-label='Toggle theme'")
-
-    # ===================== 6. CSS ARCHITECTURE =====================
-    pdf.add_page()
-    pdf.section_title("6", "CSS Architecture (style.css)")
-
-    pdf.body_text(
-        "The stylesheet is 1,077 lines organized into clearly commented sections. It uses "
-        "CSS Custom Properties (variables) extensively for theming, and CSS Grid + Flexbox "
-        "for all layout needs."
-    )
-
-    pdf.subsection("6.1 Design Token System (CSS Custom Properties)")
-    pdf.body_text(
-        "All visual values are centralized in :root as CSS Custom Properties. "
-        "This enables instant theme switching by overriding variables in [data-theme='dark']."
-    )
-
-    pdf.code_block(
-        """:root {
-  /* Color Palette */
-  --primary: #6366f1;        /* Indigo - brand color */
-  --primary-dark: #4f46e5;   /* Hover state */
-  --primary-light: #818cf8;  /* Focus rings */
-  --primary-subtle: #eef2ff; /* Backgrounds */
-  --accent: #06b6d4;         /* Cyan - progress gradient end */
-  --success: #10b981;        /* Green - completed state */
-  --warning: #f59e0b;        /* Amber - pending/medium priority */
-  --danger: #ef4444;         /* Red - delete/high priority */
-
-  /* Semantic Surface Colors */
-  --bg: #f1f5f9;             /* Page background */
-  --surface: #ffffff;        /* Card backgrounds */
-  --text: #0f172a;           /* Primary text */
-  --text-secondary: #475569; /* Secondary text */
-  --text-muted: #94a3b8;     /* Muted/disabled text */
-  --border: #e2e8f0;         /* Border color */
-
-  /* Elevation (Shadow Scale) */
-  --shadow-sm through --shadow-lg
-
-  /* Spacing & Shape */
-  --radius-sm: 8px;  --radius: 12px;  --radius-lg: 16px;
-
-  /* Motion */
-  --transition: 200ms cubic-bezier(0.4, 0, 0.2, 1);
-  --transition-slow: 400ms cubic-bezier(0.4, 0, 0.2, 1);
-
-  /* Layout Constants */
-  --header-height: 72px;
-  --sidebar-width: 340px;
-}""",
-        title="Design Tokens (Light Theme)"
-    )
-
-    pdf.subsection("6.2 Dark Theme Override")
-    pdf.body_text(
-        "Dark mode overrides every surface, text, border, and shadow variable. "
-        "The subtle color variants use rgba() with low opacity for a natural dark-mode feel."
-    )
-
-    pdf.code_block(
-        """[data-theme="dark"] {
-  --bg: #0f172a;                              /* Slate-900 */
-  --surface: #1e293b;                         /* Slate-800 */
-  --text: #f1f5f9;                            /* Slate-100 */
-  --text-secondary: #94a3b8;                  /* Slate-400 */
-  --border: #334155;                          /* Slate-700 */
-  --primary-subtle: rgba(99, 102, 241, 0.15); /* Translucent */
-  --success-subtle: rgba(16, 185, 129, 0.15);
-  /* ... shadows get heavier opacity ... */
-}""",
-        title="Dark Theme Overrides"
-    )
-
-    pdf.subsection("6.3 Layout System")
-
-    pdf.subsubsection("Desktop Layout (> 1024px)")
-    pdf.code_block(
-        """.app-layout {
-  display: grid;
-  grid-template-columns: 340px 1fr;   /* Fixed sidebar + fluid main */
-  gap: 28px;
-  align-items: start;                  /* Sidebar sticks to top */
-}
-
-.sidebar {
-  position: sticky;
-  top: calc(var(--header-height) + 28px);  /* Below sticky header */
-}""",
-        title="Desktop Grid"
-    )
-
-    pdf.subsubsection("Tablet Layout (768px - 1024px)")
-    pdf.code_block(
-        """@media (max-width: 1024px) {
-  .app-layout { grid-template-columns: 1fr; }   /* Single column */
-  .sidebar {
-    position: static;                             /* Not sticky */
-    display: grid;
-    grid-template-columns: 1fr 1fr;              /* Charts side by side */
-  }
-  .circle-card, .stats-row { grid-column: 1/-1; } /* Full width */
-}""",
-        title="Tablet Breakpoint"
-    )
-
-    pdf.subsubsection("Mobile Layout (< 768px)")
-    pdf.body_text(
-        "On mobile, everything stacks vertically. The add button becomes icon-only, "
-        "the toolbar stacks, delete buttons are always visible (no hover on touch), "
-        "and the circular progress bar shrinks to 150px."
-    )
-
-    pdf.subsection("6.4 Circular Progress Bar (CSS)")
-
-    pdf.code_block(
-        """.circle-svg {
-  width: 180px; height: 180px;
-  transform: rotate(-90deg);          /* Start from 12 o'clock */
-}
-
-.circle-fg {
-  fill: none;
-  stroke: url(#progress-gradient);     /* SVG gradient reference */
-  stroke-width: 8;
-  stroke-linecap: round;               /* Rounded endpoints */
-  stroke-dasharray: 471.24;            /* Circumference = 2 * PI * 75 */
-  stroke-dashoffset: 471.24;           /* 100% hidden initially */
-  transition: stroke-dashoffset 1s cubic-bezier(0.4, 0, 0.2, 1);
-}""",
-        title="SVG Circle Technique"
-    )
-
-    pdf.info_box(
-        "Math: circumference = 2 * PI * radius = 2 * 3.14159 * 75 = 471.24. "
-        "To show N% progress: stroke-dashoffset = 471.24 * (1 - N/100). "
-        "At 0%: offset = 471.24 (fully hidden). At 100%: offset = 0 (fully visible).",
-        color=pdf.ACCENT
-    )
-
-    # ===================== 7. JAVASCRIPT ARCHITECTURE =====================
-    pdf.add_page()
-    pdf.section_title("7", "JavaScript Architecture (app.js)")
-
-    pdf.body_text(
-        "The JavaScript layer is 512 lines of vanilla ES6+ code organized into 12 logical "
-        "sections. It manages application state, DOM rendering, chart integration, theme "
-        "switching, and all user interactions."
-    )
-
-    pdf.subsection("7.1 State Management")
-
-    pdf.code_block(
-        """// Global state
-let todos = [];              // Array of todo objects (source of truth)
-let weeklyChart = null;      // Chart.js bar chart instance
-let statusChart = null;      // Chart.js doughnut chart instance
-
-// DOM element cache (queried once at load time)
-const el = {
-  addForm: $("#add-form"),
-  taskInput: $("#task-input"),
-  tasksList: $("#tasks-list"),
-  circleProgress: $("#circle-progress"),
-  // ... 14 more cached references
-};""",
-        title="State & DOM Cache"
-    )
-
-    pdf.body_text(
-        "The 'todos' array is the single source of truth. The UI is always derived from it. "
-        "DOM references are cached in the 'el' object at load time to avoid repeated "
-        "querySelector calls during renders."
-    )
-
-    pdf.subsection("7.2 Todo Data Model")
-
-    pdf.code_block(
-        """{
-  id: "m2abc1234xyz",           // Unique ID (timestamp + random base36)
-  text: "Buy groceries",        // Task description (user input, escaped)
-  completed: false,             // Boolean completion state
-  priority: "medium",           // "low" | "medium" | "high"
-  createdAt: "2026-02-08T...",  // ISO 8601 creation timestamp
-  completedAt: null             // ISO 8601 completion timestamp (or null)
-}""",
-        title="Todo Object Schema"
-    )
-
-    pdf.body_text(
-        "The completedAt timestamp is critical for the weekly activity chart. When a task is "
-        "toggled complete, the current timestamp is stored. When uncompleted, it's set back to "
-        "null. This enables accurate historical tracking of completion activity."
-    )
-
-    pdf.subsection("7.3 CRUD Operations")
-
-    pdf.subsubsection("addTodo(text, priority)")
-    pdf.body_text(
-        "Creates a new todo object with a generated ID and current timestamps, prepends it "
-        "to the todos array (unshift for newest-first ordering), saves to localStorage, "
-        "and triggers a full re-render."
-    )
-
-    pdf.subsubsection("toggleTodo(id)")
-    pdf.body_text(
-        "Finds the todo by ID, flips the completed boolean, sets or clears the completedAt "
-        "timestamp, saves, and re-renders. The completedAt timestamp feeds the weekly chart."
-    )
-
-    pdf.subsubsection("deleteTodo(id)")
-    pdf.body_text(
-        "Filters the todo out of the array and saves. The re-render is handled by the "
-        "caller after the slide-out animation completes (via animationend event)."
-    )
-
-    pdf.subsubsection("clearCompleted()")
-    pdf.body_text(
-        "Adds the 'slide-out' CSS class to all completed task DOM elements, waits 350ms for "
-        "the animation, then bulk-removes completed todos from state and re-renders."
-    )
-
-    pdf.subsection("7.4 Rendering Pipeline")
-
-    pdf.code_block(
-        """function render() {
-  renderTasks();     // 1. Rebuild task list from filtered state
-  updateStats();     // 2. Update stat cards + circle progress
-  updateCharts();    // 3. Push new data to Chart.js instances
-}
-
-function renderTasks() {
-  const filtered = getFilteredTodos();  // Apply search + filters
-  el.tasksList.innerHTML = "";          // Clear current DOM
-  filtered.forEach(todo => {
-    el.tasksList.appendChild(createTaskElement(todo));
-  });
-  el.emptyState.classList.toggle("visible", filtered.length === 0);
-}
-
-function updateStats() {
-  // Calculate totals
-  const total = todos.length;
-  const done = todos.filter(t => t.completed).length;
-  const percent = total ? Math.round((done / total) * 100) : 0;
-
-  // Update DOM text
-  el.statTotal.textContent = total;
-  el.statDone.textContent = done;
-  el.statPending.textContent = total - done;
-
-  // Update circular progress bar
-  const circumference = 2 * Math.PI * 75;
-  const offset = circumference * (1 - percent / 100);
-  el.circleProgress.style.strokeDashoffset = offset;
-  el.circlePercent.textContent = percent + "%";
-}""",
-        title="Render Pipeline"
-    )
-
-    pdf.subsection("7.5 Filtering System")
-
-    pdf.code_block(
-        """function getFilteredTodos() {
-  const search = el.searchInput.value.toLowerCase().trim();
-  const status = el.filterStatus.value;     // "all"|"active"|"completed"
-  const priority = el.filterPriority.value; // "all"|"low"|"medium"|"high"
-
-  return todos.filter(todo => {
-    const matchSearch = !search || todo.text.toLowerCase().includes(search);
-    const matchStatus = status === "all" ||
-      (status === "active" && !todo.completed) ||
-      (status === "completed" && todo.completed);
-    const matchPriority = priority === "all" || todo.priority === priority;
-    return matchSearch && matchStatus && matchPriority;
-  });
-}""",
-        title="Multi-criteria Filtering"
-    )
-
-    pdf.body_text(
-        "Filters compose cleanly: each criterion returns true if 'all' is selected, or checks "
-        "the specific match. The search input triggers renderTasks on every keystroke (input event) "
-        "for real-time feedback. The dropdown filters trigger on the change event."
-    )
-
-    pdf.subsection("7.6 Event Delegation")
-
-    pdf.body_text(
-        "Instead of attaching event listeners to every task button, a single listener on the "
-        "task list container uses event delegation with Element.closest() to determine what "
-        "was clicked. This is more performant and automatically handles dynamically added tasks."
-    )
-
-    pdf.code_block(
-        """function handleTaskClick(e) {
-  const deleteBtn = e.target.closest(".task-delete");
-  const checkBtn = e.target.closest(".task-check");
-  const taskItem = e.target.closest(".task-item");
-
-  if (!taskItem) return;
-
-  if (deleteBtn) {
-    taskItem.classList.add("slide-out");       // Trigger CSS animation
-    taskItem.addEventListener("animationend", () => {
-      deleteTodo(taskItem.dataset.id);         // Remove from state
-      render();                                 // Re-render
-    });
-  } else if (checkBtn) {
-    toggleTodo(taskItem.dataset.id);           // Toggle + re-render
-  }
-}
-
-// Single listener for all tasks
-el.tasksList.addEventListener("click", handleTaskClick);""",
-        title="Event Delegation Pattern"
-    )
-
-    # ===================== 8. DATA MODEL & STORAGE =====================
-    pdf.add_page()
-    pdf.section_title("8", "Data Model & Storage")
-
-    pdf.subsection("8.1 localStorage Schema")
-
-    pdf.code_block(
-        """Key: "taskflow_todos"
-Value: JSON array of todo objects
-
-Example:
-[
-  {
-    "id": "m2abc1234xyz",
-    "text": "Finish quarterly report",
-    "completed": true,
-    "priority": "high",
-    "createdAt": "2026-02-07T09:30:00.000Z",
-    "completedAt": "2026-02-08T14:22:00.000Z"
-  },
-  {
-    "id": "m2def5678abc",
-    "text": "Buy milk",
-    "completed": false,
-    "priority": "low",
-    "createdAt": "2026-02-08T08:00:00.000Z",
-    "completedAt": null
-  }
-]
-
-Key: "taskflow_theme"
-Value: "light" or "dark" """,
-        title="localStorage Keys"
-    )
-
-    pdf.subsection("8.2 Legacy Data Migration")
-
-    pdf.body_text(
-        "The previous version of the app stored todos as a simple array of strings under the "
-        "key 'todos'. The loadTodos() function automatically detects and migrates this format:"
-    )
-
-    pdf.code_block(
-        """function loadTodos() {
-  // 1. Try new format first
-  const data = localStorage.getItem(STORAGE_KEY);
-  if (data) return JSON.parse(data);
-
-  // 2. Check for legacy format
-  const legacy = localStorage.getItem("todos");
-  if (legacy) {
-    const items = JSON.parse(legacy);
-    const migrated = items.map(text => ({
-      id: generateId(),
-      text: typeof text === "string" ? text : String(text),
-      completed: false,
-      priority: "medium",
-      createdAt: new Date().toISOString(),
-      completedAt: null,
-    }));
-    saveTodos(migrated);               // Save in new format
-    localStorage.removeItem("todos");  // Clean up legacy key
-    return migrated;
-  }
-
-  return [];  // Fresh start
-}""",
-        title="Migration Logic"
-    )
-
-    pdf.info_box(
-        "The migration is transparent to the user. On first load after upgrade, legacy tasks "
-        "appear with 'Medium' priority and today's date. The old 'todos' key is removed.",
-        color=pdf.SUCCESS
-    )
-
-    pdf.subsection("8.3 ID Generation")
-
-    pdf.code_block(
-        """function generateId() {
-  return Date.now().toString(36) + Math.random().toString(36).substr(2, 9);
-}
-// Example output: "m2k7f3a1x" + "abc123def" = "m2k7f3a1xabc123def" """,
-        title="Unique ID Strategy"
-    )
-
-    pdf.body_text(
-        "IDs combine a base-36 timestamp with random characters, ensuring uniqueness even "
-        "if multiple tasks are created in the same millisecond."
-    )
-
-    # ===================== 9. CIRCULAR PROGRESS BAR =====================
-    pdf.add_page()
-    pdf.section_title("9", "Circular Progress Bar")
-
-    pdf.body_text(
-        "The circular progress bar is one of the most visually prominent features. It's built "
-        "entirely with SVG and CSS - no canvas, no library."
-    )
-
-    pdf.subsection("9.1 How It Works")
-
-    pdf.body_text("The technique uses three SVG/CSS properties working together:")
-    pdf.bullet("stroke-dasharray: Sets the total length of the dash pattern (= circumference)")
-    pdf.bullet("stroke-dashoffset: Controls how much of the stroke is hidden")
-    pdf.bullet("transform: rotate(-90deg): Rotates the circle so 0% starts at 12 o'clock")
-
-    pdf.ln(2)
-    pdf.body_text("The math is simple:")
-    pdf.code_block(
-        """Circumference = 2 * PI * radius = 2 * 3.14159 * 75 = 471.24
-
-For a given completion percentage:
-  offset = circumference * (1 - percent / 100)
-
-Examples:
-  0% complete   -> offset = 471.24 * (1 - 0)    = 471.24 (circle hidden)
-  25% complete  -> offset = 471.24 * (1 - 0.25)  = 353.43
-  50% complete  -> offset = 471.24 * (1 - 0.50)  = 235.62
-  75% complete  -> offset = 471.24 * (1 - 0.75)  = 117.81
-  100% complete -> offset = 471.24 * (1 - 1.0)   = 0      (full circle)""",
-        title="Offset Calculation"
-    )
-
-    pdf.subsection("9.2 Gradient Effect")
-    pdf.body_text(
-        "The stroke uses an SVG <linearGradient> that transitions from Indigo (#6366f1) "
-        "to Cyan (#06b6d4). This gradient is defined in the <defs> section of the SVG and "
-        "referenced via stroke: url(#progress-gradient) in CSS."
-    )
-
-    pdf.subsection("9.3 Animation")
-    pdf.body_text(
-        "The CSS transition property on stroke-dashoffset provides smooth animation whenever "
-        "the value changes. The 1-second cubic-bezier easing creates a satisfying deceleration "
-        "effect as the progress ring fills or empties."
-    )
-
-    # ===================== 10. CHART.JS INTEGRATION =====================
-    pdf.add_page()
-    pdf.section_title("10", "Chart.js Integration")
-
-    pdf.subsection("10.1 Weekly Activity Bar Chart")
-
-    pdf.body_text(
-        "The bar chart shows the number of tasks completed per day over the last 7 days. "
-        "Data is computed from the completedAt timestamps in the todos array."
-    )
-
-    pdf.code_block(
-        """function getWeeklyData() {
-  const labels = [], data = [];
-  for (let i = 6; i >= 0; i--) {
-    const date = new Date();
-    date.setHours(0, 0, 0, 0);
-    date.setDate(date.getDate() - i);
-
-    labels.push(date.toLocaleDateString("en-US", { weekday: "short" }));
-
-    const nextDay = new Date(date);
-    nextDay.setDate(nextDay.getDate() + 1);
-
-    const count = todos.filter(t => {
-      if (!t.completedAt) return false;
-      const d = new Date(t.completedAt);
-      return d >= date && d < nextDay;    // Day boundary check
-    }).length;
-    data.push(count);
-  }
-  return { labels, data };
-}""",
-        title="Weekly Data Computation"
-    )
-
-    pdf.body_text(
-        "Chart configuration: borderRadius: 8 for rounded bar tops, maxBarThickness: 32px, "
-        "no legend, custom tooltip with task count. Y-axis uses stepSize: 1 for integer ticks."
-    )
-
-    pdf.subsection("10.2 Task Distribution Doughnut Chart")
-
-    pdf.body_text(
-        "The doughnut chart shows the split between completed and pending tasks. "
-        "Colors: green (#10b981) for completed, amber (#f59e0b) for pending. "
-        "The cutout is 72% creating a thin ring. When there are no tasks, a single "
-        "gray segment displays with a 'No tasks' label."
-    )
-
-    pdf.subsection("10.3 Theme-Aware Chart Updates")
-
-    pdf.body_text(
-        "When the user toggles dark mode, chart colors must update. The toggleTheme() "
-        "function recalculates grid colors, text colors, and legend colors, then calls "
-        "chart.update() to repaint."
-    )
-
-    pdf.code_block(
-        """function getChartColors() {
-  const isDark = document.documentElement.dataset.theme === "dark";
-  return {
-    gridColor: isDark ? "rgba(148,163,184,0.08)" : "rgba(0,0,0,0.06)",
-    textColor: isDark ? "#94a3b8" : "#64748b",
-  };
-}""",
-        title="Dynamic Chart Colors"
-    )
-
-    pdf.subsection("10.4 Graceful Degradation")
-    pdf.body_text(
-        "Chart initialization is wrapped in a try/catch block and checks for "
-        "typeof Chart === 'undefined'. If Chart.js fails to load from CDN, the rest of "
-        "the app continues to work normally. Only the two chart canvases remain empty."
-    )
-
-    # ===================== 11. THEME SYSTEM =====================
-    pdf.add_page()
-    pdf.section_title("11", "Theme System (Dark Mode)")
-
-    pdf.body_text(
-        "The theme system uses HTML data attributes and CSS Custom Property overrides for "
-        "a zero-flicker, JavaScript-controlled dark mode."
-    )
-
-    pdf.subsection("11.1 How It Works")
-
-    pdf.code_block(
-        """1. <html data-theme="light">      (default)
-
-2. CSS variables defined in :root   (light values)
-   CSS overrides in [data-theme="dark"]  (dark values)
-
-3. User clicks theme toggle button
-
-4. JS toggles: document.documentElement.dataset.theme = "dark"
-
-5. ALL CSS variables instantly update  (no class toggling per element)
-
-6. CSS transition on body smooths the color change:
-   transition: background 400ms, color 400ms
-
-7. Preference saved: localStorage.setItem("taskflow_theme", "dark")
-
-8. On next page load, initTheme() reads and applies saved preference""",
-        title="Theme Toggle Flow"
-    )
-
-    pdf.subsection("11.2 Icon Toggle")
-    pdf.body_text(
-        "The theme button contains both a sun and moon SVG icon. CSS controls visibility:"
-    )
-
-    pdf.code_block(
-        """[data-theme="light"] .icon-sun  { display: none; }
-[data-theme="light"] .icon-moon { display: block; }
-[data-theme="dark"]  .icon-sun  { display: block; }
-[data-theme="dark"]  .icon-moon { display: none; }""",
-        title="Icon Toggle CSS"
-    )
-
-    # ===================== 12. RESPONSIVE DESIGN =====================
-    pdf.add_page()
-    pdf.section_title("12", "Responsive Design System")
-
-    pdf.body_text(
-        "The application supports four layout tiers with media query breakpoints. "
-        "The approach is desktop-first: the default styles target wide screens, "
-        "and max-width media queries progressively adapt for smaller devices."
-    )
-
-    widths3 = [32, 30, 50, 58]
-    pdf.table_header(["Breakpoint", "Target", "Layout", "Key Changes"], widths3)
-    rows3 = [
-        ("> 1024px", "Desktop", "Sidebar + Main grid", "Sticky sidebar, full features"),
-        ("768-1024", "Tablet", "Single column", "Sidebar becomes 2-col grid"),
-        ("481-768", "Mobile", "Single column", "Icon-only btn, stacked toolbar"),
-        ("< 480px", "Sm. Mobile", "Single column", "Compact spacing, 130px circle"),
-    ]
-    for i, r in enumerate(rows3):
-        pdf.table_row(r, widths3, fill=i % 2 == 0)
-
-    pdf.ln(4)
-
-    pdf.subsection("12.1 Desktop (> 1024px)")
-    pdf.bullet("Two-column CSS Grid: 340px sidebar + fluid main content")
-    pdf.bullet("Sidebar is position: sticky, scrolls with content but stays visible")
-    pdf.bullet("Circular progress bar at 180x180px")
-    pdf.bullet("Full 'Add Task' button with text label")
-    pdf.bullet("Delete buttons hidden until hover")
-
-    pdf.subsection("12.2 Tablet (768px - 1024px)")
-    pdf.bullet("Grid collapses to single column")
-    pdf.bullet("Sidebar becomes a 2-column grid (charts side by side)")
-    pdf.bullet("Circle card and stats row span full width")
-    pdf.bullet("Sidebar is no longer sticky")
-
-    pdf.subsection("12.3 Mobile (< 768px)")
-    pdf.bullet("Header height reduces from 72px to 64px")
-    pdf.bullet("Container padding reduces from 24px to 16px")
-    pdf.bullet("Sidebar becomes fully stacked (single column)")
-    pdf.bullet("Circular progress bar shrinks to 150x150px")
-    pdf.bullet("Add button becomes icon-only (text hidden)")
-    pdf.bullet("Toolbar stacks vertically, filters stretch full width")
-    pdf.bullet("Delete buttons always visible (no hover on touch devices)")
-
-    pdf.subsection("12.4 Small Mobile (< 480px)")
-    pdf.bullet("Container padding further reduces to 12px")
-    pdf.bullet("Brand text shrinks to 1.1rem")
-    pdf.bullet("Circular progress bar shrinks to 130x130px, percentage to 1.6rem")
-    pdf.bullet("Stat cards get tighter padding")
-    pdf.bullet("Chart heights reduce for better viewport usage")
-
-    # ===================== 13. ANIMATION SYSTEM =====================
-    pdf.add_page()
-    pdf.section_title("13", "Animation System")
-
-    pdf.body_text(
-        "TaskFlow uses CSS keyframe animations and transitions for all motion. "
-        "No JavaScript animation libraries are used."
-    )
-
-    widths4 = [35, 40, 95]
-    pdf.table_header(["Animation", "Trigger", "Description"], widths4)
-    rows4 = [
-        ("slideIn", "Task added", "Fades in + slides down from -10px (0.35s)"),
-        ("slideOut", "Task deleted", "Fades out + slides right 50px, collapses (0.35s)"),
-        ("shake", "Empty input", "Horizontal shake -6/+6px (0.4s)"),
-        ("Stroke offset", "Stats change", "Circle ring fills/empties smoothly (1s)"),
-        ("Hover lift", "Mouse enter", "translateY(-1px) + shadow on task items"),
-        ("Check pop", "Toggle done", "Checkbox scale 0.3 -> 1.0 with opacity"),
-        ("Theme fade", "Mode toggle", "Background/color transitions over 400ms"),
-        ("Button press", "Click", "scale(0.97) on active state"),
-    ]
-    for i, r in enumerate(rows4):
-        pdf.table_row(r, widths4, fill=i % 2 == 0)
-
-    pdf.ln(4)
-    pdf.body_text(
-        "All animations use cubic-bezier(0.4, 0, 0.2, 1) easing, which is the Material Design "
-        "'standard' curve. This provides a natural deceleration feel."
-    )
-
-    # ===================== 14. PWA & ADD TO HOME SCREEN =====================
-    pdf.add_page()
-    pdf.section_title("14", "PWA & Add to Home Screen")
-
-    pdf.body_text(
-        "TaskFlow is a Progressive Web App (PWA). It can be installed on the home screen of "
-        "iOS and Android devices and runs in standalone mode (no browser UI). A service worker "
-        "caches static assets for faster loads and basic offline support."
-    )
-
-    pdf.subsection("14.1 Web App Manifest (manifest.webmanifest)")
-
-    pdf.body_text(
-        "The manifest defines the app name (TaskFlow), short_name, start_url (index.html), "
-        "display (standalone), theme_color and background_color, and two icon sizes (192x192 "
-        "and 512x512) in assets/icons/. Browsers and iOS use this for Add to Home Screen."
-    )
-
-    pdf.subsection("14.2 Service Worker (sw.js)")
-
-    pdf.body_text(
-        "The service worker installs and activates with cache name 'taskflow-v1'. On install it "
-        "pre-caches index.html, manifest.webmanifest, css/style.css, js/app.js, and the two "
-        "icons. On fetch it serves from cache when available (cache-first for same-origin "
-        "requests), then network. This enables the app to load from cache when offline."
-    )
-
-    pdf.subsection("14.3 iOS-Specific Meta Tags")
-
-    pdf.body_text(
-        "For Add to Home Screen on iPhone (Safari), the HTML includes: apple-mobile-web-app-"
-        "capable (yes), apple-mobile-web-app-status-bar-style (black-translucent), "
-        "apple-mobile-web-app-title (TaskFlow), and <link rel='apple-touch-icon'> pointing to "
-        "assets/icons/icon-192.png. These control how the app appears when launched from the "
-        "home screen."
-    )
-
-    pdf.subsection("14.4 Registration in app.js")
-
-    pdf.code_block(
-        """if ("serviceWorker" in navigator) {
-  navigator.serviceWorker.register("./sw.js", { scope: "./" }).catch(() => {});
-}""",
-        title="Service worker registration (in init())"
-    )
-
-    pdf.info_box(
-        "PWA features require HTTPS (or localhost). When the app is opened from the home "
-        "screen, the start URL from the manifest is used; the service worker scope is './'.",
-        color=pdf.ACCENT
-    )
-
-    # ===================== 15. SECURITY =====================
-    pdf.section_title("15", "Security Considerations")
-
-    pdf.bullet("XSS Prevention: All user-entered task text is escaped via escapeHtml() before being "
-               "inserted into innerHTML. This function creates a temporary DOM text node to safely "
-               "convert special characters to HTML entities.")
-    pdf.bullet("No eval() or Function(): The codebase never uses eval or dynamic code execution.")
-    pdf.bullet("No external data ingestion: The app only reads from localStorage (same-origin). "
-               "There are no API calls, fetch requests, or external data sources.")
-    pdf.bullet("CDN integrity: Chart.js is loaded from jsdelivr CDN. For production, consider "
-               "adding Subresource Integrity (SRI) hash attributes to the script tag.")
-    pdf.bullet("localStorage limits: ~5MB per origin. For a todo app, this is more than sufficient "
-               "(thousands of tasks). No sensitive data is stored.")
-
-    # ===================== 16. PERFORMANCE =====================
-    pdf.add_page()
-    pdf.section_title("16", "Performance Notes")
-
-    pdf.bullet("DOM caching: All querySelector calls happen once at init time and are stored in "
-               "the 'el' object. Subsequent accesses are O(1) property lookups.")
-    pdf.bullet("Event delegation: A single click listener on the task list handles all task "
-               "interactions, regardless of how many tasks exist.")
-    pdf.bullet("Chart.js update('none'): Charts are updated with animation disabled during "
-               "normal data changes to prevent janky transitions on every keystroke.")
-    pdf.bullet("Font preconnect: Google Fonts uses <link rel='preconnect'> to establish early "
-               "connections, reducing font load latency.")
-    pdf.bullet("Minimal reflows: The render() function clears and rebuilds the task list in "
-               "a single innerHTML = '' + appendChild loop, minimizing layout thrashing.")
-    pdf.bullet("CSS containment: Cards use overflow: hidden, which allows the browser to "
-               "optimize paint operations.")
-    pdf.bullet("No framework overhead: Zero library code for DOM management. The entire JS "
-               "payload is small and unminified.")
-    pdf.bullet("Service worker cache: Static assets are cached after first load for faster "
-               "repeat visits and offline availability.")
-
-    # ===================== 17. DEVELOPER GUIDE =====================
-    pdf.section_title("17", "Developer Guide")
-
-    pdf.subsection("17.1 Getting Started")
-
-    pdf.code_block(
-        """# Clone the repository
-git clone <repo-url>
-cd taskflow-project
-
-# Open in browser (no build step needed)
-# Option A: Double-click index.html
-# Option B: Use a local server
-npx serve .
-# or
-python -m http.server 8000""",
-        title="Quick Start"
-    )
-
-    pdf.subsection("17.2 Adding a New Feature")
-
-    pdf.body_text("Follow these steps to add a new feature (example: due dates):")
-    pdf.bullet("1. Extend the todo schema in addTodo() with a new field (e.g., dueDate: null)")
-    pdf.bullet("2. Add UI elements to the add-form in index.html (e.g., date picker input)")
-    pdf.bullet("3. Update createTaskElement() to render the new field in the task item")
-    pdf.bullet("4. Add CSS styles in style.css for the new UI elements")
-    pdf.bullet("5. Update getFilteredTodos() if the new field should be filterable")
-    pdf.bullet("6. Test the legacy migration - old todos without the field should work")
-
-    pdf.subsection("17.3 Adding a New Chart")
-
-    pdf.body_text("To add a new chart (example: priority distribution):")
-    pdf.bullet("1. Add a <canvas> element inside a .chart-card in the sidebar HTML")
-    pdf.bullet("2. Add a DOM reference in the 'el' object")
-    pdf.bullet("3. Create a data computation function (e.g., getPriorityData())")
-    pdf.bullet("4. Initialize the chart in initCharts()")
-    pdf.bullet("5. Update it in updateCharts()")
-    pdf.bullet("6. Handle theme colors in toggleTheme()")
-
-    pdf.subsection("17.4 Modifying the Color Scheme")
-
-    pdf.body_text(
-        "All colors are defined as CSS Custom Properties in :root (light) and "
-        "[data-theme='dark'] (dark). To change the brand color from indigo to blue:"
-    )
-
-    pdf.code_block(
-        """/* Change in :root */
---primary: #3b82f6;       /* Blue-500 instead of Indigo-500 */
---primary-dark: #2563eb;  /* Blue-600 */
---primary-light: #60a5fa; /* Blue-400 */
---primary-subtle: #eff6ff; /* Blue-50 */
-
-/* Also update the SVG gradient in index.html */
-<stop offset="0%" stop-color="#3b82f6"/>""",
-        title="Color Scheme Change"
-    )
-
-    pdf.subsection("17.5 Key Files Quick Reference")
-
-    widths5 = [55, 115]
-    pdf.table_header(["What to change", "Where to look"], widths5)
-    rows5 = [
-        ("App name/branding", "index.html <h1>TaskFlow</h1>; manifest.webmanifest name/short_name"),
-        ("Color palette", "css/style.css :root variables"),
-        ("Dark mode colors", "css/style.css [data-theme='dark']"),
-        ("Layout breakpoints", "css/style.css @media queries"),
-        ("Todo data schema", "js/app.js addTodo() function"),
-        ("Chart config", "js/app.js initCharts() function"),
-        ("Storage key", "js/app.js STORAGE_KEY constant"),
-        ("Progress bar math", "js/app.js updateStats()"),
-        ("Priority options", "index.html priority-group"),
-        ("PWA name / theme", "manifest.webmanifest (name, theme_color, icons)"),
-        ("Offline cache list", "sw.js STATIC_ASSETS array"),
-        ("Home screen icon", "assets/icons/icon-192.png, icon-512.png"),
-    ]
-    for i, r in enumerate(rows5):
-        pdf.table_row(r, widths5, fill=i % 2 == 0)
-
-    # ===================== FINAL PAGE =====================
-    pdf.add_page()
-    pdf.ln(30)
-    pdf.set_fill_color(*pdf.INDIGO)
-    pdf.rect(0, pdf.get_y() - 10, 210, 70, "F")
-    pdf.set_font("Helvetica", "B", 28)
-    pdf.set_text_color(*pdf.WHITE)
-    pdf.cell(0, 14, "TaskFlow", align="C", new_x="LMARGIN", new_y="NEXT")
-    pdf.set_font("Helvetica", "", 12)
-    pdf.set_text_color(200, 200, 255)
-    pdf.cell(0, 8, "Architecture Documentation v2.0", align="C", new_x="LMARGIN", new_y="NEXT")
-    pdf.ln(6)
-    pdf.set_font("Helvetica", "", 10)
-    pdf.cell(0, 6, f"Generated on {datetime.date.today().strftime('%B %d, %Y')}", align="C", new_x="LMARGIN", new_y="NEXT")
-
-    pdf.set_y(pdf.get_y() + 30)
-    pdf.set_text_color(*pdf.GRAY_700)
-    pdf.set_font("Helvetica", "", 10)
-    pdf.cell(0, 6, "Built with HTML5, CSS3, JavaScript ES6+, and Chart.js", align="C", new_x="LMARGIN", new_y="NEXT")
-    pdf.ln(2)
-    pdf.set_font("Helvetica", "I", 9)
-    pdf.set_text_color(*pdf.GRAY_500)
-    pdf.cell(0, 6, "Zero dependencies. Zero build tools. Pure web standards.", align="C", new_x="LMARGIN", new_y="NEXT")
 
+def render_fragment(node, start_y=None, generated_on=None, page_offset=1, token_dir=None, hooks=(),
+                    font_files=None, metrics_dir=None):
+    """Render one top-level node on a scratch document and return its fragment."""
+    if token_dir is not None:
+        highlight.cache.path = token_dir
+    if metrics_dir is not None:
+        fonts.metrics.path = metrics_dir
+    pdf = new_document(generated_on, font_files)
+    pdf.page_offset = page_offset
+    if start_y is not None:
+        pdf.add_page()
+        pdf.set_y(start_y)
+    pdf.begin_fragment(continues=start_y is not None)
+    pdf.hooks.extend(hooks)
+    with pdf.section(node):
+        pdf.render_node(node)
+    return pdf.end_fragment()
+
+
+def use_cache_dir(cache):
+    # Symbol tables, lexed code blocks and font metrics are kept next to the
+    # rendered sections.
+    cache_dir = cache.path if cache is not None else None
+    excerpts.index.path = cache_dir and os.path.join(cache_dir, "symbols")
+    highlight.cache.path = cache_dir and os.path.join(cache_dir, "tokens")
+    fonts.metrics.path = cache_dir and os.path.join(cache_dir, "fonts")
+
+
+def submit_sections(pool, jobs, sections, pdf, cache):
+    """Start rendering every cache miss among the sections that open their own
+    page: they don't depend on anything laid out before them. jobs maps section
+    keys to futures, so a section shared by several documents is rendered once."""
+    for index, section in enumerate(sections):
+        if section.cached and not section.continues:
+            key = section_key(section, pdf)
+            if key not in jobs and key not in cache:
+                # Only the first section ever lands on page 1.
+                jobs[key] = pool.submit(render_fragment, section.node, None, pdf.generated_on,
+                                        0 if index == 0 else 1, highlight.cache.path, (),
+                                        pdf.font_files or None, fonts.metrics.path)
+
+
+def build_pdf(cache=None, workers=1, document=None, stream=False, hooks=(), font_files=None, theme=None):
+    """Lay out document (by default the architecture doc), reusing cached
+    sections. The keys of the sections used end up in pdf.section_keys, for
+    SectionCache.prune(), and the labels of those laid out afresh in
+    pdf.rendered_sections."""
+    if document is None:
+        document = doc_model.load(DEFAULT_SOURCE)
+    use_cache_dir(cache)
+    excerpts.resolve(document, ROOT)
+    sections = document_sections(document)
+    pdf = new_document(font_files=font_files, theme=theme)
+    pdf.toc_entries = toc_entries(document)
+    pdf.hooks.extend(hooks)
+    if stream:
+        pdf.stream_pages()
+    # Splicing fragments doesn't produce the same bytes as laying sections out
+    # in place, so a reproducible build always splices, cached or not.
+    if cache is None and workers <= 1 and build_time() is None:
+        pdf.render_node(document)
+        return pdf
+
+    if cache is None:
+        cache = SectionCache()
+    pdf.section_keys = []
+    pdf.rendered_sections = []
+    with ProcessPoolExecutor(workers) if workers > 1 else contextlib.nullcontext() as pool:
+        jobs = {}
+        if pool is not None:
+            submit_sections(pool, jobs, sections, pdf, cache)
+        # Sections that continue mid-page need their predecessor's end position,
+        # so they're resolved here, in document order, while splicing.
+        for index, section in enumerate(sections):
+            if not section.cached:
+                with pdf.section(section.node):
+                    pdf.render_node(section.node)
+                continue
+            start_y = pdf.get_y() if section.continues else None
+            key = section_key(section, pdf, start_y)
+            pdf.section_keys.append(key)
+            fragment = cache.get(key)
+            if fragment is None:
+                if key in jobs:
+                    fragment = jobs[key].result()
+                else:
+                    fragment = render_fragment(section.node, start_y, pdf.generated_on, 0 if index == 0 else 1,
+                                               hooks=pdf.hooks, font_files=font_files)
+                cache.put(key, fragment)
+                pdf.rendered_sections.append(section_label(section.node))
+            with pdf.section(section.node, spliced=True):
+                pdf.splice_fragment(fragment)
     return pdf
 
 
-if __name__ == "__main__":
-    import os
-    pdf = build_pdf()
-    out_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "docs")
-    os.makedirs(out_dir, exist_ok=True)
-    out_path = os.path.join(out_dir, "TaskFlow_Architecture.pdf")
-    pdf.output(out_path)
-    print(f"PDF generated successfully: {out_path}")
-    print(f"Total pages: {pdf.page_no()}")
+def find_fonts(font_dir):
+    """fonts.find() for a --fonts value, which may be "system"."""
+    files = fonts.find(None if font_dir == "system" else font_dir)
+    if not files:
+        raise FileNotFoundError(f"no DejaVu or Noto fonts found in {font_dir}")
+    return files
+
+
+# ===================== BATCH BUILDS =====================
+#
+# A manifest lists variants of the document to build in one process (see
+# variants.py for its format). All variants share one section cache, so a
+# section that is the same in several of them is laid out once.
+
+
+def load_variant(variant):
+    """The variant's document, with its appendices, its font files and its theme."""
+    font_files = find_fonts(variant.fonts) if variant.fonts else None
+    return variants.load_document(variant), font_files, themes.load(variant.theme)
+
+
+def export_formats(document, output, formats, generated_on=None):
+    """Write document in each of formats other than PDF next to output;
+    return {path: SHA-256}."""
+    digests = {}
+    for fmt in formats:
+        if fmt != "pdf":
+            path = variants.format_path(output, fmt)
+            digests[path] = doc_export.export(document, path, fmt, generated_on)
+            write_digest(path, digests[path])
+    return digests
+
+
+def build_variant(variant, cache):
+    """Build and write one variant in each of its formats; return its timings,
+    the section keys it used and the files it was built from."""
+    hits, misses = cache.hits, cache.misses
+    start = time.perf_counter()
+    document, font_files, theme = load_variant(variant)
+    use_cache_dir(cache)
+    excerpts.resolve(document, ROOT)
+    loaded = time.perf_counter()
+    pdf = None
+    if "pdf" in variant.formats:
+        pdf = build_pdf(cache, document=document, stream=variant.stream, font_files=font_files, theme=theme)
+    laid_out = time.perf_counter()
+    outputs = {}
+    if pdf is not None:
+        os.makedirs(os.path.dirname(variant.output) or ".", exist_ok=True)
+        pdf.output(variant.output)
+        write_digest(variant.output, pdf.sha256)
+        outputs[variant.output] = pdf.sha256
+    outputs.update(export_formats(document, variant.output, variant.formats, build_date()))
+    return {
+        "name": variant.name,
+        "output": next(iter(outputs)),
+        "outputs": outputs,
+        "pages": pdf.page_no() if pdf is not None else None,
+        "bytes": sum(os.path.getsize(path) for path in outputs),
+        "sha256": pdf.sha256 if pdf is not None else None,
+        "load": loaded - start,
+        "layout": laid_out - loaded,
+        "write": time.perf_counter() - laid_out,
+        "reused": cache.hits - hits,
+        "rendered": cache.misses - misses,
+        "rendered_sections": pdf.rendered_sections if pdf is not None else [],
+        "keys": pdf.section_keys if pdf is not None else [],
+        "inputs": variant_inputs(variant, document, font_files),
+    }
+
+
+def _build_variant_in_worker(variant, cache_dir):
+    return build_variant(variant, SectionCache(cache_dir))
+
+
+def build_batch(variants, cache=None, workers=1):
+    """Build every variant and return their build_variant() results, in order;
+    cache.misses ends up counting the sections laid out for the whole batch.
+
+    With workers, the sections that open their own page are first rendered in
+    the pool, each distinct one once, and then the variants are spliced and
+    written in parallel, reading those sections back from the cache directory
+    (a temporary one when cache has none). Those sections count as reused in
+    the variants' own results."""
+    if cache is None:
+        cache = SectionCache()
+    if workers <= 1:
+        results = [build_variant(variant, cache) for variant in variants]
+        cache.prune({key for result in results for key in result["keys"]})
+        return results
+    with contextlib.ExitStack() as stack:
+        store = cache if cache.path else SectionCache(stack.enter_context(tempfile.TemporaryDirectory()))
+        use_cache_dir(store)
+        pool = stack.enter_context(ProcessPoolExecutor(workers))
+        jobs = {}
+        for variant in variants:
+            document, font_files, _ = load_variant(variant)
+            excerpts.resolve(document, ROOT)
+            submit_sections(pool, jobs, document_sections(document), new_document(font_files=font_files), store)
+        for key, job in jobs.items():
+            store.put(key, job.result())
+        results = list(pool.map(_build_variant_in_worker, variants, itertools.repeat(store.path)))
+        store.prune({key for result in results for key in result["keys"]})
+    cache.misses += len(jobs) + sum(result["rendered"] for result in results)
+    return results
+
+
+# ===================== REPRODUCIBLE BUILDS =====================
+#
+# A build stamps the PDF with the time it ran: the date in the page footers
+# and on the back cover, and FPDF's /CreationDate, which the file ID is also
+# derived from. When SOURCE_DATE_EPOCH is set (reproducible-builds.org), that
+# time comes from it instead; nothing else in the output depends on when or
+# how a build ran (cached, in parallel, streamed), so identical inputs give
+# byte-identical PDFs. Each such PDF gets its SHA-256 written next to it, as
+# <output>.sha256 in sha256sum format, for downstream caches to key on.
+# --reproducible (see doc_cli.py) sets it from the last commit if it isn't set.
+
+def build_time():
+    """SOURCE_DATE_EPOCH as a UTC datetime, or None when it isn't set."""
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if not epoch:
+        return None
+    try:
+        return datetime.datetime.fromtimestamp(int(epoch), datetime.timezone.utc)
+    except ValueError:
+        raise ValueError(f"SOURCE_DATE_EPOCH should be a whole number of seconds, got {epoch!r}") from None
+
+
+def build_date():
+    """The date a build is generated on: SOURCE_DATE_EPOCH's, or today."""
+    created = build_time()
+    return created.date() if created is not None else datetime.date.today()
+
+
+def write_digest(path, digest):
+    """Write path.sha256 for a reproducible build."""
+    if build_time() is not None:
+        with open(path + ".sha256", "w", encoding="utf-8") as f:
+            f.write(f"{digest}  {os.path.basename(path)}\n")
+
+
+# ===================== WATCH MODE =====================
+#
+# watch builds the document, then rebuilds it each time one of its inputs
+# changes: the source, files its excerpts and listings come from, the task
+# export, the app files in WATCHED and the generator's own modules. Section
+# keys already cover everything a section depends on, so a rebuild lays out
+# only the sections an edit touched and splices the rest from memory, with the
+# interpreter, fpdf, font metrics, symbol tables and lexed code all still warm.
+#
+# A changed generator module is reloaded in place, along with the modules
+# after it in MODULES. Keys include the layout code, so that re-lays out
+# everything only when the layout code itself changed.
+
+WATCHED = ("js/app.js", "css/style.css", "index.html", "sw.js")
+# The generator's modules, each imported only by the ones after it.
+MODULES = ("doc_model", "excerpts", "variants", "highlight", "fonts", "themes", "charts", "task_report", "doc_export",
+           "generate_docs")
+
+
+def variant_inputs(variant, document, font_files=None):
+    """Every file a variant's PDF is built from."""
+    paths = {os.path.join(ROOT, path) for path in WATCHED}
+    paths.update(os.path.join(ROOT, name + ".py") for name in MODULES)
+    paths.add(variant.source)
+    paths.update(variant.listing)
+    if variant.todos:
+        paths.add(variant.todos)
+    if font_files:
+        paths.update(font_files.values())
+    for node in document.walk():
+        if node.kind == "code" and "ref" in node.attrs:
+            paths.add(os.path.join(ROOT, node["ref"].partition("#")[0]))
+    return sorted(os.path.abspath(path) for path in paths)
+
+
+def reload_modules(changed):
+    """Reload the generator modules among the changed files, and those after
+    them in MODULES; return the generate_docs module to build with, or None
+    when no module changed."""
+    names = {os.path.splitext(os.path.basename(path))[0] for path in changed
+             if os.path.dirname(path) == ROOT}
+    first = min((MODULES.index(name) for name in names if name in MODULES), default=None)
+    if first is None:
+        return None
+    for name in MODULES[first:]:
+        module = sys.modules.get(name)
+        if module is None:
+            importlib.import_module(name)
+        else:
+            importlib.reload(module)
+    return sys.modules["generate_docs"]
+
+
+def watch_variant(variant, cache, out=None):
+    """Build variant, then rebuild it whenever its inputs change, until interrupted."""
+    generator = sys.modules[__name__]
+    watcher = watch.watcher()
+    print(f"Watching with {type(watcher).__name__}; Ctrl-C to stop.", file=out)
+    changed = set()
+    inputs = None
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                reloaded = reload_modules(changed)
+                if reloaded is not None:
+                    generator = reloaded
+                    cache = generator.SectionCache(cache.path)
+                result = generator.build_variant(variant, cache)
+            except Exception:
+                traceback.print_exc(file=out)
+                print("Build failed; waiting for changes.", file=out)
+            else:
+                cache.prune(result["keys"])
+                inputs = result["inputs"]
+                laid_out = result["rendered_sections"]
+                outputs = ", ".join(os.path.relpath(path) for path in result["outputs"])
+                pages = f" ({result['pages']} pages)" if result["pages"] else ""
+                print(f"[{time.strftime('%H:%M:%S')}] {outputs}{pages} in {time.perf_counter() - start:.3f}s, "
+                      f"{len(laid_out)} section(s) laid out" + (": " + ", ".join(laid_out) if laid_out else ""),
+                      file=out)
+            # Until a build succeeds, files quoted by the source aren't known.
+            watcher.watch(inputs or variant_inputs(variant, doc_model.Node("document")))
+            changed = watcher.wait()
+            print("Changed: " + ", ".join(sorted(os.path.relpath(path) for path in changed)), file=out)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
@@ -0,0 +1,143 @@
+"""
+TaskFlow Syntax Highlighting
+Splits code snippets into lines of (kind, text) runs for code_block().
+
+Tokenizing uses Pygments when it is installed (pip install pygments);
+without it, snippets are returned as single plain runs. Results are memoized
+by a hash of the snippet in an in-process LRU and, when a directory is set,
+as JSON files there, so a snippet is lexed once no matter how many builds or
+sections it appears in.
+"""
+
+from collections import OrderedDict
+import functools
+import hashlib
+import json
+import os
+
+try:
+    import pygments
+    from pygments.lexers import get_lexer_by_name
+    from pygments.token import Comment, Keyword, Name, Number, String
+except ImportError:
+    pygments = None
+
+# Language names accepted in code fences -> Pygments lexer.
+LEXERS = {
+    "js": "javascript",
+    "javascript": "javascript",
+    "css": "css",
+    "html": "html",
+    "json": "json",
+    "python": "python",
+    "py": "python",
+    "sh": "bash",
+    "shell": "bash",
+    "bash": "bash",
+}
+
+# Pygments token type -> run kind; the first match wins.
+if pygments:
+    KINDS = (
+        (Comment, "comment"),
+        (String, "string"),
+        (Number, "number"),
+        (Keyword, "keyword"),
+        (Name.Tag, "tag"),
+        (Name.Decorator, "tag"),
+        (Name.Class, "tag"),
+        (Name.Attribute, "attribute"),
+        (Name.Variable, "attribute"),
+        (Name.Builtin, "builtin"),
+    )
+
+# Bump when the run format or the kind mapping changes.
+CACHE_VERSION = 1
+
+
+def lexer_version():
+    return pygments.__version__ if pygments else None
+
+
+@functools.lru_cache(maxsize=None)
+def _kind(token_type):
+    return next((kind for base, kind in KINDS if token_type in base), None)
+
+
+def lex(code, lang):
+    """Tokenize code into one list of [kind, text] runs per line. Neighbouring runs
+    of the same kind are merged, and whitespace joins the run before it."""
+    if not pygments or lang not in LEXERS:
+        return [[[None, line]] for line in code.split("\n")]
+    lexer = get_lexer_by_name(LEXERS[lang], stripnl=False, ensurenl=False)
+    lines = [[]]
+    for token_type, value in lexer.get_tokens(code):
+        kind = _kind(token_type)
+        for i, text in enumerate(value.split("\n")):
+            if i:
+                lines.append([])
+            if not text:
+                continue
+            runs = lines[-1]
+            if runs and (runs[-1][0] == kind or text.isspace()):
+                runs[-1][1] += text
+            else:
+                runs.append([kind, text])
+    return lines
+
+
+class TokenCache:
+    """LRU of lexed snippets keyed by content hash, optionally backed by a directory."""
+
+    def __init__(self, path=None, maxsize=512):
+        self.path = path
+        self.maxsize = maxsize
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, code, lang):
+        digest = hashlib.sha256()
+        for part in (CACHE_VERSION, lexer_version(), lang, code):
+            digest.update(repr(part).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key + ".json")
+
+    def tokenize(self, code, lang):
+        key = self.key(code, lang)
+        lines = self.memory.get(key)
+        if lines is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return lines
+        if self.path:
+            try:
+                with open(self._file(key), encoding="utf-8") as f:
+                    lines = json.load(f)
+            except (OSError, ValueError):
+                pass
+        if lines is None:
+            self.misses += 1
+            lines = lex(code, lang)
+            if self.path:
+                os.makedirs(self.path, exist_ok=True)
+                tmp = self._file(key) + f".{os.getpid()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(lines, f, separators=(",", ":"))
+                os.replace(tmp, self._file(key))
+        else:
+            self.hits += 1
+        self.memory[key] = lines
+        if len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+        return lines
+
+
+cache = TokenCache()
+
+
+def tokenize(code, lang):
+    return cache.tokenize(code, lang)
@@ -1,11 +1,17 @@
 // ===== Constants =====
 const STORAGE_KEY = "taskflow_todos";
 const THEME_KEY = "taskflow_theme";
+const SYNC_URL_KEY = "taskflow_sync_url";
+const SYNC_VERSION_KEY = "taskflow_sync_version";
+const SYNC_QUEUE_KEY = "taskflow_sync_queue";
+const SYNC_INTERVAL = 30000;
 
 // ===== State =====
 let todos = [];
 let weeklyChart = null;
 let statusChart = null;
+let syncRunning = false;
+let syncPending = false;
 
 // ===== DOM References =====
 const $ = (sel) => document.querySelector(sel);
@@ -101,6 +107,7 @@ function addTodo(text, priority) {
   };
   todos.unshift(todo);
   saveTodos();
+  queueOp({ op: "add", todo });
   render();
 }
 
@@ -110,12 +117,14 @@ function toggleTodo(id) {
   todo.completed = !todo.completed;
   todo.completedAt = todo.completed ? new Date().toISOString() : null;
   saveTodos();
+  queueOp({ op: "toggle", id, completed: todo.completed, at: todo.completedAt });
   render();
 }
 
 function deleteTodo(id) {
   todos = todos.filter((t) => t.id !== id);
   saveTodos();
+  queueOp({ op: "delete", id });
 }
 
 function clearCompleted() {
@@ -125,12 +134,118 @@ function clearCompleted() {
   items.forEach((item) => item.classList.add("slide-out"));
 
   setTimeout(() => {
+    const ids = todos.filter((t) => t.completed).map((t) => t.id);
     todos = todos.filter((t) => !t.completed);
     saveTodos();
+    queueOp({ op: "clear_completed", ids });
     render();
   }, 350);
 }
 
+// ===== Sync =====
+// Optional: with a sync server set (sync_server.py, via ?sync=URL), each
+// change is also queued as an operation and sent on its own, and changes
+// from other devices come back as operations since the last synced version.
+function setSyncUrl(url) {
+  url = url.replace(/\/+$/, "");
+  if (url === (localStorage.getItem(SYNC_URL_KEY) || "")) return;
+  if (url) localStorage.setItem(SYNC_URL_KEY, url);
+  else localStorage.removeItem(SYNC_URL_KEY);
+  localStorage.removeItem(SYNC_VERSION_KEY);
+  localStorage.removeItem(SYNC_QUEUE_KEY);
+}
+
+function pendingOps() {
+  return JSON.parse(localStorage.getItem(SYNC_QUEUE_KEY) || "[]");
+}
+
+function queueOp(op) {
+  if (!localStorage.getItem(SYNC_URL_KEY)) return;
+  localStorage.setItem(SYNC_QUEUE_KEY, JSON.stringify(pendingOps().concat(op)));
+  sync();
+}
+
+function applyOp(op) {
+  if (op.op === "add") {
+    if (!todos.some((t) => t.id === op.todo.id)) todos.unshift(op.todo);
+  } else if (op.op === "toggle") {
+    const todo = todos.find((t) => t.id === op.id);
+    if (todo) {
+      todo.completed = op.completed;
+      todo.completedAt = op.completed ? op.at : null;
+    }
+  } else if (op.op === "delete") {
+    todos = todos.filter((t) => t.id !== op.id);
+  } else if (op.op === "clear_completed") {
+    const ids = new Set(op.ids);
+    todos = todos.filter((t) => !ids.has(t.id));
+  }
+}
+
+async function pushAndPull(url) {
+  const version = localStorage.getItem(SYNC_VERSION_KEY);
+  const queue = pendingOps();
+  // The first sync from this device sends the tasks already here, oldest first.
+  const ops = version === null ? todos.slice().reverse().map((todo) => ({ op: "add", todo })).concat(queue) : queue;
+  if (ops.length) {
+    const res = await fetch(`${url}/ops`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ ops }),
+    });
+    if (!res.ok) throw new Error(`POST /ops: ${res.status}`);
+    localStorage.setItem(SYNC_QUEUE_KEY, JSON.stringify(pendingOps().slice(queue.length)));
+  }
+
+  let res = null;
+  if (version !== null) {
+    res = await fetch(`${url}/changes?since=${version}`, {
+      headers: { "If-None-Match": `"${version}"` },
+      cache: "no-store",
+    });
+    if (res.status === 304 && !ops.length) return;
+    if (res.status === 410) res = null;
+    else if (!res.ok && res.status !== 304) throw new Error(`GET /changes: ${res.status}`);
+  }
+  let data;
+  if (res === null) {
+    res = await fetch(`${url}/todos`, { cache: "no-store" });
+    if (!res.ok) throw new Error(`GET /todos: ${res.status}`);
+    data = await res.json();
+    todos = data.todos;
+  } else if (res.status === 304) {
+    data = { version: Number(version) };
+  } else {
+    data = await res.json();
+    data.changes.forEach(applyOp);
+  }
+  // Operations queued meanwhile haven't reached the server yet.
+  pendingOps().forEach(applyOp);
+  localStorage.setItem(SYNC_VERSION_KEY, String(data.version));
+  saveTodos();
+  render();
+}
+
+async function sync() {
+  const url = localStorage.getItem(SYNC_URL_KEY);
+  if (!url) return;
+  if (syncRunning) {
+    syncPending = true;
+    return;
+  }
+  syncRunning = true;
+  try {
+    do {
+      syncPending = false;
+      await pushAndPull(url);
+    } while (syncPending);
+  } catch (err) {
+    console.warn("Sync failed:", err);
+  } finally {
+    syncRunning = false;
+  }
+}
+
 // ===== Filtering & Search =====
 function getFilteredTodos() {
   const search = el.searchInput.value.toLowerCase().trim();
@@ -504,6 +619,10 @@ function init() {
   // Load todos from storage
   todos = loadTodos();
 
+  // Sync: ?sync=URL points this device at a sync server, ?sync= stops syncing
+  const syncParam = new URLSearchParams(location.search).get("sync");
+  if (syncParam !== null) setSyncUrl(syncParam.trim());
+
   // Initial render
   renderTasks();
   updateStats();
@@ -524,6 +643,13 @@ function init() {
   el.clearCompleted.addEventListener("click", clearCompleted);
   el.themeToggle.addEventListener("click", toggleTheme);
 
+  sync();
+  setInterval(sync, SYNC_INTERVAL);
+  window.addEventListener("online", sync);
+  document.addEventListener("visibilitychange", () => {
+    if (!document.hidden) sync();
+  });
+
   // PWA: register service worker
   if ("serviceWorker" in navigator) {
     navigator.serviceWorker.register("./sw.js", { scope: "./" }).catch(() => {});
@@ -0,0 +1,232 @@
+"""
+TaskFlow Dump Migrator
+Normalizes a directory of exported localStorage dumps to the taskflow_todos
+format, the way loadTodos() in js/app.js upgrades one browser (section 8.2
+of the architecture docs), for thousands of users at a time:
+
+    python migrate.py DUMPS -o OUT [-j N]
+
+A dump is a JSON file holding either an array, of todo objects (the current
+format) or of strings (the legacy `todos` key), or an object of localStorage
+keys, where "taskflow_todos" wins over "todos" as it does in the app and
+values may be the JSON strings localStorage stores. Each dump is written to
+OUT under its own name as a taskflow_todos array: legacy items become medium
+priority, open todos created at the time of the migration; current ones get
+any missing field filled in and their timestamps in toISOString() form.
+
+Each dump is read, migrated and written by a worker of a process pool, which
+sends back only its ids. Ids must stay unique across the whole batch, since
+the dumps may be merged later: the parent puts every id through one set, in
+name order, and rewrites the rare dump holding one already seen, with a new
+id for that todo. New ids look like generateId()'s but are derived from the
+dump's name and the todo's position, so migrating the same dumps twice gives
+the same output.
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import datetime
+import hashlib
+import itertools
+import json
+import os
+import re
+import sys
+import time
+
+from task_report import PRIORITIES, TodoExportError
+from todo_store import iso, to_millis
+
+CURRENT_KEY = "taskflow_todos"
+LEGACY_KEY = "todos"
+# toISOString() output, kept as it is rather than parsed and formatted again.
+CANONICAL_RE = re.compile(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{3}Z\Z")
+
+
+class DumpError(ValueError):
+    pass
+
+
+def base36(number):
+    digits = ""
+    while True:
+        number, digit = divmod(number, 36)
+        digits = "0123456789abcdefghijklmnopqrstuvwxyz"[digit] + digits
+        if not number:
+            return digits
+
+
+def generate_id(millis, seed):
+    """generateId(): the time in base 36 and nine more base-36 characters,
+    here from a hash of seed instead of Math.random()."""
+    noise = int.from_bytes(hashlib.blake2b(seed.encode("utf-8"), digest_size=8).digest(), "big")
+    return base36(millis) + base36(noise).rjust(9, "0")[-9:]
+
+
+def read_dump(path):
+    """(format, items) of a dump: "current" or "legacy", and its list of todos."""
+    with open(path, encoding="utf-8-sig") as f:
+        try:
+            data = json.load(f)
+        except ValueError as e:
+            raise DumpError(f"not JSON: {e}") from None
+    if isinstance(data, dict):
+        key = CURRENT_KEY if data.get(CURRENT_KEY) is not None else LEGACY_KEY
+        if data.get(key) is None:
+            raise DumpError(f"no {CURRENT_KEY!r} or {LEGACY_KEY!r} key")
+        data = data[key]
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except ValueError as e:
+                raise DumpError(f"{key}: not JSON: {e}") from None
+        if not isinstance(data, list):
+            raise DumpError(f"{key} is not an array")
+        # The app never mixes formats under one key.
+        return ("current" if key == CURRENT_KEY else "legacy"), data
+    if not isinstance(data, list):
+        raise DumpError("expected an array of todos or an object of localStorage keys")
+    return ("current" if data and all(isinstance(item, dict) for item in data) else "legacy"), data
+
+
+def canonical(stamp):
+    if stamp is None or CANONICAL_RE.match(stamp):
+        return stamp
+    return iso(to_millis(stamp))
+
+
+def normalize(item, fmt, now):
+    """item as the app's todo object, with no id yet when it needs one; now is
+    the migration time in toISOString() form."""
+    if fmt == "legacy":
+        return {"id": None, "text": item if isinstance(item, str) else json.dumps(item),
+                "completed": False, "priority": "medium", "createdAt": now, "completedAt": None}
+    text = item.get("text")
+    completed = bool(item.get("completed"))
+    stamps = [item.get("createdAt"), item.get("completedAt") if completed else None]
+    try:
+        if any(stamp is not None and not isinstance(stamp, str) for stamp in stamps):
+            raise TodoExportError(f": not an ISO 8601 timestamp: {next(s for s in stamps if s is not None)!r}")
+        created, finished = map(canonical, stamps)
+    except TodoExportError as e:
+        raise DumpError(str(e).lstrip(": ")) from None
+    return {"id": str(item["id"]) if item.get("id") not in (None, "") else None,
+            "text": text if isinstance(text, str) else "" if text is None else str(text),
+            "completed": completed,
+            "priority": item.get("priority") if item.get("priority") in PRIORITIES else "medium",
+            "createdAt": created or now, "completedAt": finished}
+
+
+def migrate_dump(path, millis, output):
+    """Read, normalize and write one dump (run in a worker): (name, format,
+    ids, error). Todos without an id get one here."""
+    name = os.path.basename(path)
+    try:
+        fmt, items = read_dump(path)
+        if fmt == "current" and not all(isinstance(item, dict) for item in items):
+            raise DumpError("taskflow_todos holds something other than todo objects")
+        now = iso(millis)
+        todos = [normalize(item, fmt, now) for item in items]
+        for index, todo in enumerate(todos):
+            if todo["id"] is None:
+                todo["id"] = generate_id(millis, f"{name}\0{index}\0{0}")
+        write_json(os.path.join(output, name), todos)
+        return name, fmt, [todo["id"] for todo in todos], None
+    except (OSError, DumpError) as e:
+        return name, None, None, str(e)
+
+
+class Migration:
+    """Totals for a batch, and the set of ids handed out so far."""
+
+    def __init__(self, millis):
+        self.millis = millis
+        self.ids = set()
+        self.dumps = {"current": 0, "legacy": 0}
+        self.todos = 0
+        self.reassigned = 0
+        self.failed = []  # [(name, error)]
+
+    def check_ids(self, name, ids):
+        """Add a dump's ids to the set; return {index: new id} for the todos
+        whose id was taken."""
+        replaced = {}
+        for index, id in enumerate(ids):
+            attempt = 0
+            while id in self.ids:
+                id = generate_id(self.millis, f"{name}\0{index}\0{attempt}")
+                attempt += 1
+            if attempt:
+                replaced[index] = id
+            self.ids.add(id)
+        self.reassigned += len(replaced)
+        return replaced
+
+    def report(self, elapsed):
+        dumps = sum(self.dumps.values())
+        rate = dumps / elapsed if elapsed else 0
+        lines = [f"Migrated {dumps:,} dumps ({self.dumps['legacy']:,} legacy, {self.dumps['current']:,} current) "
+                 f"with {self.todos:,} todos in {elapsed:.2f}s: {rate:,.0f} dumps/sec"]
+        if self.reassigned:
+            lines.append(f"{self.reassigned:,} duplicate ids replaced")
+        for name, error in self.failed:
+            lines.append(f"FAILED {name}: {error}")
+        return "\n".join(lines)
+
+
+def write_json(path, todos):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    # json.dumps() runs the C encoder; json.dump() to a file does not.
+    text = json.dumps(todos, ensure_ascii=False, separators=(",", ":"))
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def migrate(source, output, workers=1, now=None, out=None):
+    """Migrate every *.json dump in source into output; return the Migration."""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    migration = Migration(to_millis(now))
+    os.makedirs(output, exist_ok=True)
+    paths = sorted(entry.path for entry in os.scandir(source) if entry.is_file() and entry.name.endswith(".json"))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers) if workers > 1 else contextlib.nullcontext() as pool:
+        args = (migrate_dump, paths, itertools.repeat(migration.millis), itertools.repeat(output))
+        # Results come back in order, a chunk of dumps per round trip.
+        results = pool.map(*args, chunksize=max(1, min(64, len(paths) // (4 * workers)))) if pool else map(*args)
+        for name, fmt, ids, error in results:
+            if error is not None:
+                migration.failed.append((name, error))
+                continue
+            replaced = migration.check_ids(name, ids)
+            if replaced:
+                target = os.path.join(output, name)
+                with open(target, encoding="utf-8") as f:
+                    todos = json.load(f)
+                for index, id in replaced.items():
+                    todos[index]["id"] = id
+                write_json(target, todos)
+            migration.dumps[fmt] += 1
+            migration.todos += len(ids)
+    print(migration.report(time.perf_counter() - start), file=out or sys.stdout)
+    return migration
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("source", help="directory of localStorage dumps (*.json)")
+    parser.add_argument("-o", "--output", required=True, help="directory to write the migrated dumps to")
+    parser.add_argument("-j", "--jobs", type=int, default=0, help="worker processes (default: one per CPU)")
+    parser.add_argument("--now", type=datetime.datetime.fromisoformat,
+                        help="ISO 8601 time legacy todos are created at (default: now)")
+    args = parser.parse_args(argv)
+    if os.path.abspath(args.source) == os.path.abspath(args.output):
+        parser.error("write the migrated dumps to another directory than the originals")
+    now = args.now and (args.now if args.now.tzinfo else args.now.replace(tzinfo=datetime.timezone.utc))
+    migration = migrate(args.source, args.output, args.jobs or os.cpu_count() or 1, now)
+    return 1 if migration.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
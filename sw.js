@@ -1,4 +1,4 @@
-const CACHE_NAME = "taskflow-v1";
+const CACHE_NAME = "taskflow-v2";
 const STATIC_ASSETS = [
   "./",
   "./index.html",
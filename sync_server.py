@@ -0,0 +1,421 @@
+"""
+TaskFlow Sync Server
+A small HTTP service that keeps one taskflow_todos list in step across the
+devices the app runs on. Clients send each change as the operation it is,
+not the whole array saveTodos() writes, and download only the operations
+since their last sync:
+
+    python sync_server.py [--data taskflow-sync.json] [--port 8765]
+
+and open the app as index.html?sync=http://127.0.0.1:8765 (section 8.4 of
+the architecture docs). Standard library only. The API, all JSON:
+
+    GET  /todos             the list, newest first: {"version", "todos"}
+    GET  /changes?since=V   the operations after version V: {"version", "changes"}
+    POST /ops               apply {"ops": [...]}: {"version", "applied"}
+
+The operations are the app's CRUD functions:
+
+    {"op": "add", "todo": {...}}                                 addTodo()
+    {"op": "toggle", "id": ID, "completed": BOOL, "at": ISO}     toggleTodo()
+    {"op": "delete", "id": ID}                                   deleteTodo()
+    {"op": "clear_completed", "ids": [ID, ...]}                  clearCompleted()
+
+Each operation that changes the list takes the next version and is logged
+the way it was applied: a toggle with the state and time it set, a clear
+with the ids it removed. Applying one twice changes nothing the second time
+(an add of a known id, a toggle to the state a todo already has), so a
+client that lost a response sends the same operations again.
+
+Responses carry the version as their ETag. A GET whose If-None-Match is *
+or lists the current version (weak tags match too) gets 304 Not Modified
+and no body. A POST whose If-Match lists no such tag gets 412 Precondition
+Failed. /changes answers 410 Gone once V is older than the operations kept,
+and the client fetches /todos instead.
+
+The list is kept in --data, with the operations since appended to a journal
+beside it (--data + ".log"), a JSON line each, and folded into it every
+COMPACT_EVERY operations and on exit.
+"""
+
+import argparse
+import asyncio
+import datetime
+import gzip
+from http import HTTPStatus
+import json
+import os
+import sys
+from urllib.parse import parse_qs, urlsplit
+
+from task_report import PRIORITIES, TodoExportError, parse_timestamp
+from todo_store import iso, to_millis
+
+MAX_HEADER = 16 << 10
+MAX_BODY = 8 << 20
+# /changes can go back between KEEP_OPS and twice as many operations.
+KEEP_OPS = 10000
+COMPACT_EVERY = 1000
+GZIP_OVER = 1024
+
+
+class SyncError(ValueError):
+    pass
+
+
+def now_iso():
+    return iso(to_millis(datetime.datetime.now(datetime.timezone.utc)))
+
+
+def _id(op, kind):
+    id = op.get("id")
+    if not isinstance(id, str) or not id:
+        raise SyncError(f"{kind} needs a todo id")
+    return id
+
+
+def _timestamp(value, what):
+    if value is None:
+        return None
+    try:
+        if not isinstance(value, str):
+            raise TodoExportError(f": not an ISO 8601 timestamp: {value!r}")
+        parse_timestamp(value)
+    except TodoExportError as e:
+        raise SyncError(f"{what}{e}") from None
+    return value
+
+
+def _todo(todo):
+    """The todo of an add operation, with the app's fields only."""
+    if not isinstance(todo, dict):
+        raise SyncError("add needs a todo object")
+    id, text = _id(todo, "a todo"), todo.get("text")
+    if not isinstance(text, str):
+        raise SyncError(f"todo {id!r} has no text")
+    completed = todo.get("completed", False)
+    if not isinstance(completed, bool):
+        raise SyncError(f"todo {id!r}: completed must be true or false")
+    priority = todo.get("priority", "medium")
+    if priority not in PRIORITIES:
+        raise SyncError(f"todo {id!r} has unknown priority {priority!r}")
+    return {"id": id, "text": text, "completed": completed, "priority": priority,
+            "createdAt": _timestamp(todo.get("createdAt"), f"todo {id!r} createdAt"),
+            "completedAt": _timestamp(todo.get("completedAt"), f"todo {id!r} completedAt") if completed else None}
+
+
+def check(op):
+    """An operation as a client sent it, checked and reduced to its fields."""
+    kind = op.get("op") if isinstance(op, dict) else None
+    if kind == "add":
+        return {"op": kind, "todo": _todo(op.get("todo"))}
+    if kind == "toggle":
+        completed = op.get("completed")
+        if completed is not None and not isinstance(completed, bool):
+            raise SyncError("toggle: completed must be true or false")
+        return {"op": kind, "id": _id(op, kind), "completed": completed, "at": _timestamp(op.get("at"), "toggle at")}
+    if kind == "delete":
+        return {"op": kind, "id": _id(op, kind)}
+    if kind == "clear_completed":
+        ids = op.get("ids")
+        if ids is not None and not (isinstance(ids, list) and all(isinstance(id, str) for id in ids)):
+            raise SyncError("clear_completed: ids must be a list of todo ids")
+        return {"op": kind, "ids": ids}
+    raise SyncError(f"unknown operation {kind!r} (expected add, toggle, delete or clear_completed)")
+
+
+class TodoList:
+    """The synced list: todos by id, oldest first, its version and the
+    operations that led to it, saved to path when one is given."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.todos = {}
+        self.version = 0
+        self.base = 0     # the version before log[0]
+        self.log = []
+        self.journal = None
+        self.journaled = 0
+        if path:
+            self._load()
+
+    @property
+    def etag(self):
+        return f'"{self.version}"'
+
+    def snapshot(self):
+        return {"version": self.version, "todos": list(reversed(self.todos.values()))}
+
+    def changes(self, since):
+        """The logged operations after version since, or None when they are
+        no longer kept (or since is from another server)."""
+        if not self.base <= since <= self.version:
+            return None
+        return self.log[since - self.base:]
+
+    def apply(self, ops):
+        """Check every operation, then apply them in order; return the ones
+        that changed the list, as logged."""
+        applied = []
+        for op in [check(op) for op in ops]:
+            op = self._apply(op)
+            if op is not None:
+                self.version += 1
+                op["version"] = self.version
+                applied.append(op)
+        self.log += applied
+        if len(self.log) > 2 * KEEP_OPS:
+            drop = len(self.log) - KEEP_OPS
+            del self.log[:drop]
+            self.base += drop
+        self._write(applied)
+        return applied
+
+    def _apply(self, op):
+        kind = op["op"]
+        if kind == "add":
+            todo = op["todo"]
+            if todo["id"] in self.todos:
+                return None
+            self.todos[todo["id"]] = dict(todo, createdAt=todo["createdAt"] or now_iso())
+            return {"op": kind, "todo": dict(self.todos[todo["id"]])}
+        if kind == "toggle":
+            todo = self.todos.get(op["id"])
+            if todo is None:
+                return None
+            completed = not todo["completed"] if op["completed"] is None else op["completed"]
+            if completed == todo["completed"]:
+                return None
+            todo["completed"] = completed
+            todo["completedAt"] = (op["at"] or now_iso()) if completed else None
+            return {"op": kind, "id": op["id"], "completed": completed, "at": todo["completedAt"]}
+        if kind == "delete":
+            return op if self.todos.pop(op["id"], None) is not None else None
+        # clear_completed, of the todos the client saw or of all of them
+        ids = [id for id in (self.todos if op["ids"] is None else op["ids"])
+               if id in self.todos and self.todos[id]["completed"]]
+        for id in ids:
+            del self.todos[id]
+        return {"op": kind, "ids": ids} if ids else None
+
+    # ---- Storage ----
+
+    @property
+    def journal_path(self):
+        return self.path + ".log"
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {"version": 0, "todos": []}
+        self.version = self.base = data["version"]
+        self.todos = {todo["id"]: todo for todo in reversed(data["todos"])}
+        torn = False
+        try:
+            with open(self.journal_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        torn = True  # cut short by a crash mid-write
+                        break
+                    # Operations already folded in are skipped; replaying the
+                    # rest from the same list logs them the same way again.
+                    if op["version"] > self.version:
+                        self._apply(op)
+                        self.version = op["version"]
+                        self.log.append(op)
+                        self.journaled += 1
+        except FileNotFoundError:
+            pass
+        self.journal = open(self.journal_path, "a", encoding="utf-8")
+        if torn:
+            # Start the journal afresh rather than append to half a line.
+            self.compact()
+
+    def _write(self, applied):
+        if self.journal is None or not applied:
+            return
+        self.journal.write("".join(json.dumps(op, ensure_ascii=False) + "\n" for op in applied))
+        self.journal.flush()
+        self.journaled += len(applied)
+        if self.journaled >= COMPACT_EVERY:
+            self.compact()
+
+    def compact(self):
+        """Write the list to path and empty the journal."""
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, self.path)
+        self.journal.truncate(0)
+        self.journaled = 0
+
+    def close(self):
+        if self.journal is not None:
+            if self.journaled:
+                self.compact()
+            self.journal.close()
+            self.journal = None
+
+
+# ---- HTTP ----
+
+CORS = {
+    "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type, If-Match, If-None-Match",
+    "Access-Control-Expose-Headers": "ETag",
+    "Access-Control-Max-Age": "86400",
+}
+
+
+def _etags(header):
+    # If-Match / If-None-Match: "*" or a comma-separated list of entity tags,
+    # compared weakly (a W/ prefix is dropped).
+    return {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+class SyncServer:
+    """Serves a TodoList over HTTP/1.1 with keep-alive, on asyncio streams."""
+
+    def __init__(self, todos, origin="*"):
+        self.todos = todos
+        self.origin = origin
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, 431, {"error": "request headers too large"}, {}, close=True)
+                    break
+                try:
+                    method, target, version, headers = self._parse(head)
+                except ValueError:
+                    await self._send(writer, 400, {"error": "malformed request"}, {}, close=True)
+                    break
+                if "transfer-encoding" in headers:
+                    await self._send(writer, 411, {"error": "send a Content-Length"}, headers, close=True)
+                    break
+                length = int(headers.get("content-length") or 0)
+                if not 0 <= length <= MAX_BODY:
+                    await self._send(writer, 413, {"error": f"requests are limited to {MAX_BODY} bytes"}, headers,
+                                     close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, payload = self.respond(method, target, headers, body)
+                close = headers.get("connection", "").lower() == "close" or version != "HTTP/1.1"
+                await self._send(writer, status, payload, headers, close, head_only=method == "HEAD")
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _parse(head):
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, version = lines[0].split(" ")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        int(headers.get("content-length") or 0)
+        return method, target, version, headers
+
+    def respond(self, method, target, headers, body):
+        """(status, JSON-able payload or None) for a request."""
+        url = urlsplit(target)
+        todos = self.todos
+        if method == "OPTIONS":
+            return 204, None
+        if url.path in ("/todos", "/changes"):
+            if method not in ("GET", "HEAD"):
+                return 405, {"error": f"{url.path} takes GET"}
+            if _etags(headers.get("if-none-match", "")) & {"*", todos.etag}:
+                return 304, None
+            if url.path == "/todos":
+                return 200, todos.snapshot()
+            try:
+                since = int(parse_qs(url.query)["since"][0])
+            except (KeyError, ValueError):
+                return 400, {"error": "/changes needs ?since=VERSION"}
+            changes = todos.changes(since)
+            if changes is None:
+                return 410, {"error": f"no changes kept since version {since}; fetch /todos", "version": todos.version}
+            return 200, {"version": todos.version, "changes": changes}
+        if url.path == "/ops":
+            if method != "POST":
+                return 405, {"error": "/ops takes POST"}
+            expected = headers.get("if-match")
+            if expected and not _etags(expected) & {"*", todos.etag}:
+                return 412, {"error": "the list has changed", "version": todos.version}
+            try:
+                ops = json.loads(body).get("ops")
+            except (ValueError, AttributeError):
+                ops = None
+            if not isinstance(ops, list):
+                return 400, {"error": 'expected {"ops": [...]}'}
+            try:
+                applied = todos.apply(ops)
+            except SyncError as e:
+                return 400, {"error": str(e)}
+            return 200, {"version": todos.version, "applied": len(applied)}
+        return 404, {"error": f"no such resource {url.path!r}"}
+
+    async def _send(self, writer, status, payload, headers, close=False, head_only=False):
+        status = HTTPStatus(status)
+        fields = {"ETag": self.todos.etag, "Cache-Control": "no-cache", "Access-Control-Allow-Origin": self.origin,
+                  **CORS}
+        body = b""
+        if payload is not None:
+            body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            fields["Content-Type"] = "application/json; charset=utf-8"
+            fields["Vary"] = "Accept-Encoding"
+            if len(body) > GZIP_OVER and "gzip" in headers.get("accept-encoding", ""):
+                body = gzip.compress(body, 6, mtime=0)
+                fields["Content-Encoding"] = "gzip"
+        if status not in (HTTPStatus.NO_CONTENT, HTTPStatus.NOT_MODIFIED):
+            fields["Content-Length"] = str(len(body))
+        if close:
+            fields["Connection"] = "close"
+        head = f"HTTP/1.1 {status.value} {status.phrase}\r\n" + "".join(f"{k}: {v}\r\n" for k, v in fields.items())
+        writer.write(head.encode("latin-1") + b"\r\n" + (b"" if head_only else body))
+        await writer.drain()
+
+
+async def serve(todos, host="127.0.0.1", port=8765, origin="*"):
+    server = await asyncio.start_server(SyncServer(todos, origin).handle, host, port, limit=MAX_HEADER)
+    print(f"Serving {len(todos.todos):,} todos (version {todos.version}) at http://{host}:{port}/", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--data", default="taskflow-sync.json", help="file to keep the list in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--origin", default="*",
+                        help="origin allowed to call the server from a browser (default: any; set it "
+                             "to the app's origin when listening beyond localhost)")
+    args = parser.parse_args(argv)
+    todos = TodoList(args.data)
+    try:
+        asyncio.run(serve(todos, args.host, args.port, args.origin))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        todos.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
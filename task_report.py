@@ -0,0 +1,230 @@
+"""
+TaskFlow Task Report
+Reads exported `taskflow_todos` JSON (see section 8.1 of the architecture
+docs) and summarises it for the task-report appendix.
+
+Exports can hold hundreds of thousands of tasks, so nothing here loads a
+whole file: iter_todos() decodes the top-level array one element at a time
+from fixed-size chunks, and TaskStats keeps only per-priority and per-month
+counters. The appendix makes one pass for the statistics and one more per
+table it lists.
+
+appendix() describes the appendix as document model nodes, which every
+output format renders the way it renders any other section.
+"""
+
+from collections import Counter
+import datetime
+import json
+import os
+import re
+
+import doc_model
+
+PRIORITIES = ("high", "medium", "low")
+
+_WHITESPACE_RE = re.compile(r"\s*")
+
+
+class TodoExportError(ValueError):
+    pass
+
+
+def iter_todos(path, chunk_size=1 << 16, timestamps=True):
+    """Yield each todo of an exported JSON array as a validated dict. With
+    timestamps=False, createdAt and completedAt are left as strings, for a
+    caller that parses them in bulk (see analytics.py)."""
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8-sig") as f:
+        buf, pos, eof = "", 0, False
+
+        def fill():
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+
+        def peek():
+            # Next non-whitespace character, or "" at the end of the file.
+            nonlocal pos
+            while True:
+                pos = _WHITESPACE_RE.match(buf, pos).end()
+                if pos < len(buf):
+                    return buf[pos]
+                if eof:
+                    return ""
+                fill()
+
+        if peek() != "[":
+            raise TodoExportError(f"{path}: expected a JSON array of todos")
+        pos += 1
+        if peek() == "]":
+            return
+        index = 0
+        while True:
+            # raw_decode() doesn't skip whitespace, as after a ", " separator.
+            peek()
+            while True:
+                try:
+                    item, pos = decoder.raw_decode(buf, pos)
+                    break
+                except json.JSONDecodeError as e:
+                    if eof:
+                        raise TodoExportError(f"{path}: todo #{index}: {e.msg}") from None
+                    fill()
+            yield _checked(item, index, path, timestamps)
+            index += 1
+            separator = peek()
+            if separator == "]":
+                return
+            if separator != ",":
+                raise TodoExportError(f"{path}: expected ',' or ']' after todo #{index - 1}")
+            pos += 1
+
+
+def _checked(item, index, path, timestamps=True):
+    if not isinstance(item, dict) or not isinstance(item.get("text"), str):
+        raise TodoExportError(f"{path}: todo #{index} is not a todo object: {item!r:.80}")
+    if item.get("priority") not in PRIORITIES:
+        raise TodoExportError(f"{path}: todo #{index} has unknown priority {item.get('priority')!r}")
+    for key in ("createdAt", "completedAt"):
+        if item.get(key) is None:
+            continue
+        if timestamps:
+            item[key] = parse_timestamp(item[key], f"{path}: todo #{index} {key}")
+        elif not isinstance(item[key], str):
+            raise TodoExportError(f"{path}: todo #{index} {key}: not an ISO 8601 timestamp: {item[key]!r}")
+    item["completed"] = bool(item.get("completed"))
+    return item
+
+
+def parse_timestamp(value, where=""):
+    """A datetime in UTC, so days and months are UTC ones as in analytics.py;
+    a timestamp without "Z" or an offset is UTC."""
+    try:
+        stamp = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        raise TodoExportError(f"{where}: not an ISO 8601 timestamp: {value!r}") from None
+    if stamp.tzinfo is None:
+        return stamp.replace(tzinfo=datetime.timezone.utc)
+    return stamp if stamp.tzinfo is datetime.timezone.utc else stamp.astimezone(datetime.timezone.utc)
+
+
+class TaskStats:
+    """Counters for the appendix summary tables, filled in one pass over the export."""
+
+    def __init__(self):
+        self.total = 0
+        self.counts = Counter()           # (priority, completed) -> tasks
+        self.created = Counter()          # "YYYY-MM" -> tasks created that month
+        self.finished = Counter()         # "YYYY-MM" -> tasks completed that month
+        self.days_to_complete = Counter() # priority -> summed days, completed tasks only
+        self.timed = Counter()            # priority -> completed tasks with both timestamps
+
+    def add(self, todo):
+        priority, completed = todo["priority"], todo["completed"]
+        created, finished = todo.get("createdAt"), todo.get("completedAt")
+        self.total += 1
+        self.counts[priority, completed] += 1
+        if created:
+            self.created[created.strftime("%Y-%m")] += 1
+        if completed and finished:
+            self.finished[finished.strftime("%Y-%m")] += 1
+            if created:
+                self.days_to_complete[priority] += (finished - created).total_seconds() / 86400
+                self.timed[priority] += 1
+
+    @classmethod
+    def from_export(cls, path):
+        stats = cls()
+        for todo in iter_todos(path):
+            stats.add(todo)
+        return stats
+
+    def completed(self, priority=None):
+        return sum(n for (p, done), n in self.counts.items() if done and priority in (None, p))
+
+    def average_days(self, priority):
+        return self.days_to_complete[priority] / self.timed[priority] if self.timed[priority] else None
+
+    def timeline(self):
+        """[(month, created, completed, still open at month end)] in month order."""
+        rows, open_tasks = [], 0
+        for month in sorted(set(self.created) | set(self.finished)):
+            open_tasks += self.created[month] - self.finished[month]
+            rows.append((month, self.created[month], self.finished[month], open_tasks))
+        return rows
+
+
+# ---- Appendix ----
+
+REPORT_WIDTHS = [16, 86, 24, 24, 20]
+
+
+def appendix(source, number="A", today=None):
+    """Yield the body of the task-report appendix for an export, after its
+    title, as paragraph, chart and subsection nodes. Table rows are generators, read
+    from the export only as the table is drawn. today (a date) ends the
+    open tasks' durations."""
+    stats = TaskStats.from_export(source)
+    done = stats.completed()
+    share = f" ({done / stats.total:.0%})" if stats.total else ""
+    yield doc_model.Node("paragraph", {"text": f"Generated from the taskflow_todos export {os.path.basename(source)}: "
+                                     f"{stats.total:,} tasks, {done:,} of them completed{share}."})
+    yield doc_model.Node("chart", {"type": "doughnut", "title": "Tasks by Status", "labels": ["Completed", "Active"],
+                                   "values": [done, stats.total - done]})
+
+    rows = []
+    for priority in PRIORITIES:
+        active, completed = stats.counts[priority, False], stats.counts[priority, True]
+        days = stats.average_days(priority)
+        rows.append([priority.capitalize(), f"{active:,}", f"{completed:,}", f"{active + completed:,}",
+                     f"{completed / (active + completed):.0%}" if active + completed else "-",
+                     "-" if days is None else f"{days:.1f}"])
+    yield _table_section(f"{number}.1 Tasks by Priority", rows, [30, 25, 25, 25, 25, 40],
+                         ["Priority", "Active", "Completed", "Total", "Done", "Avg. days to done"])
+    timeline = stats.timeline()
+    section = _table_section(f"{number}.2 Completion Timeline",
+                             ([month, f"{created:,}", f"{completed:,}", f"{open_tasks:,}"]
+                              for month, created, completed, open_tasks in timeline),
+                             [40, 40, 45, 45], ["Month", "Created", "Completed", "Open at month end"])
+    if timeline:
+        section.children.insert(0, doc_model.Node("chart", {
+            "type": "line", "title": "Tasks Completed per Month",
+            "labels": [month for month, *_ in timeline], "values": [completed for _, _, completed, _ in timeline]}))
+    yield section
+
+    table = 3
+    for priority in PRIORITIES:
+        for completed in (False, True):
+            count = stats.counts[priority, completed]
+            if not count:
+                continue
+            status = "Completed" if completed else "Active"
+            yield _table_section(f"{number}.{table} {priority.capitalize()} Priority - {status} ({count:,})",
+                                 report_rows(source, priority, completed, today), REPORT_WIDTHS,
+                                 ["#", "Task", "Created", "Completed", "Days"], "LLCCC")
+            table += 1
+
+
+def _table_section(title, rows, widths, columns, aligns=None):
+    attrs = {"columns": columns, "rows": rows, "widths": widths}
+    if aligns:
+        attrs["aligns"] = aligns
+    return doc_model.Node("subsection", {"title": title}, [doc_model.Node("table", attrs)])
+
+
+def report_rows(source, priority, completed, today=None):
+    """Rows of the task table for one priority and status."""
+    today = datetime.datetime.combine(today or datetime.date.today(), datetime.time(), datetime.timezone.utc)
+    n = 0
+    for todo in iter_todos(source):
+        if todo["priority"] != priority or todo["completed"] != completed:
+            continue
+        n += 1
+        created, finished = todo.get("createdAt"), todo.get("completedAt")
+        end = finished if completed else today
+        days = f"{max((end - created).total_seconds(), 0) / 86400:.1f}" if created and end else "-"
+        yield [str(n), todo["text"],
+               created.strftime("%Y-%m-%d") if created else "-",
+               finished.strftime("%Y-%m-%d") if finished else "-", days]
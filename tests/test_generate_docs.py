@@ -0,0 +1,36 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import doc_model
+import generate_docs
+
+
+def document(sections):
+    lines = ["<!-- page: cover -->", "", "<!-- page: contents -->", ""]
+    for number in range(1, sections + 1):
+        lines += [f"# {number}. Section {number}", "", f"Body of section {number}.", ""]
+    return doc_model.parse_markdown("\n".join(lines + ["<!-- page: back-cover -->"]))
+
+
+class TableOfContentsTest(unittest.TestCase):
+    def test_reserves_pages_for_every_entry(self):
+        for sections in (3, 40, 120):
+            for workers in (1, 2):
+                with self.subTest(sections=sections, workers=workers):
+                    pdf = generate_docs.build_pdf(document=document(sections), workers=workers)
+                    pdf.output()
+                    entries = [entry for entry in pdf._outline if entry.level == 0]
+                    self.assertEqual(len(entries), sections)
+                    # Section 1 follows the contents pages, and each section opens a page.
+                    toc_pages = entries[0].page_number - 2
+                    self.assertGreaterEqual(toc_pages, 1)
+                    self.assertEqual([entry.page_number for entry in entries],
+                                     list(range(2 + toc_pages, 2 + toc_pages + sections)))
+                    self.assertEqual(toc_pages, {3: 1, 40: 2, 120: 4}[sections])
+
+
+if __name__ == "__main__":
+    unittest.main()
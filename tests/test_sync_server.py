@@ -0,0 +1,285 @@
+import asyncio
+import gzip
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sync_server
+from sync_server import SyncError, TodoList
+
+
+def add(id, text="Task", **fields):
+    return {"op": "add", "todo": dict({"id": id, "text": text, "createdAt": "2025-01-01T09:00:00.000Z"}, **fields)}
+
+
+def toggle(id, completed=None, at="2025-01-02T09:00:00.000Z"):
+    return {"op": "toggle", "id": id, "completed": completed, "at": at}
+
+
+class TodoListTest(unittest.TestCase):
+    def test_add(self):
+        todos = TodoList()
+        applied = todos.apply([add("a", "First"), add("b", "Second", priority="high")])
+        self.assertEqual([op["version"] for op in applied], [1, 2])
+        self.assertEqual(todos.version, 2)
+        self.assertEqual([todo["id"] for todo in todos.snapshot()["todos"]], ["b", "a"])
+        self.assertEqual(todos.snapshot()["todos"][0], {"id": "b", "text": "Second", "completed": False,
+                                                        "priority": "high", "createdAt": "2025-01-01T09:00:00.000Z",
+                                                        "completedAt": None})
+
+    def test_add_fills_in_created_at(self):
+        todos = TodoList()
+        todos.apply([{"op": "add", "todo": {"id": "a", "text": "x"}}])
+        self.assertIsNotNone(todos.todos["a"]["createdAt"])
+        self.assertEqual(todos.log[0]["todo"]["createdAt"], todos.todos["a"]["createdAt"])
+
+    def test_toggle(self):
+        todos = TodoList()
+        todos.apply([add("a")])
+        (op,) = todos.apply([toggle("a", True)])
+        self.assertEqual(op, {"op": "toggle", "id": "a", "completed": True, "at": "2025-01-02T09:00:00.000Z",
+                              "version": 2})
+        self.assertEqual(todos.todos["a"]["completedAt"], "2025-01-02T09:00:00.000Z")
+        # Without a state, a toggle flips the todo, and is logged with the state it set.
+        (op,) = todos.apply([toggle("a")])
+        self.assertIs(op["completed"], False)
+        self.assertIsNone(op["at"])
+        self.assertIsNone(todos.todos["a"]["completedAt"])
+
+    def test_delete(self):
+        todos = TodoList()
+        todos.apply([add("a"), add("b"), {"op": "delete", "id": "a"}])
+        self.assertEqual(list(todos.todos), ["b"])
+        self.assertEqual(todos.log[-1], {"op": "delete", "id": "a", "version": 3})
+
+    def test_clear_completed(self):
+        todos = TodoList()
+        todos.apply([add("a"), add("b"), add("c"), toggle("a", True), toggle("b", True)])
+        # Only the ids the client saw, and only if they're completed.
+        (op,) = todos.apply([{"op": "clear_completed", "ids": ["a", "c", "gone"]}])
+        self.assertEqual(op["ids"], ["a"])
+        (op,) = todos.apply([{"op": "clear_completed"}])
+        self.assertEqual(op["ids"], ["b"])
+        self.assertEqual(list(todos.todos), ["c"])
+
+    def test_idempotent(self):
+        ops = [add("a"), add("b"), toggle("a", True), {"op": "delete", "id": "b"},
+               {"op": "clear_completed", "ids": ["a"]}]
+        todos = TodoList()
+        self.assertEqual(len(todos.apply(ops)), 5)
+        snapshot = todos.snapshot()
+        self.assertEqual(todos.apply(ops[2:]), [])
+        self.assertEqual(todos.snapshot(), snapshot)
+        # A retried add of a todo that still exists changes nothing either.
+        todos.apply([add("c")])
+        self.assertEqual(todos.apply([add("c", "Changed")]), [])
+        self.assertEqual(todos.todos["c"]["text"], "Task")
+
+    def test_unknown_todo(self):
+        todos = TodoList()
+        self.assertEqual(todos.apply([toggle("x", True), {"op": "delete", "id": "x"}]), [])
+        self.assertEqual(todos.version, 0)
+
+    def test_invalid_ops_apply_nothing(self):
+        for op in ({"op": "rename", "id": "a"}, "add", {"op": "toggle"}, {"op": "toggle", "id": "a", "completed": 1},
+                   add("b", priority="urgent"), add("b", createdAt="yesterday"), {"op": "add", "todo": {"id": "b"}},
+                   {"op": "clear_completed", "ids": "a"}):
+            with self.subTest(op=op):
+                todos = TodoList()
+                with self.assertRaises(SyncError):
+                    todos.apply([add("a"), op])
+                self.assertEqual((todos.version, todos.todos), (0, {}))
+
+    def test_changes(self):
+        todos = TodoList()
+        todos.apply([add("a"), add("b"), toggle("a", True)])
+        self.assertEqual([op["version"] for op in todos.changes(1)], [2, 3])
+        self.assertEqual(todos.changes(3), [])
+        self.assertIsNone(todos.changes(4))
+        self.assertIsNone(todos.changes(-1))
+
+    def test_old_changes_dropped(self):
+        todos = TodoList()
+        with mock.patch.object(sync_server, "KEEP_OPS", 2):
+            todos.apply([add(str(i)) for i in range(5)])
+        self.assertEqual(todos.base, 3)
+        self.assertIsNone(todos.changes(2))
+        self.assertEqual([op["version"] for op in todos.changes(3)], [4, 5])
+
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "todos.json")
+
+    def crash(self, todos):
+        # Stop without compacting, as a killed process would.
+        todos.journal.close()
+        todos.journal = None
+
+    def test_replay_after_crash(self):
+        todos = TodoList(self.path)
+        todos.apply([add("a"), add("b"), toggle("a"), {"op": "clear_completed"}, add("c")])
+        snapshot, log = todos.snapshot(), todos.log
+        self.crash(todos)
+        self.assertFalse(os.path.exists(self.path))
+        reloaded = TodoList(self.path)
+        self.addCleanup(reloaded.close)
+        self.assertEqual(reloaded.snapshot(), snapshot)
+        self.assertEqual(reloaded.log, log)
+        self.assertEqual(reloaded.changes(0), log)
+
+    def test_torn_last_line(self):
+        todos = TodoList(self.path)
+        todos.apply([add("a"), add("b")])
+        todos.journal.write('{"op": "delete", "id"')
+        self.crash(todos)
+        reloaded = TodoList(self.path)
+        self.assertEqual((reloaded.version, list(reloaded.todos)), (2, ["a", "b"]))
+        # The journal starts afresh, so what comes next isn't appended to half a line.
+        reloaded.apply([{"op": "delete", "id": "a"}])
+        self.crash(reloaded)
+        again = TodoList(self.path)
+        self.addCleanup(again.close)
+        self.assertEqual((again.version, list(again.todos)), (3, ["b"]))
+
+    def test_compact(self):
+        todos = TodoList(self.path)
+        todos.apply([add("a"), add("b")])
+        todos.compact()
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), todos.snapshot())
+        self.assertEqual(os.path.getsize(todos.journal_path), 0)
+        todos.apply([toggle("a", True)])
+        self.crash(todos)
+        reloaded = TodoList(self.path)
+        self.addCleanup(reloaded.close)
+        self.assertEqual((reloaded.base, reloaded.version), (2, 3))
+        self.assertTrue(reloaded.todos["a"]["completed"])
+
+    def test_compacts_every_so_many_operations(self):
+        todos = TodoList(self.path)
+        with mock.patch.object(sync_server, "COMPACT_EVERY", 3):
+            todos.apply([add("a"), add("b")])
+            self.assertFalse(os.path.exists(self.path))
+            todos.apply([add("c")])
+        self.assertTrue(os.path.exists(self.path))
+        self.assertEqual(todos.journaled, 0)
+        todos.close()
+        self.assertEqual(TodoList(self.path).snapshot(), todos.snapshot())
+
+    def test_close_compacts(self):
+        todos = TodoList(self.path)
+        todos.apply([add("a")])
+        todos.close()
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["version"], 1)
+
+
+class HttpTest(unittest.TestCase):
+    def setUp(self):
+        self.todos = TodoList()
+        self.todos.apply([add("a"), add("b")])
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(
+            asyncio.start_server(sync_server.SyncServer(self.todos).handle, "127.0.0.1", 0))
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        self.conn = http.client.HTTPConnection("127.0.0.1", server.sockets[0].getsockname()[1], timeout=5)
+
+        def stop():
+            self.conn.close()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            server.close()
+            loop.run_until_complete(server.wait_closed())
+            loop.close()
+
+        self.addCleanup(stop)
+
+    def request(self, method, path, body=None, **headers):
+        self.conn.request(method, path, body=None if body is None else json.dumps(body),
+                          headers={name.replace("_", "-"): value for name, value in headers.items()})
+        response = self.conn.getresponse()
+        raw = response.read()
+        if response.getheader("Content-Encoding") == "gzip":
+            raw = gzip.decompress(raw)
+        return response.status, response.getheader("ETag"), json.loads(raw) if raw else None
+
+    def test_todos(self):
+        status, etag, body = self.request("GET", "/todos")
+        self.assertEqual((status, etag), (200, '"2"'))
+        self.assertEqual(body, self.todos.snapshot())
+
+    def test_not_modified(self):
+        for header in ('"2"', "*", 'W/"2"', '"1", W/"2"', '"0" ,"2"'):
+            for path in ("/todos", "/changes?since=2"):
+                with self.subTest(header=header, path=path):
+                    self.assertEqual(self.request("GET", path, If_None_Match=header), (304, '"2"', None))
+
+    def test_modified(self):
+        for header in ('"1"', 'W/"1", "3"', ""):
+            with self.subTest(header=header):
+                status, _, body = self.request("GET", "/changes?since=1", If_None_Match=header)
+                self.assertEqual(status, 200)
+                self.assertEqual([op["todo"]["id"] for op in body["changes"]], ["b"])
+
+    def test_changes(self):
+        self.request("POST", "/ops", {"ops": [toggle("a", True)]})
+        status, etag, body = self.request("GET", "/changes?since=2", If_None_Match='"2"')
+        self.assertEqual((status, etag, body["version"]), (200, '"3"', 3))
+        self.assertEqual(body["changes"], [dict(toggle("a", True), version=3)])
+        self.assertEqual(self.request("GET", "/changes?since=3", If_None_Match='"3"')[0], 304)
+        self.assertEqual(self.request("GET", "/changes?since=9")[0], 410)
+        self.assertEqual(self.request("GET", "/changes")[0], 400)
+        self.assertEqual(self.request("GET", "/changes?since=x")[0], 400)
+
+    def test_ops(self):
+        status, etag, body = self.request("POST", "/ops", {"ops": [add("c"), toggle("a", True)]})
+        self.assertEqual((status, etag, body), (200, '"4"', {"version": 4, "applied": 2}))
+        status, _, body = self.request("POST", "/ops", {"ops": [add("c"), toggle("a", True)]})
+        self.assertEqual((status, body), (200, {"version": 4, "applied": 0}))
+
+    def test_bad_ops(self):
+        for body in ({"ops": [add("c"), {"op": "rename"}]}, {"ops": "add"}, [add("c")], None):
+            with self.subTest(body=body):
+                status, etag, response = self.request("POST", "/ops", body)
+                self.assertEqual((status, etag), (400, '"2"'))
+                self.assertIn("error", response)
+        self.assertNotIn("c", self.todos.todos)
+
+    def test_if_match(self):
+        status, _, body = self.request("POST", "/ops", {"ops": [add("c")]}, If_Match='"1"')
+        self.assertEqual((status, body["version"]), (412, 2))
+        self.assertEqual(self.request("POST", "/ops", {"ops": [add("c")]}, If_Match='"2"')[0], 200)
+        self.assertEqual(self.request("POST", "/ops", {"ops": [add("d")]}, If_Match="*")[0], 200)
+
+    def test_gzip(self):
+        self.todos.apply([add(f"t{i}", "x" * 50) for i in range(100)])
+        self.conn.request("GET", "/todos", headers={"Accept-Encoding": "gzip"})
+        response = self.conn.getresponse()
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(json.loads(gzip.decompress(response.read())), self.todos.snapshot())
+
+    def test_other_requests(self):
+        self.assertEqual(self.request("GET", "/nowhere")[0], 404)
+        self.assertEqual(self.request("PUT", "/ops")[0], 405)
+        self.assertEqual(self.request("POST", "/todos", {})[0], 405)
+        self.conn.request("OPTIONS", "/ops")
+        response = self.conn.getresponse()
+        response.read()
+        self.assertEqual(response.status, 204)
+        self.assertEqual(response.getheader("Access-Control-Allow-Origin"), "*")
+        self.assertIn("If-None-Match", response.getheader("Access-Control-Allow-Headers"))
+
+
+if __name__ == "__main__":
+    unittest.main()
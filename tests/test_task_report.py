@@ -0,0 +1,77 @@
+import datetime
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import task_report
+
+TODOS = [
+    {"id": "a", "text": "Write the report", "completed": True, "priority": "high",
+     "createdAt": "2025-01-01T09:00:00.000Z", "completedAt": "2025-01-03T09:00:00.000Z"},
+    {"id": "b", "text": "Buy milk", "completed": False, "priority": "low",
+     "createdAt": "2025-01-02T08:00:00.000Z", "completedAt": None},
+]
+
+
+class IterTodosTest(unittest.TestCase):
+    def export(self, text):
+        fd, path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_whitespace_between_todos(self):
+        for text in (json.dumps(TODOS), json.dumps(TODOS, indent=2), json.dumps(TODOS, separators=(",", ":")),
+                     "\n[\n" + " ,\n\t".join(map(json.dumps, TODOS)) + "\n]\n"):
+            for chunk_size in (1, 16, 1 << 16):
+                with self.subTest(text=text[:20], chunk_size=chunk_size):
+                    todos = list(task_report.iter_todos(self.export(text), chunk_size))
+                    self.assertEqual([todo["id"] for todo in todos], ["a", "b"])
+
+    def test_empty(self):
+        self.assertEqual(list(task_report.iter_todos(self.export(" [ \n ] "))), [])
+
+    def test_errors(self):
+        for text in ("{}", "[1]", json.dumps(TODOS)[:-1], json.dumps(TODOS).replace("},", "} x")):
+            with self.subTest(text=text[-20:]):
+                with self.assertRaises(task_report.TodoExportError):
+                    list(task_report.iter_todos(self.export(text)))
+
+
+class TimestampTest(unittest.TestCase):
+    def test_naive_is_utc(self):
+        utc = datetime.timezone.utc
+        self.assertEqual(task_report.parse_timestamp("2024-01-01T00:00:00"), datetime.datetime(2024, 1, 1, tzinfo=utc))
+        self.assertEqual(task_report.parse_timestamp("2024-01-01T02:00:00+02:00"),
+                         datetime.datetime(2024, 1, 1, tzinfo=utc))
+
+    def test_mixed_naive_and_utc_export(self):
+        todos = [dict(TODOS[0], createdAt="2025-01-01T09:00:00"), dict(TODOS[1], createdAt="2025-01-02T08:00:00")]
+        fd, path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(todos, f)
+        self.addCleanup(os.remove, path)
+        stats = task_report.TaskStats.from_export(path)
+        self.assertEqual(stats.average_days("high"), 2)
+        rows = list(task_report.report_rows(path, "low", False, today=datetime.date(2025, 1, 4)))
+        self.assertEqual(rows, [["1", "Buy milk", "2025-01-02", "-", "1.7"]])
+
+    def test_months_are_utc(self):
+        todos = [dict(TODOS[0], createdAt="2024-01-31T23:30:00-05:00", completedAt="2024-03-01T01:00:00+02:00")]
+        fd, path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(todos, f)
+        self.addCleanup(os.remove, path)
+        stats = task_report.TaskStats.from_export(path)
+        self.assertEqual(stats.timeline(), [("2024-02", 1, 1, 0)])
+        rows = list(task_report.report_rows(path, "high", True))
+        self.assertEqual(rows, [["1", "Write the report", "2024-02-01", "2024-02-29", "28.8"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
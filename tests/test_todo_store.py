@@ -0,0 +1,48 @@
+import datetime
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import todo_store
+from todo_store import TodoStore, TodoStoreError
+
+TODO = {"id": "a", "text": "Write the report", "completed": True, "priority": "high",
+        "createdAt": "2025-01-01T09:00:00.000Z", "completedAt": "2025-01-03T09:00:00.000Z"}
+
+
+class AppendTest(unittest.TestCase):
+    def test_round_trip(self):
+        store = TodoStore()
+        self.assertEqual(store.append(TODO), 0)
+        todo = store.get("a")
+        self.assertEqual((todo.text, todo.completed, todo.priority), ("Write the report", True, "high"))
+        self.assertEqual(todo_store.iso(todo_store.to_millis(todo.completed_at)), TODO["completedAt"])
+
+    def test_bad_todos(self):
+        store = TodoStore()
+        store.append(TODO)
+        for todo, message in ((dict(TODO, id=None), "without an id"), (dict(TODO, id="b", priority="urgent"), "'b'"),
+                              ({"id": "c", "priority": "low"}, "'c' has no text"),
+                              ({"id": "d", "text": "Buy milk"}, "'d' has unknown priority"),
+                              (TODO, "duplicate")):
+            with self.subTest(todo=todo):
+                with self.assertRaisesRegex(TodoStoreError, message):
+                    store.append(todo)
+        self.assertEqual(len(store), 1)
+
+
+class ToMillisTest(unittest.TestCase):
+    def test_naive_is_utc(self):
+        utc = datetime.timezone.utc
+        millis = todo_store.to_millis("2025-01-01T00:00:00Z")
+        self.assertEqual(todo_store.to_millis("2025-01-01T00:00:00"), millis)
+        self.assertEqual(todo_store.to_millis("2025-01-01T02:00:00+02:00"), millis)
+        self.assertEqual(todo_store.to_millis(datetime.datetime(2025, 1, 1)), millis)
+        self.assertEqual(todo_store.to_millis(datetime.datetime(2025, 1, 1, tzinfo=utc)), millis)
+        self.assertEqual(todo_store.to_millis(None), todo_store.MISSING)
+
+
+if __name__ == "__main__":
+    unittest.main()
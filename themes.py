@@ -0,0 +1,164 @@
+"""
+TaskFlow Document Themes
+The colors TaskFlowDoc draws with, read from the app's own design tokens: the
+custom properties of :root in css/style.css for the light theme, with those of
+[data-theme="dark"] on top for the dark one. A color change in the stylesheet
+reaches the PDF without touching the generator.
+
+Layout never depends on color, so a section is only ever laid out in the light
+theme. Recolor rewrites the color operators of that content into another theme
+when it is spliced into a document, which makes a dark build cost no more than
+splicing cached sections.
+"""
+
+import os
+import re
+
+import excerpts
+
+CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "css", "style.css")
+
+# Theme name -> the top-level rules whose custom properties make it up, in order.
+THEMES = {
+    "light": (":root",),
+    "dark": (":root", '[data-theme="dark"]'),
+}
+
+# TaskFlowDoc color attribute -> design token. The attribute names describe the
+# light theme; SURFACE is the page itself.
+ROLES = {
+    "INDIGO": "--primary",
+    "INDIGO_DARK": "--primary-dark",
+    "GRAY_700": "--text",
+    "GRAY_500": "--text-secondary",
+    "GRAY_400": "--text-muted",
+    "GRAY_200": "--border",
+    "SUCCESS": "--success",
+    "WARNING": "--warning",
+    "DANGER": "--danger",
+    "ACCENT": "--accent",
+    "CODE_BG": "--bg",
+    "SURFACE": "--surface",
+}
+
+# highlight run kind -> the ROLES key it is drawn in; anything else is GRAY_700.
+SYNTAX_ROLES = {
+    "comment": "GRAY_400",
+    "string": "SUCCESS",
+    "number": "WARNING",
+    "keyword": "INDIGO_DARK",
+    "tag": "INDIGO",
+    "attribute": "ACCENT",
+    "builtin": "DANGER",
+}
+
+CUSTOM_PROPERTY_RE = re.compile(r"(--[\w-]+)\s*:\s*([^;]+);")
+RGB_RE = re.compile(r"rgba?\(\s*([\d.]+)\s*,\s*([\d.]+)\s*,\s*([\d.]+)\s*(?:,\s*([\d.]+)\s*)?\)$")
+# A string operand, left as it is, or a gray or RGB color operator.
+COLOR_OP_RE = re.compile(rb"\((?:\\.|[^\\)])*\)|(?<![\w.])((?:\d*\.?\d+\s+){1,3})(rg|RG|g|G)(?!\w)", re.S)
+
+
+class ThemeError(ValueError):
+    pass
+
+
+class Theme:
+    def __init__(self, name, colors):
+        self.name = name
+        self.colors = colors  # ROLES key -> (r, g, b)
+
+    def tint(self, color):
+        """color at a quarter strength over the page, for box backgrounds."""
+        return tuple(c // 4 + s * 3 // 4 for c, s in zip(color, self.colors["SURFACE"]))
+
+
+def parse_color(value, under=(255, 255, 255)):
+    """(r, g, b) for a #rgb, #rrggbb, rgb() or rgba() value; a translucent
+    color is blended over under."""
+    value = value.strip()
+    if value.startswith("#") and len(value) in (4, 7):
+        digits = value[1:] if len(value) == 7 else "".join(c * 2 for c in value[1:])
+        try:
+            return tuple(int(digits[i:i + 2], 16) for i in (0, 2, 4))
+        except ValueError:
+            pass
+    match = RGB_RE.match(value)
+    if match:
+        alpha = float(match.group(4)) if match.group(4) else 1.0
+        return tuple(round(float(c) * alpha + u * (1 - alpha)) for c, u in zip(match.groups()[:3], under))
+    raise ThemeError(f"Can't use {value!r} as a PDF color")
+
+
+def custom_properties(path, selectors):
+    """The custom properties set by the top-level rules for selectors, later rules
+    overriding earlier ones."""
+    lines, symbols = excerpts.index.load(path)
+    properties = {}
+    for selector in selectors:
+        if selector not in symbols:
+            raise ThemeError(f"{path} has no top-level {selector} rule")
+        first, last = symbols[selector]
+        properties.update(CUSTOM_PROPERTY_RE.findall("\n".join(lines[first - 1:last])))
+    return properties
+
+
+_loaded = {}
+
+
+def load(name="light", path=CSS_PATH):
+    """The named theme, read again only when the stylesheet changes."""
+    if name not in THEMES:
+        raise ThemeError(f"Unknown theme {name!r} (expected one of {', '.join(THEMES)})")
+    st = os.stat(path)
+    key = (name, os.path.realpath(path), st.st_mtime_ns, st.st_size)
+    theme = _loaded.get(key)
+    if theme is None:
+        properties = custom_properties(path, THEMES[name])
+        missing = sorted(token for token in ROLES.values() if token not in properties)
+        if missing:
+            raise ThemeError(f"{path} doesn't define {', '.join(missing)} for the {name} theme")
+        surface = parse_color(properties[ROLES["SURFACE"]])
+        theme = _loaded[key] = Theme(name, {role: parse_color(properties[token], surface)
+                                            for role, token in ROLES.items()})
+    return theme
+
+
+class Recolor:
+    """Rewrites content drawn in one theme into another, color by color."""
+
+    def __init__(self, source, target):
+        self.colors = {}
+        # The page color is never drawn (and would collide with white text).
+        roles = [role for role in ROLES if role != "SURFACE"]
+        pairs = [(source.colors[role], target.colors[role]) for role in roles]
+        pairs += [(source.tint(source.colors[role]), target.tint(target.colors[role])) for role in roles]
+        for before, after in pairs:
+            if self.colors.setdefault(before, after) != after:
+                raise ThemeError(f"{source.name} uses {before} for two colors that differ in {target.name}")
+
+    def _operator(self, match):
+        operands, operator = match.group(1), match.group(2)
+        if operator is None:
+            return match.group(0)
+        values = operands.split()
+        if len(values) != (1 if operator in b"gG" else 3):
+            return match.group(0)
+        color = tuple(round(float(v) * 255) for v in values * (3 // len(values)))
+        after = self.colors.get(color)
+        if after is None:
+            return match.group(0)
+        operator = b"RG" if operator.isupper() else b"rg"
+        return b"%.3f %.3f %.3f " % tuple(c / 255 for c in after) + operator
+
+    def content(self, data):
+        return COLOR_OP_RE.sub(self._operator, data)
+
+    def device(self, color):
+        """The target theme's version of an FPDF color object."""
+        # Only a build gets this far; checking a theme needs no fpdf.
+        from fpdf.drawing_primitives import DeviceGray, DeviceRGB
+
+        if not isinstance(color, (DeviceGray, DeviceRGB)):
+            return color
+        after = self.colors.get(tuple(round(c) for c in color.colors255))
+        return color if after is None else DeviceRGB(*(c / 255 for c in after))
@@ -0,0 +1,260 @@
+"""
+TaskFlow Todo Store
+Todos held in memory as columns instead of one dict per task.
+
+A todo parsed from an export the obvious way is a dict of six keys mirroring
+the app's object (section 7.2 of the architecture docs), with a string for
+every value: several hundred bytes a task. TodoStore keeps each field in an
+array of its own:
+
+    ids, text       UTF-8 in one bytearray each, with an array of end offsets
+    flags           one byte a task: priority code << 1 | completed
+    created_at,     int64 milliseconds since the epoch (UTC), MISSING when
+    completed_at    unset
+
+and finds a row by id through a dict from each id's UTF-8 bytes to its row.
+The dict is the biggest per-task cost after the data, about a hundred
+bytes, but lookups run at dict speed; probing a table held in an array from
+Python was several times slower. Priorities come back as the strings in
+task_report.PRIORITIES, never copies.
+
+Rows are read either as Todo records, which copy their fields out, or by
+scan(), which moves a single cursor over the matching rows and hands out
+text as memoryviews of the buffer. benchmarks/todo_store.py compares memory
+use with plain dicts at a million tasks.
+"""
+
+from array import array
+import datetime
+import re
+import sys
+
+from task_report import PRIORITIES, iter_todos, parse_timestamp
+
+MISSING = -(1 << 63)
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_CODES = {name: code for code, name in enumerate(PRIORITIES)}
+
+
+class TodoStoreError(ValueError):
+    pass
+
+
+def to_millis(stamp):
+    """Milliseconds since the epoch for a datetime (naive ones are UTC) or an
+    ISO 8601 string (as parse_timestamp() reads it); MISSING for None."""
+    if stamp is None:
+        return MISSING
+    if isinstance(stamp, str):
+        stamp = parse_timestamp(stamp)  # always aware
+    elif stamp.tzinfo is None:
+        stamp = stamp.replace(tzinfo=datetime.timezone.utc)
+    return (stamp - EPOCH) // datetime.timedelta(milliseconds=1)
+
+
+def from_millis(millis):
+    return None if millis == MISSING else EPOCH + datetime.timedelta(milliseconds=millis)
+
+
+def iso(millis):
+    """The app's toISOString() form of a timestamp, or None."""
+    stamp = from_millis(millis)
+    return None if stamp is None else stamp.strftime("%Y-%m-%dT%H:%M:%S.") + f"{stamp.microsecond // 1000:03d}Z"
+
+
+class Todo:
+    """One task, copied out of a store or to be added to one."""
+
+    __slots__ = ("id", "text", "completed", "priority", "created_at", "completed_at")
+
+    def __init__(self, id, text, completed=False, priority="medium", created_at=None, completed_at=None):
+        self.id = id
+        self.text = text
+        self.completed = completed
+        self.priority = priority
+        self.created_at = created_at      # datetime (UTC) or None
+        self.completed_at = completed_at
+
+    def __repr__(self):
+        return f"<Todo {self.id} {self.priority}{' done' if self.completed else ''} {self.text!r:.40}>"
+
+    def __eq__(self, other):
+        return isinstance(other, Todo) and all(getattr(self, name) == getattr(other, name) for name in Todo.__slots__)
+
+    def to_dict(self):
+        """The object the app keeps in taskflow_todos."""
+        return {"id": self.id, "text": self.text, "completed": self.completed, "priority": self.priority,
+                "createdAt": iso(to_millis(self.created_at)), "completedAt": iso(to_millis(self.completed_at))}
+
+
+class TodoCursor:
+    """A view of one row of a store, moved along by TodoStore.scan(). Nothing
+    is copied until asked for; keep a row with copy(), not the cursor."""
+
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row=0):
+        self.store = store
+        self.row = row
+
+    @property
+    def id(self):
+        return self.store._string(self.store._ids, self.store._id_ends, self.row)
+
+    @property
+    def text(self):
+        return str(self.text_bytes, "utf-8")
+
+    @property
+    def text_bytes(self):
+        """The text as a memoryview of the store's buffer (UTF-8)."""
+        ends = self.store._text_ends
+        return memoryview(self.store._text)[ends[self.row - 1] if self.row else 0:ends[self.row]]
+
+    @property
+    def completed(self):
+        return bool(self.store._flags[self.row] & 1)
+
+    @property
+    def priority(self):
+        return PRIORITIES[self.store._flags[self.row] >> 1]
+
+    @property
+    def created_ms(self):
+        return self.store._created[self.row]
+
+    @property
+    def completed_ms(self):
+        return self.store._completed[self.row]
+
+    def copy(self):
+        return self.store[self.row]
+
+
+class TodoStore:
+    """Todos as a struct of arrays, appended to and looked up by id in O(1)."""
+
+    def __init__(self):
+        self._ids, self._id_ends = bytearray(), array("Q")
+        self._text, self._text_ends = bytearray(), array("Q")
+        self._flags = bytearray()
+        self._created, self._completed = array("q"), array("q")
+        self._rows = {}  # id (UTF-8 bytes) -> row
+
+    @classmethod
+    def from_export(cls, path):
+        """Stream an exported taskflow_todos array into a store."""
+        store = cls()
+        for todo in iter_todos(path, timestamps=False):
+            store.append(todo)
+        return store
+
+    def __len__(self):
+        return len(self._flags)
+
+    def __contains__(self, id):
+        return str(id).encode("utf-8") in self._rows
+
+    def __iter__(self):
+        return map(self.__getitem__, range(len(self)))
+
+    def __getitem__(self, row):
+        if not 0 <= row < len(self):
+            raise IndexError(f"row {row} out of range")
+        flags = self._flags[row]
+        return Todo(self._string(self._ids, self._id_ends, row), self._string(self._text, self._text_ends, row),
+                    bool(flags & 1), PRIORITIES[flags >> 1],
+                    from_millis(self._created[row]), from_millis(self._completed[row]))
+
+    @staticmethod
+    def _string(buffer, ends, row):
+        return buffer[ends[row - 1] if row else 0:ends[row]].decode("utf-8")
+
+    def append(self, todo):
+        """Add a Todo, or a todo dict as the app or task_report.iter_todos()
+        has it, and return its row. Ids must be unique."""
+        if isinstance(todo, Todo):
+            id, text, completed, priority = todo.id, todo.text, todo.completed, todo.priority
+            created, finished = todo.created_at, todo.completed_at
+        else:
+            id, text, completed = todo.get("id"), todo.get("text"), todo.get("completed")
+            priority, created, finished = todo.get("priority"), todo.get("createdAt"), todo.get("completedAt")
+        if id is None:
+            raise TodoStoreError(f"todo without an id: {text!r:.40}")
+        if not isinstance(text, str):
+            raise TodoStoreError(f"todo {id!r} has no text")
+        if priority not in _CODES:
+            raise TodoStoreError(f"todo {id!r} has unknown priority {priority!r}")
+        key = str(id).encode("utf-8")
+        if key in self._rows:
+            raise TodoStoreError(f"duplicate todo id {id!r}")
+        row = len(self)
+        created, finished = to_millis(created), to_millis(finished)
+        self._ids += key
+        self._id_ends.append(len(self._ids))
+        self._text += text.encode("utf-8")
+        self._text_ends.append(len(self._text))
+        self._flags.append(_CODES[priority] << 1 | bool(completed))
+        self._created.append(created)
+        self._completed.append(finished)
+        self._rows[key] = row
+        return row
+
+    def extend(self, todos):
+        for todo in todos:
+            self.append(todo)
+
+    def row(self, id):
+        """The row of the todo with this id; KeyError if there is none."""
+        try:
+            return self._rows[str(id).encode("utf-8")]
+        except KeyError:
+            raise KeyError(id) from None
+
+    def get(self, id, default=None):
+        row = self._rows.get(str(id).encode("utf-8"))
+        return default if row is None else self[row]
+
+    def set_completed(self, id, completed=True, when=None):
+        """Toggle a todo the way toggleTodo() does: completedAt is set on
+        completion (to when, or now) and cleared otherwise."""
+        row = self.row(id)
+        self._flags[row] = self._flags[row] & ~1 | bool(completed)
+        if completed:
+            self._completed[row] = to_millis(when or datetime.datetime.now(datetime.timezone.utc))
+        else:
+            self._completed[row] = MISSING
+
+    @staticmethod
+    def _flag_pattern(completed, priority):
+        # The flag bytes a filter accepts, as a one-character regex class.
+        codes = [_CODES[priority]] if priority is not None else range(len(PRIORITIES))
+        statuses = (0, 1) if completed is None else (int(bool(completed)),)
+        return re.compile(b"[" + b"".join(re.escape(bytes([code << 1 | status]))
+                                          for code in codes for status in statuses) + b"]")
+
+    def rows(self, completed=None, priority=None):
+        """Rows matching a status and/or priority, in order. The flag bytes
+        are searched by a regular expression, so skipped rows cost nothing in
+        Python."""
+        if completed is None and priority is None:
+            return iter(range(len(self)))
+        return (match.start() for match in self._flag_pattern(completed, priority).finditer(self._flags))
+
+    def count(self, completed=None, priority=None):
+        if completed is None and priority is None:
+            return len(self)
+        return len(self._flag_pattern(completed, priority).findall(self._flags))
+
+    def scan(self, completed=None, priority=None):
+        """Yield one TodoCursor, moved to each matching row in turn."""
+        cursor = TodoCursor(self)
+        for row in self.rows(completed, priority):
+            cursor.row = row
+            yield cursor
+
+    def nbytes(self):
+        """Bytes held by the columns and the id index (its keys included)."""
+        return (len(self._ids) + len(self._text) + len(self._flags)
+                + sum(a.itemsize * len(a) for a in (self._id_ends, self._text_ends, self._created, self._completed))
+                + sys.getsizeof(self._rows) + sum(map(sys.getsizeof, self._rows)))
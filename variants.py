@@ -0,0 +1,161 @@
+"""
+TaskFlow Document Variants
+What a build makes: the source, appendices, fonts, theme and formats of each
+variant of the docs, read from the command line or a batch manifest, and the
+document model it's laid out from.
+
+Nothing here imports fpdf or the layout code, so the command line can parse
+its arguments, check the sources and tell whether a build is up to date
+before paying for them (see doc_cli.py).
+"""
+
+from collections import namedtuple
+import json
+import os
+
+import doc_model
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SOURCE = os.path.join(ROOT, "docs", "source", "architecture.md")
+DEFAULT_OUTPUT = os.path.join(ROOT, "docs", "TaskFlow_Architecture.pdf")
+
+LISTING_LANGS = {".js": "js", ".css": "css", ".html": "html", ".py": "python", ".json": "json", ".md": "markdown"}
+
+
+# ---- Appendices ----
+
+def add_appendix(document, node):
+    """Insert an appendix node ahead of the back cover and return its letter."""
+    used = {str(child.get("number")) for child in document.children}
+    letter = next(c for c in "ABCDEFGHIJKLMNOPQRSTUVWXYZ" if c not in used)
+    node.attrs["number"] = letter
+    children = document.children
+    at = next((i for i, child in enumerate(children) if child.kind == "page" and child["name"] == "back-cover"),
+              len(children))
+    children.insert(at, node)
+    return letter
+
+
+def add_task_report(document, source):
+    """Append a task-report appendix for a taskflow_todos export."""
+    add_appendix(document, doc_model.Node("page", {"name": "task-report", "source": source}))
+    return doc_model.validate(document)
+
+
+def add_source_listings(document, paths):
+    """Append an appendix with the full text of each file. The text goes into the
+    document model, so a listing is re-rendered only when its file changes."""
+    section = doc_model.Node("section", {"title": "Source Listings"})
+    letter = add_appendix(document, section)
+    for index, path in enumerate(paths, 1):
+        with open(path, encoding="utf-8") as f:
+            code = {"code": f.read()}
+        lang = LISTING_LANGS.get(os.path.splitext(path)[1].lower())
+        if lang:
+            code["lang"] = lang
+        name = os.path.relpath(os.path.abspath(path), ROOT).replace(os.sep, "/")
+        section.children.append(doc_model.Node("subsection", {"title": f"{letter}.{index} {name}"},
+                                               [doc_model.Node("code", code)]))
+    return doc_model.validate(document)
+
+
+# ---- Variants ----
+#
+# A manifest lists variants of the document to build in one process, e.g.
+#
+#     {"defaults": {"fonts": "system"},
+#      "variants": [{"name": "architecture", "output": "TaskFlow_Architecture.pdf"},
+#                   {"name": "with-sources", "listing": ["../js/app.js", "../css/style.css"]}]}
+#
+# Each variant takes the keys of Variant below, which match the command-line
+# options; relative paths are relative to the manifest, and output defaults to
+# <name>.pdf next to it.
+#
+# formats lists the files to write, "pdf", "html" and "md" (see doc_export.py),
+# each named after output with its own extension. They are all rendered from
+# the one document model the variant loads.
+
+Variant = namedtuple("Variant", "name output source todos listing fonts stream theme formats",
+                     defaults=(None, DEFAULT_SOURCE, None, (), None, False, "light", ("pdf",)))
+
+VARIANT_PATHS = ("output", "source", "todos", "listing")
+# "pdf" and the keys of doc_export.FORMATS, spelled out so that parsing
+# options doesn't import the exporters and their syntax highlighter.
+FORMATS = ("pdf", "html", "md")
+
+
+def parse_formats(value):
+    """A tuple of formats from a comma-separated string or a list."""
+    formats = tuple(f.strip().lower() for f in (value.split(",") if isinstance(value, str) else value))
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown or not formats:
+        raise ValueError(f"unknown output format(s) {', '.join(unknown) or '(none)'} "
+                         f"(expected some of {', '.join(FORMATS)})")
+    return tuple(dict.fromkeys(formats))
+
+
+def format_path(output, fmt):
+    return os.path.splitext(output)[0] + "." + fmt
+
+
+def output_paths(variant):
+    """The files variant writes, one per format."""
+    return [format_path(variant.output, fmt) for fmt in variant.formats]
+
+
+class ManifestError(ValueError):
+    pass
+
+
+def load_manifest(path):
+    """The variants in a JSON (or, with PyYAML, YAML) manifest."""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ManifestError("Loading YAML manifests requires PyYAML: pip install pyyaml") from None
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    if not isinstance(data, dict) or not isinstance(data.get("variants"), list) or not data["variants"]:
+        raise ManifestError(f"{path}: expected a mapping with a non-empty 'variants' list")
+    base = os.path.dirname(os.path.abspath(path))
+    variants = []
+    for entry in data["variants"]:
+        options = dict(data.get("defaults") or {}, **entry)
+        unknown = set(options) - set(Variant._fields)
+        if unknown:
+            raise ManifestError(f"{path}: unknown variant option(s) {', '.join(sorted(unknown))} "
+                                f"(expected {', '.join(Variant._fields)})")
+        name = options.get("name")
+        if not name or name in {variant.name for variant in variants}:
+            raise ManifestError(f"{path}: every variant needs a name of its own, got {name!r}")
+        options.setdefault("output", name + ".pdf")
+        if isinstance(options.get("listing"), str):
+            options["listing"] = [options["listing"]]
+        if "formats" in options:
+            try:
+                options["formats"] = parse_formats(options["formats"])
+            except ValueError as e:
+                raise ManifestError(f"{path}: variant {name}: {e}") from None
+        for key in VARIANT_PATHS:
+            value = options.get(key)
+            if isinstance(value, str):
+                options[key] = os.path.join(base, value)
+            elif isinstance(value, list):
+                options[key] = tuple(os.path.join(base, item) for item in value)
+        if options.get("fonts") not in (None, "system"):
+            options["fonts"] = os.path.join(base, options["fonts"])
+        variants.append(Variant(**options))
+    return variants
+
+
+def load_document(variant):
+    """The variant's document model, with its appendices."""
+    document = doc_model.load(variant.source)
+    if variant.todos:
+        add_task_report(document, variant.todos)
+    if variant.listing:
+        add_source_listings(document, variant.listing)
+    return document
@@ -0,0 +1,140 @@
+"""
+TaskFlow File Watching
+Waits for any of a set of files to change, for generate_docs.py watch.
+
+On Linux the files' directories are watched with inotify (called through libc,
+no extra packages), which also sees editors that save by writing a new file
+and renaming it over the old one. Elsewhere, or when inotify can't be used,
+the files are polled for a new mtime or size.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+# Changes that land within this long of the first one are reported together,
+# so an editor's write-then-rename or a `git checkout` triggers one rebuild.
+SETTLE = 0.05
+POLL_INTERVAL = 0.2
+
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_Q_OVERFLOW = 0x4000
+EVENT = struct.Struct("iIII")  # struct inotify_event: wd, mask, cookie, len (then the name)
+
+
+class PollingWatcher:
+    def __init__(self, paths=()):
+        self.stamps = {}
+        self.watch(paths)
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def watch(self, paths):
+        """Watch exactly these paths from now on."""
+        paths = {os.path.abspath(path) for path in paths}
+        self.stamps = {path: self.stamps.get(path) or self._stamp(path) for path in paths}
+
+    def _changed(self):
+        changed = set()
+        for path, stamp in self.stamps.items():
+            now = self._stamp(path)
+            if now != stamp:
+                self.stamps[path] = now
+                changed.add(path)
+        return changed
+
+    def wait(self, timeout=None):
+        """The watched paths that changed, once some have; an empty set after
+        timeout seconds without changes."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = self._changed()
+            if changed:
+                time.sleep(SETTLE)
+                return changed | self._changed()
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(POLL_INTERVAL)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    def __init__(self, paths=()):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}   # watch descriptor -> directory
+        self.paths = set()
+        self.watch(paths)
+
+    def watch(self, paths):
+        """Watch exactly these paths from now on (directories once added stay
+        watched; events for other files in them are ignored)."""
+        self.paths = {os.path.abspath(path) for path in paths}
+        for directory in {os.path.dirname(path) for path in self.paths} - set(self.dirs.values()):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory),
+                                             IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"can't watch {directory}")
+            self.dirs[wd] = directory
+
+    def _read(self, timeout):
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT.unpack_from(data, offset)
+            name = data[offset + EVENT.size:offset + EVENT.size + length].rstrip(b"\0")
+            offset += EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                return set(self.paths)
+            path = os.path.join(self.dirs.get(wd, ""), os.fsdecode(name))
+            if path in self.paths:
+                changed.add(path)
+        return changed
+
+    def wait(self, timeout=None):
+        """The watched paths that changed, once some have; an empty set after
+        timeout seconds without changes."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            left = None if deadline is None else max(0, deadline - time.monotonic())
+            changed = self._read(left)
+            if changed:
+                settled = time.monotonic() + SETTLE
+                while time.monotonic() < settled:
+                    changed |= self._read(max(0, settled - time.monotonic()))
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+
+    def close(self):
+        os.close(self.fd)
+
+
+def watcher(paths=(), poll=False):
+    """An InotifyWatcher where inotify works, else (or with poll) a PollingWatcher."""
+    if not poll:
+        try:
+            return InotifyWatcher(paths)
+        except (OSError, AttributeError, TypeError):
+            pass
+    return PollingWatcher(paths)